@@ -0,0 +1,73 @@
+"""
+Throughput benchmark for the bytes <-> DNA codec.
+
+Compares the legacy bit-string round trip with the table-driven codec in
+dna_codec.py, on a list of droplet-sized payloads.
+
+Usage:
+    python -m benchmarks.bench_codec --total-bytes 4000000 --strand-bytes 46
+"""
+import argparse
+import os
+import time
+
+from dna_codec import bytes_batch_to_dna, bytes_to_dna, dna_batch_to_bytes, dna_to_bytes
+
+
+def legacy_binary_to_dna(data):
+    mapping = {'00': 'A', '01': 'C', '10': 'G', '11': 'T'}
+    bits = ''.join(f"{byte:08b}" for byte in data)
+    return ''.join(mapping[bits[i:i+2]] for i in range(0, len(bits), 2))
+
+
+def legacy_dna_to_binary(dna):
+    mapping = {'A': '00', 'C': '01', 'G': '10', 'T': '11'}
+    bits = ''.join(mapping[base] for base in dna)
+    if len(bits) % 8 != 0:
+        bits += '0' * (8 - len(bits) % 8)
+    return bytes(int(bits[i:i+8], 2) for i in range(0, len(bits), 8))
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(total_bytes: int, strand_bytes: int) -> None:
+    count = max(1, total_bytes // strand_bytes)
+    payloads = [os.urandom(strand_bytes) for _ in range(count)]
+    size_mb = count * strand_bytes / 1e6
+
+    legacy_dna, legacy_enc = _timed(lambda: [legacy_binary_to_dna(p) for p in payloads])
+    scalar_dna, scalar_enc = _timed(lambda: [bytes_to_dna(p) for p in payloads])
+    batch_dna, batch_enc = _timed(bytes_batch_to_dna, payloads)
+    assert legacy_dna == scalar_dna == batch_dna, "encoder output differs from legacy"
+
+    legacy_back, legacy_dec = _timed(lambda: [legacy_dna_to_binary(s) for s in batch_dna])
+    scalar_back, scalar_dec = _timed(lambda: [dna_to_bytes(s) for s in batch_dna])
+    batch_back, batch_dec = _timed(dna_batch_to_bytes, batch_dna)
+    assert legacy_back == scalar_back == batch_back == payloads, "decoder output differs from legacy"
+
+    print(f"{count} strands x {strand_bytes} B = {size_mb:.2f} MB")
+    for name, seconds in (
+        ('encode legacy', legacy_enc),
+        ('encode table', scalar_enc),
+        ('encode batch', batch_enc),
+        ('decode legacy', legacy_dec),
+        ('decode int', scalar_dec),
+        ('decode batch', batch_dec),
+    ):
+        print(f"{name:<14} {seconds:8.3f} s  {size_mb / seconds:8.2f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--total-bytes', type=int, default=2_000_000)
+    parser.add_argument('--strand-bytes', type=int, default=46, help="seed + payload + ECC bytes per strand")
+    args = parser.parse_args()
+    run(args.total_bytes, args.strand_bytes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare droplet count and synthesis cost of the payload formats.
+
+For each input file, reports the compressed message size, chunk count,
+droplet count and total nucleotides to synthesize under the legacy
+bit-string format and the raw-bytes format.
+
+Usage:
+    python -m benchmarks.bench_formats DNA.jpg [more files...]
+"""
+import argparse
+import time
+
+from fountaincodev2 import FORMAT_BITSTRING, FORMAT_RAW, prepare_message, readFile
+
+SEED_BYTES = 4
+
+
+def measure(data: bytes, format_version: int, chunk_size: int, ecc_bytes: int, redundancy_factor: float) -> dict:
+    start = time.perf_counter()
+    message = prepare_message(data, format_version)
+    elapsed = time.perf_counter() - start
+    num_chunks = -(-len(message) // chunk_size)
+    num_droplets = int(num_chunks * redundancy_factor * 20)
+    bases_per_strand = 4 * (SEED_BYTES + chunk_size + ecc_bytes)
+    return {
+        'message_bytes': len(message),
+        'num_chunks': num_chunks,
+        'num_droplets': num_droplets,
+        'nucleotides': num_droplets * bases_per_strand,
+        'prepare_seconds': elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--chunk-size', type=int, default=32)
+    parser.add_argument('--ecc-bytes', type=int, default=10)
+    parser.add_argument('--redundancy-factor', type=float, default=1.5)
+    args = parser.parse_args()
+
+    for path in args.files:
+        data = readFile(path)
+        legacy = measure(data, FORMAT_BITSTRING, args.chunk_size, args.ecc_bytes, args.redundancy_factor)
+        raw = measure(data, FORMAT_RAW, args.chunk_size, args.ecc_bytes, args.redundancy_factor)
+        print(f"{path} ({len(data)} bytes)")
+        for key in ('message_bytes', 'num_chunks', 'num_droplets', 'nucleotides', 'prepare_seconds'):
+            before, after = legacy[key], raw[key]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {key:<16} {before:>14,.6g} -> {after:>14,.6g}  ({change:+.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
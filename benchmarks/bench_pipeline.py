@@ -0,0 +1,278 @@
+"""
+End-to-end benchmark of the encode/decode pipeline, stage by stage.
+
+For each input size, generates a synthetic file, encodes it to FASTA with
+encode_image_to_dna (stream_bytes_to_dna with the metadata copies
+interleaved, as the CLI writes it) and decodes the file again with
+decode_dna_to_bytes, streaming the strands from disk. Stage times come from
+the pipeline's own progress reports:
+
+    encode: compress, droplets, encode_other
+    decode: metadata, chunks, decompress, decode_other
+
+The streamed stages include the work interleaved with them: droplets
+covers fountain encoding, RS encoding, DNA mapping and the FASTA writes;
+chunks covers FASTA reading, RS decoding and peeling (or elimination).
+The *_other stages are the time outside any reported stage: reading the
+input, building the metadata strands, writing the output.
+
+It records per-stage throughput (MB/s of input), the peak RSS of the run,
+the droplet overhead written (droplets / chunks - 1) and read (strands read
+before decoding stopped / chunks - 1, counting metadata copies and the
+read-ahead of one decode batch), and the nucleotides per input byte. Each
+size runs in a fresh process, so its peak RSS is its own.
+
+Results go to a JSON file (--output). Given --baseline, stage times and peak
+RSS are compared against a stored result file and the run exits with status
+1 if any of them got slower/larger by more than --tolerance; --save-baseline
+writes this run as the new baseline. benchmarks/baseline_pipeline.json holds
+a reference run of the default sizes; baselines are machine-specific, so
+save one on the machine you compare on.
+
+Usage:
+    python -m benchmarks.bench_pipeline --sizes 10K 100K 1M --output results.json
+    python -m benchmarks.bench_pipeline --sizes 10K 100K 1M 10M 100M --content text
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline_pipeline.json
+    python -m benchmarks.bench_pipeline --save-baseline
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import zlib
+
+from droplet_prng import PRNG_SPLITMIX64
+from fountaincodev2 import (CODEC_VERSION, FORMAT_RAW, UNTAGGED_PARAMS, decode_dna_to_bytes, encode_image_to_dna,
+                            stream_sequences, write_output)
+from sequence_io import read_sequences
+
+DEFAULT_SIZES = ('10K', '100K', '1M')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline_pipeline.json')
+ENCODE_STAGES = ('compress', 'droplets', 'encode_other')
+DECODE_STAGES = ('metadata', 'chunks', 'decompress', 'decode_other')
+MIN_DELTA = 0.005  # seconds; smaller differences are timer noise
+
+_WORDS = [b'adenine', b'cytosine', b'guanine', b'thymine', b'strand', b'droplet', b'fountain',
+          b'chunk', b'seed', b'primer', b'synthesis', b'sequencing', b'the', b'of', b'and']
+
+
+def parse_size(text: str) -> int:
+    """'10K', '1M', '100M' or a plain byte count."""
+    units = {'K': 1000, 'M': 1000 ** 2, 'G': 1000 ** 3}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def synthetic_input(size: int, content: str) -> bytes:
+    """Deterministic test data: 'random' (incompressible, like JPEG) or 'text'."""
+    rng = random.Random(size)
+    if content == 'random':
+        return rng.randbytes(size)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return b' '.join(words)[:size]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageTimer:
+    """
+    progress(stage, done, total) callback timing the stages a pipeline
+    reports. The time since the previous report goes to the reported stage,
+    except before a stage's first report (done == 0): that gap lies outside
+    every stage and goes to `other`.
+    """
+
+    def __init__(self, other: str):
+        self.other = other
+        self.seconds = {}
+        self.totals = {}
+        self.last = None
+
+    def _add(self, name: str, now: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def stop(self):
+        self._add(self.other, time.perf_counter())
+
+    def __call__(self, stage: str, done: int, total: int):
+        self._add(stage if done else self.other, time.perf_counter())
+        self.totals[stage] = total
+
+
+def _counted(items, counter: list):
+    for item in items:
+        counter[0] += 1
+        yield item
+
+
+def run_size(size: int, content: str, chunk_size: int, ecc_bytes: int, overhead: float, distribution: str,
+             master_seed: int) -> dict:
+    """Encode and decode one input; returns the result record."""
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    input_path = os.path.join(workdir, 'input.bin')
+    fasta_path = os.path.join(workdir, 'output.fasta')
+    output_path = os.path.join(workdir, 'decoded.bin')
+    data = synthetic_input(size, content)
+    with open(input_path, 'wb') as f:
+        f.write(data)
+    encode = StageTimer('encode_other')
+    decode = StageTimer('decode_other')
+    reads = [0]
+    try:
+        # the pipeline's diagnostics would interleave with the table
+        with contextlib.redirect_stdout(sys.stderr):
+            encode.start()
+            encode_image_to_dna(input_path, fasta_path, chunk_size, ecc_bytes, format_version=FORMAT_RAW,
+                                prng=PRNG_SPLITMIX64, distribution=distribution, overhead=overhead,
+                                master_seed=master_seed, progress=encode)
+            encode.stop()
+            bases = sum(map(len, read_sequences(fasta_path)))
+
+            decode.start()
+            try:
+                dna_sequences, _ = stream_sequences(fasta_path, UNTAGGED_PARAMS)
+                decoded = decode_dna_to_bytes(_counted(dna_sequences, reads), progress=decode)
+                write_output(output_path, decoded)
+            except (ValueError, zlib.error):
+                decoded = None
+            decode.stop()
+    finally:
+        for name in (input_path, fasta_path, output_path):
+            if os.path.exists(name):
+                os.remove(name)
+        os.rmdir(workdir)
+
+    stages = dict(encode.seconds, **decode.seconds)
+    num_chunks = decode.totals['chunks']
+    num_droplets = encode.totals['droplets']
+    mb = size / 1e6
+    return {
+        'size': size,
+        'content': content,
+        'num_chunks': num_chunks,
+        'num_droplets': num_droplets,
+        'encode_overhead': num_droplets / num_chunks - 1,
+        'decode_overhead': reads[0] / num_chunks - 1,
+        'bases_per_byte': bases / size,
+        'decoded': decoded == data,
+        'stages': stages,
+        'encode_seconds': sum(encode.seconds.values()),
+        'decode_seconds': sum(decode.seconds.values()),
+        'throughput_mbps': {name: mb / seconds if seconds > 0 else None for name, seconds in stages.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(size: int, args) -> dict:
+    """run_size in a fresh process, so peak RSS is measured per size."""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_size, (size, args.content, args.chunk_size, args.ecc_bytes, args.overhead,
+                                     args.distribution, args.master_seed))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of results against baseline, as human-readable lines."""
+    regressions = []
+    previous = {(r['size'], r['content']): r for r in baseline['results']}
+    for result in results['results']:
+        base = previous.get((result['size'], result['content']))
+        if base is None:
+            continue
+        checks = [(f"stage {name}", seconds, base['stages'].get(name), 's') for name, seconds in result['stages'].items()]
+        checks.append(('peak RSS', result['peak_rss_mb'], base['peak_rss_mb'], ' MB'))
+        for label, value, old, unit in checks:
+            if old is None:
+                continue
+            if value > old * (1 + tolerance) and (unit != 's' or value - old > MIN_DELTA):
+                regressions.append(f"{result['size']:>11} B {label}: {old:.3f}{unit} -> {value:.3f}{unit} "
+                                   f"(+{value / old - 1:.0%})")
+        if base['decoded'] and not result['decoded']:
+            regressions.append(f"{result['size']:>11} B no longer decodes")
+    return regressions
+
+
+def print_table(results: dict):
+    stages = ENCODE_STAGES + DECODE_STAGES
+    print(f"{'size':>11} " + ' '.join(f"{name[:10]:>10}" for name in stages) + f" {'RSS MB':>8} {'ovh w/r':>11} {'ok':>3}")
+    for r in results['results']:
+        cells = [f"{r['throughput_mbps'].get(name) or 0:10.2f}" for name in stages]
+        print(f"{r['size']:>11} " + ' '.join(cells) + f" {r['peak_rss_mb']:8.1f} "
+              f"{r['encode_overhead']:5.2f}/{r['decode_overhead']:5.2f} {'yes' if r['decoded'] else 'NO':>3}")
+    print("(stage columns: MB/s of input)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="input sizes, e.g. 10K 1M 100M")
+    parser.add_argument('--content', choices=('random', 'text'), default='random')
+    parser.add_argument('--chunk-size', type=int, default=32)
+    parser.add_argument('--ecc-bytes', type=int, default=10)
+    parser.add_argument('--overhead', type=float, default=0.3)
+    parser.add_argument('--distribution', default='robust_soliton')
+    parser.add_argument('--master-seed', type=int, default=1)
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help="compare with a stored result file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown/growth before a regression (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help="store this run as the baseline")
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'codec_version': CODEC_VERSION,
+            'chunk_size': args.chunk_size,
+            'ecc_bytes': args.ecc_bytes,
+            'overhead': args.overhead,
+            'distribution': args.distribution,
+            'master_seed': args.master_seed,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': [],
+    }
+    for size in map(parse_size, args.sizes):
+        print(f"{size} bytes ...", file=sys.stderr)
+        results['results'].append(run_isolated(size, args))
+    print_table(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:")
+            for line in regressions:
+                print("  " + line)
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
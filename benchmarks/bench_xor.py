@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for combining droplet payloads with XOR.
+
+For chunk sizes from 32 B to 4 KB, times XOR-ing `degree` chunks per droplet
+with the original per-byte loop, the big-integer kernel (xor_kernel), and
+NumPy row reduction over a 2-D chunk buffer.
+
+Usage:
+    python -m benchmarks.bench_xor --degree 3 --droplets 2000
+"""
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from xor_kernel import pack_chunks, unpack, xor_rows, xor_words
+
+CHUNK_SIZES = (32, 64, 128, 256, 512, 1024, 2048, 4096)
+NUM_CHUNKS = 256
+
+
+def legacy_xor_bytes(arrays, size):
+    result = bytearray(arrays[0] + b'\x00' * (size - len(arrays[0])))
+    for arr in arrays[1:]:
+        arr_padded = arr + b'\x00' * (size - len(arr))
+        for i in range(size):
+            result[i] ^= arr_padded[i]
+    return bytes(result)
+
+
+def run(chunk_size: int, degree: int, num_droplets: int, skip_legacy_above: int):
+    data = os.urandom(chunk_size * NUM_CHUNKS)
+    chunks = [data[i:i+chunk_size] for i in range(0, len(data), chunk_size)]
+    rng = random.Random(chunk_size)
+    selections = [rng.sample(range(NUM_CHUNKS), degree) for _ in range(num_droplets)]
+    timings = {}
+
+    if chunk_size <= skip_legacy_above:
+        start = time.perf_counter()
+        legacy = [legacy_xor_bytes([chunks[i] for i in sel], chunk_size) for sel in selections]
+        timings['legacy'] = time.perf_counter() - start
+    else:
+        legacy = None
+
+    start = time.perf_counter()
+    words = pack_chunks(data, chunk_size)
+    bigint = [unpack(xor_words(words, sel), chunk_size) for sel in selections]
+    timings['bigint'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = np.frombuffer(data, dtype=np.uint8).reshape(NUM_CHUNKS, chunk_size)
+    numpy_rows = [xor_rows(matrix, sel).tobytes() for sel in selections]
+    timings['numpy'] = time.perf_counter() - start
+
+    assert bigint == numpy_rows and (legacy is None or legacy == bigint), "XOR kernels disagree"
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--degree', type=int, default=3)
+    parser.add_argument('--droplets', type=int, default=2000)
+    parser.add_argument('--skip-legacy-above', type=int, default=1024,
+                        help="skip the slow per-byte loop for larger chunks")
+    args = parser.parse_args()
+
+    print(f"{args.droplets} droplets, degree {args.degree}; MB/s of XOR input")
+    print(f"{'chunk':>6} {'legacy':>10} {'bigint':>10} {'numpy':>10}")
+    for chunk_size in CHUNK_SIZES:
+        timings = run(chunk_size, args.degree, args.droplets, args.skip_legacy_above)
+        volume = args.droplets * args.degree * chunk_size / 1e6
+        cells = [f"{volume / timings[name]:10.1f}" if name in timings else f"{'-':>10}"
+                 for name in ('legacy', 'bigint', 'numpy')]
+        print(f"{chunk_size:>6} " + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Degree distributions for fountain droplets.
+
+A distribution is identified by a spec string, recorded as "dist=..." in the
+FASTA header so the decoder draws the same degrees:
+
+    uniform                            degree uniform in 1..3 (original scheme)
+    ideal_soliton                      rho(1) = 1/K, rho(d) = 1/(d(d-1))
+    robust_soliton:c=0.1,delta=0.05    Luby's robust soliton
+
+Soliton degrees are drawn by inverse CDF: the probabilities are quantized to
+integer thresholds out of 2**32 and a degree is picked with one
+randbelow(2**32) draw from the droplet PRNG.
+"""
+import bisect
+import math
+from functools import lru_cache
+from typing import Dict, List
+
+DIST_UNIFORM = 'uniform'
+DIST_IDEAL_SOLITON = 'ideal_soliton'
+DIST_ROBUST_SOLITON = 'robust_soliton'
+
+_CDF_SCALE = 1 << 32
+
+
+class DegreeDistribution:
+    """Base class: subclasses provide probabilities for degrees 1..K."""
+
+    name = ''
+
+    def __init__(self):
+        self._cdf_cache: Dict[int, List[int]] = {}
+
+    @property
+    def spec(self) -> str:
+        return self.name
+
+    def probabilities(self, num_chunks: int) -> List[float]:
+        """Return P(degree = d) for d = 1..num_chunks (index d - 1)."""
+        raise NotImplementedError
+
+    def cdf(self, num_chunks: int) -> List[int]:
+        """Return cumulative integer thresholds out of 2**32 for degrees 1..num_chunks."""
+        table = self._cdf_cache.get(num_chunks)
+        if table is None:
+            probs = self.probabilities(num_chunks)
+            total = math.fsum(probs)
+            table = []
+            running = 0.0
+            for p in probs:
+                running += p
+                table.append(round(running / total * _CDF_SCALE))
+            table[-1] = _CDF_SCALE
+            self._cdf_cache[num_chunks] = table
+        return table
+
+    def sample(self, rng, num_chunks: int) -> int:
+        """Draw a degree in 1..num_chunks using rng.randbelow."""
+        return 1 + bisect.bisect_right(self.cdf(num_chunks), rng.randbelow(_CDF_SCALE))
+
+    def mean_degree(self, num_chunks: int) -> float:
+        return sum(d * p for d, p in enumerate(self.probabilities(num_chunks), start=1))
+
+
+class UniformDistribution(DegreeDistribution):
+    """Degree uniform in 1..min(max_degree, K), as drawn by the original encoder."""
+
+    name = DIST_UNIFORM
+
+    def __init__(self, max_degree: int = 3):
+        super().__init__()
+        self.max_degree = max_degree
+
+    @property
+    def spec(self) -> str:
+        if self.max_degree == 3:
+            return self.name
+        return f"{self.name}:max_degree={self.max_degree}"
+
+    def probabilities(self, num_chunks: int) -> List[float]:
+        top = min(self.max_degree, num_chunks)
+        return [1.0 / top if d <= top else 0.0 for d in range(1, num_chunks + 1)]
+
+    def sample(self, rng, num_chunks: int) -> int:
+        return 1 + rng.randbelow(min(self.max_degree, num_chunks))
+
+
+class IdealSoliton(DegreeDistribution):
+    name = DIST_IDEAL_SOLITON
+
+    def probabilities(self, num_chunks: int) -> List[float]:
+        return [1.0 / num_chunks] + [1.0 / (d * (d - 1)) for d in range(2, num_chunks + 1)]
+
+
+class RobustSoliton(DegreeDistribution):
+    """
+    Luby's robust soliton distribution.
+    Args:
+        c: Tuning constant for the expected ripple size.
+        delta: Allowed failure probability bound.
+    """
+
+    name = DIST_ROBUST_SOLITON
+
+    def __init__(self, c: float = 0.1, delta: float = 0.05):
+        super().__init__()
+        if c <= 0 or not 0 < delta < 1:
+            raise ValueError("robust_soliton needs c > 0 and 0 < delta < 1")
+        self.c = c
+        self.delta = delta
+
+    @property
+    def spec(self) -> str:
+        return f"{self.name}:c={self.c:g},delta={self.delta:g}"
+
+    def probabilities(self, num_chunks: int) -> List[float]:
+        k = num_chunks
+        rho = IdealSoliton().probabilities(k)
+        ripple = self.c * math.log(k / self.delta) * math.sqrt(k)
+        pivot = min(k, max(1, int(k / ripple))) if ripple > 0 else k
+        tau = [0.0] * k
+        for d in range(1, pivot):
+            tau[d - 1] = ripple / (d * k)
+        if ripple > 0:
+            tau[pivot - 1] = max(0.0, ripple * math.log(ripple / self.delta) / k)
+        return [r + t for r, t in zip(rho, tau)]
+
+
+@lru_cache(maxsize=None)
+def get_distribution(spec: str = DIST_UNIFORM) -> DegreeDistribution:
+    """
+    Build (and cache) the distribution named by a spec string.
+    Examples: "uniform", "ideal_soliton", "robust_soliton:c=0.1,delta=0.05".
+    """
+    name, _, arg_str = spec.partition(':')
+    kwargs = {}
+    for arg in filter(None, arg_str.split(',')):
+        key, sep, value = arg.partition('=')
+        if not sep:
+            raise ValueError(f"Bad degree distribution argument: {arg}")
+        kwargs[key.strip()] = float(value)
+    if name == DIST_UNIFORM:
+        if 'max_degree' in kwargs:
+            kwargs['max_degree'] = int(kwargs['max_degree'])
+        return UniformDistribution(**kwargs)
+    if name == DIST_IDEAL_SOLITON:
+        return IdealSoliton(**kwargs)
+    if name == DIST_ROBUST_SOLITON:
+        return RobustSoliton(**kwargs)
+    raise ValueError(f"Unknown degree distribution: {spec}")
+
+
+def resolve_distribution(distribution) -> DegreeDistribution:
+    """Accept a DegreeDistribution, a spec string, or None (uniform)."""
+    if distribution is None:
+        return get_distribution(DIST_UNIFORM)
+    if isinstance(distribution, str):
+        return get_distribution(distribution)
+    return distribution
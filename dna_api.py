@@ -1,10 +1,18 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, request, send_file, jsonify, url_for
 import os
+import io
 from werkzeug.utils import secure_filename
-from fountaincodev2 import addECCInDroplets, encode_image_to_dna, decode_dna_to_image, image_to_binary, writeCompressedBinary, fountain_encode, compressAndEncode, add_error_correction, encode_droplets_to_dna, save_dna_to_fasta
-import tempfile
+from fountaincodev2 import CODEC_VERSION, addECCInDroplets, image_to_fasta_records, decode_dna_to_image, image_to_binary, compressAndEncode, encode_droplets_to_dna, fasta_records
+from droplet_prng import PRNG_SPLITMIX64
+from degree_distributions import DIST_UNIFORM, DIST_ROBUST_SOLITON, RobustSoliton, get_distribution
+from parallel_pipeline import default_workers
+from droplet_batch import DropletBatch
+from droplet_seeds import SEED_PERMUTATION
+from result_cache import ResultCache, cache_key
+from job_queue import DONE, RESULT_NAMES, JobQueue, QueueFull
+from sequence_io import iter_fasta
+from droplet_io import DROPLET_MAGIC, DROPLET_MIMETYPE, READ_BATCH, is_droplet_file, iter_droplet_file, open_droplets
 import json
-import math
 import base64
 from flasgger import Swagger
 
@@ -14,6 +22,8 @@ logger.setLevel(logging.DEBUG)
 
 app = Flask(__name__)
 
+STREAM_BATCH = 256  # FASTA records per chunk of a streamed response
+
 template = {
     "swagger": "2.0",
     "info": {
@@ -33,10 +43,153 @@ template = {
         {
             "name": "Encode",
             "description": "Full end-to-end encoding."
+        },
+        {
+            "name": "Jobs",
+            "description": "Queued encoding and decoding for large files."
         }
     ]
 }
 swagger = Swagger(app, template=template)
+jobs = JobQueue()
+cache = ResultCache()
+
+def _send_text(text: str, download_name: str):
+    """Send an in-memory text payload as a downloadable attachment."""
+    return send_file(io.BytesIO(text.encode('utf-8')), as_attachment=True, download_name=download_name)
+
+
+def _distribution_from_form() -> str:
+    """Build a degree distribution spec from the request form."""
+    name = request.form.get('degree_distribution', DIST_UNIFORM)
+    if name == DIST_ROBUST_SOLITON:
+        return RobustSoliton(float(request.form.get('c', 0.1)), float(request.form.get('delta', 0.05))).spec
+    return get_distribution(name).spec
+
+def _overhead_from_form():
+    overhead = request.form.get('overhead')
+    return float(overhead) if overhead not in (None, '') else None
+
+
+def _int_from_form(name: str):
+    # request.values: form fields, or query-string parameters for raw-body uploads
+    value = request.values.get(name)
+    return int(value) if value not in (None, '') else None
+
+
+def _master_seed_from_form():
+    return _int_from_form('master_seed')
+
+
+def _workers_from_form() -> int:
+    workers = int(request.values.get('workers', 1))
+    return max(1, min(workers, default_workers()))
+
+
+def _encode_params_from_form() -> dict:
+    """Keyword arguments for encode_image_to_dna from the request form."""
+    return {
+        'chunk_size': int(request.form.get('chunk_size', 32)),
+        'ecc_bytes': int(request.form.get('ecc_bytes', 10)),
+        'redundancy_factor': float(request.form.get('redundancy_factor', 1.5)),
+        'distribution': _distribution_from_form(),
+        'overhead': _overhead_from_form(),
+        'master_seed': _master_seed_from_form(),
+        'workers': _workers_from_form(),
+        'constraints': request.form.get('screen') or None,
+        'seed_scheme': request.form.get('seed_scheme') or SEED_PERMUTATION,
+    }
+
+
+def _decode_params_from_form() -> dict:
+    """Decoding parameters from the request form (all optional)."""
+    return {
+        'chunk_size': _int_from_form('chunk_size'),
+        'num_chunks': _int_from_form('num_chunks'),
+        'ecc_bytes': _int_from_form('ecc_bytes'),
+        'workers': _workers_from_form(),
+        'format_version': _int_from_form('format_version'),
+        'prng': request.values.get('prng') or None,
+        'distribution': request.values.get('distribution') or None,
+    }
+
+
+def _job_view(job: dict) -> dict:
+    view = dict(job, status_url=url_for('job_status', job_id=job['id']))
+    if job['status'] == DONE:
+        view['result_url'] = url_for('job_result', job_id=job['id'])
+    return view
+
+
+def _submit_job(kind: str, upload, params: dict):
+    try:
+        job = jobs.submit(kind, params, upload.stream)
+    except QueueFull as e:
+        return jsonify({'error': f'Job queue is full: {e}'}), 503
+    response = jsonify(_job_view(job))
+    response.status_code = 202
+    response.headers['Location'] = url_for('job_status', job_id=job['id'])
+    return response
+
+
+def _wants_droplet_file() -> bool:
+    """Content negotiation for droplet responses: JSON unless the client prefers the binary format."""
+    return request.accept_mimetypes.best_match(['application/json', DROPLET_MIMETYPE]) == DROPLET_MIMETYPE
+
+
+def _seed_from_json(value) -> int:
+    # Seeds are written as [seed]; accept a bare integer as well.
+    return int(value[0] if isinstance(value, list) else value)
+
+
+def _read_droplets(upload):
+    """
+    Open an uploaded droplet file, binary (see droplet_io) or JSON; the
+    format is recognized from the first bytes. A binary file is read
+    READ_BATCH droplets at a time as the batches are consumed, typically
+    by a streamed response after the view has returned.
+    Returns:
+        (number of droplets, iterator over DropletBatches)
+    Raises:
+        ValueError: If the file is malformed.
+    """
+    stream = upload.stream
+    binary = is_droplet_file(stream.read(len(DROPLET_MAGIC)))
+    stream.seek(0)
+    if binary:
+        count, _, batches = open_droplets(stream)
+        # request teardown closes request.files; from here on the batches own the stream
+        upload.stream = io.BytesIO()
+        return count, _closing(stream, batches)
+    droplets = DropletBatch.from_droplets([(_seed_from_json(seed), base64.b64decode(payload))
+                                           for seed, payload in json.load(stream)])
+    return len(droplets), _slices(droplets)
+
+
+def _closing(stream, batches):
+    try:
+        yield from batches
+    finally:
+        stream.close()
+
+
+def _slices(batch: DropletBatch):
+    # Views of READ_BATCH droplets, so a streamed response is produced piece by piece.
+    return (batch[i:i + READ_BATCH] for i in range(0, len(batch), READ_BATCH))
+
+
+def _send_droplets(count: int, batches):
+    """Send droplets as a binary droplet file or as JSON, following the Accept header."""
+    if _wants_droplet_file():
+        response = Response(iter_droplet_file(batches, count), mimetype=DROPLET_MIMETYPE,
+                            headers={'Content-Disposition': 'attachment; filename=droplets.bin'})
+    else:
+        serializable_droplets = [([seed], base64.b64encode(payload).decode('utf-8'))
+                                 for batch in batches for seed, payload in batch]
+        response = _send_text(json.dumps(serializable_droplets), 'droplets.json')
+    response.vary.add('Accept')
+    return response
+
 
 @app.route("/", methods=["GET", "POST"])
 def lambda_handler(event=None, context=None):
@@ -73,9 +226,51 @@ def encode():
         type: number
         default: 1.5
         description: The redundancy factor for the fountain code.
+      - name: degree_distribution
+        in: formData
+        type: string
+        enum: [uniform, ideal_soliton, robust_soliton]
+        default: uniform
+        description: The droplet degree distribution.
+      - name: c
+        in: formData
+        type: number
+        default: 0.1
+        description: Robust soliton c parameter.
+      - name: delta
+        in: formData
+        type: number
+        default: 0.05
+        description: Robust soliton delta parameter.
+      - name: overhead
+        in: formData
+        type: number
+        required: false
+        description: Extra droplets as a fraction of the chunk count (e.g. 0.3). Overrides redundancy_factor when given.
+      - name: master_seed
+        in: formData
+        type: integer
+        required: false
+        description: Fixed seed for the droplet seeds; the same input and parameters then give the same FASTA.
+      - name: workers
+        in: formData
+        type: integer
+        default: 1
+        description: Encoder processes (capped at the server's CPU count). Output does not depend on it.
+      - name: seed_scheme
+        in: formData
+        type: string
+        enum: [permutation, sequential, random]
+        default: permutation
+        description: How droplet seeds derive from master_seed. permutation and sequential never repeat a seed; random is the original scheme.
+      - name: screen
+        in: formData
+        type: string
+        required: false
+        description: Reject strands breaking GC-content/homopolymer limits, e.g. "default" or "max_run=3,gc_min=0.4,gc_max=0.6,window=50".
     responses:
       200:
-        description: The DNA sequence in FASTA format.
+        description: The DNA sequence in FASTA format, streamed as the droplets are produced, or served from the result cache (X-Cache is HIT or MISS) when the same file was encoded with the same parameters before. Send "Cache-Control: no-cache" to encode afresh.
         content:
           application/octet-stream:
             schema:
@@ -84,22 +279,31 @@ def encode():
     """
     if 'image' not in request.files:
         return jsonify({'error': 'No image file provided'}), 400
-    image = request.files['image']
-    chunk_size = int(request.form.get('chunk_size', 32))
-    ecc_bytes = int(request.form.get('ecc_bytes', 10))
-    redundancy_factor = float(request.form.get('redundancy_factor', 1.5))
-    filename = secure_filename(image.filename)
-    with tempfile.TemporaryDirectory() as tmpdir:
-        image_path = os.path.join(tmpdir, filename)
-        fasta_path = os.path.join(tmpdir, 'output.fasta')
-        image.save(image_path)
-        encode_image_to_dna(image_path, fasta_path, chunk_size, ecc_bytes, redundancy_factor)
-        return send_file(fasta_path, as_attachment=True, download_name='dna_encoded.fasta')
+    try:
+        params = _encode_params_from_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    data = request.files['image'].stream.read()
+    key = cache_key(data, {name: value for name, value in params.items() if name != 'workers'}, CODEC_VERSION)
+    cached = None if request.cache_control.no_cache else cache.open(key)
+    if cached is not None:
+        response = send_file(cached, mimetype='application/octet-stream', as_attachment=True, download_name='dna_encoded.fasta')
+        response.headers['X-Cache'] = 'HIT'
+        return response
+    try:
+        records = image_to_fasta_records(data, **params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(cache.write_through(key, iter_fasta(records, STREAM_BATCH)), mimetype='application/octet-stream',
+                    headers={'Content-Disposition': 'attachment; filename=dna_encoded.fasta', 'X-Cache': 'MISS'})
 
 @app.route('/decode', methods=['POST'])
 def decode():
     """
     Decode a DNA sequence from a FASTA file to an image.
+    The file can also be sent as the raw request body (any content type
+    other than a form, parameters in the query string); it is then decoded
+    as it arrives, and reading stops as soon as every chunk is recovered.
     ---
     tags:
       - Decoding APIs
@@ -108,22 +312,44 @@ def decode():
         in: formData
         type: file
         required: true
-        description: The FASTA file with the DNA sequence.
+        description: The FASTA or FASTQ file (optionally gzipped) with the DNA sequence.
       - name: chunk_size
         in: formData
         type: integer
-        default: 32
-        description: The size of each data chunk.
+        required: false
+        description: The size of each data chunk. Only needed for FASTA files without a metadata strand.
       - name: num_chunks
         in: formData
         type: integer
-        required: true
-        description: The total number of chunks.
+        required: false
+        description: The total number of chunks. Only needed for FASTA files without a metadata strand.
       - name: ecc_bytes
         in: formData
         type: integer
-        default: 10
-        description: The number of error correction bytes.
+        required: false
+        description: The number of error correction bytes (default 10). Only needed for FASTA files without a metadata strand.
+      - name: format_version
+        in: formData
+        type: integer
+        enum: [1, 2]
+        required: false
+        description: Payload format of files without a metadata strand or FASTA tags (default 1, as written by the original encoder).
+      - name: prng
+        in: formData
+        type: string
+        enum: [legacy, splitmix64]
+        required: false
+        description: Droplet PRNG of files without a metadata strand or FASTA tags (default legacy, as the original encoder).
+      - name: distribution
+        in: formData
+        type: string
+        required: false
+        description: Degree distribution spec, e.g. uniform or robust_soliton:c=0.1,delta=0.05. Used for files without a metadata strand or FASTA tags (default uniform, as the original encoder).
+      - name: workers
+        in: formData
+        type: integer
+        default: 1
+        description: Processes parsing and RS-decoding strands (capped at the server's CPU count).
     responses:
       200:
         description: The decoded image file.
@@ -133,21 +359,235 @@ def decode():
               type: string
               format: binary
     """
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        if 'fasta' not in request.files:
+            return jsonify({'error': 'No FASTA file provided'}), 400
+        source = request.files['fasta'].stream
+    elif request.content_length or request.headers.get('Transfer-Encoding') == 'chunked':
+        source = request.stream
+    else:
+        return jsonify({'error': 'No FASTA file provided'}), 400
+    try:
+        params = _decode_params_from_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    image = io.BytesIO()
+    success = decode_dna_to_image(source, image, **params)
+    if not success:
+        return jsonify({'error': 'Decoding failed'}), 500
+    image.seek(0)
+    return send_file(image, as_attachment=True, download_name='decoded_image.jpg')
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Encode result cache metrics
+    ---
+    tags:
+      - Encode
+    responses:
+      200:
+        description: Hit, miss, store and eviction counts across all workers, the hit rate, and the cache's current entries and size.
+    """
+    return jsonify(cache.stats())
+
+@app.route('/jobs/encode', methods=['POST'])
+def submit_encode_job():
+    """
+    Queue an image for encoding
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: image
+        in: formData
+        type: file
+        required: true
+        description: The image to encode.
+      - name: chunk_size
+        in: formData
+        type: integer
+        default: 32
+        description: The size of each data chunk.
+      - name: ecc_bytes
+        in: formData
+        type: integer
+        default: 10
+        description: The number of error correction bytes.
+      - name: redundancy_factor
+        in: formData
+        type: number
+        default: 1.5
+        description: The redundancy factor for the fountain code.
+      - name: degree_distribution
+        in: formData
+        type: string
+        enum: [uniform, ideal_soliton, robust_soliton]
+        default: uniform
+        description: The droplet degree distribution.
+      - name: c
+        in: formData
+        type: number
+        default: 0.1
+        description: Robust soliton c parameter.
+      - name: delta
+        in: formData
+        type: number
+        default: 0.05
+        description: Robust soliton delta parameter.
+      - name: overhead
+        in: formData
+        type: number
+        required: false
+        description: Extra droplets as a fraction of the chunk count. Overrides redundancy_factor when given.
+      - name: master_seed
+        in: formData
+        type: integer
+        required: false
+        description: Fixed seed for the droplet seeds.
+      - name: workers
+        in: formData
+        type: integer
+        default: 1
+        description: Encoder processes (capped at the server's CPU count).
+      - name: seed_scheme
+        in: formData
+        type: string
+        enum: [permutation, sequential, random]
+        default: permutation
+        description: How droplet seeds derive from master_seed. permutation and sequential never repeat a seed; random is the original scheme.
+      - name: screen
+        in: formData
+        type: string
+        required: false
+        description: Strand screening constraints, e.g. "default".
+    responses:
+      202:
+        description: The queued job; poll its status_url.
+      503:
+        description: Too many jobs are already queued.
+    """
+    if 'image' not in request.files:
+        return jsonify({'error': 'No image file provided'}), 400
+    try:
+        params = _encode_params_from_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _submit_job('encode', request.files['image'], params)
+
+@app.route('/jobs/decode', methods=['POST'])
+def submit_decode_job():
+    """
+    Queue a FASTA file for decoding
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: fasta
+        in: formData
+        type: file
+        required: true
+        description: The FASTA (or FASTQ, optionally gzipped) file with the DNA sequence.
+      - name: chunk_size
+        in: formData
+        type: integer
+        required: false
+        description: Only needed for FASTA files without a metadata strand.
+      - name: num_chunks
+        in: formData
+        type: integer
+        required: false
+        description: Only needed for FASTA files without a metadata strand.
+      - name: ecc_bytes
+        in: formData
+        type: integer
+        required: false
+        description: Only needed for FASTA files without a metadata strand.
+      - name: format_version
+        in: formData
+        type: integer
+        enum: [1, 2]
+        required: false
+        description: Payload format of files without a metadata strand or FASTA tags (default 1, as written by the original encoder).
+      - name: prng
+        in: formData
+        type: string
+        enum: [legacy, splitmix64]
+        required: false
+        description: Droplet PRNG of files without a metadata strand or FASTA tags (default legacy, as the original encoder).
+      - name: distribution
+        in: formData
+        type: string
+        required: false
+        description: Degree distribution spec, e.g. uniform or robust_soliton:c=0.1,delta=0.05. Used for files without a metadata strand or FASTA tags (default uniform, as the original encoder).
+      - name: workers
+        in: formData
+        type: integer
+        default: 1
+        description: Processes parsing and RS-decoding strands (capped at the server's CPU count).
+    responses:
+      202:
+        description: The queued job; poll its status_url.
+      503:
+        description: Too many jobs are already queued.
+    """
     if 'fasta' not in request.files:
         return jsonify({'error': 'No FASTA file provided'}), 400
-    fasta = request.files['fasta']
-    chunk_size = int(request.form.get('chunk_size', 32))
-    num_chunks = int(request.form.get('num_chunks'))
-    ecc_bytes = int(request.form.get('ecc_bytes', 10))
-    filename = secure_filename(fasta.filename)
-    with tempfile.TemporaryDirectory() as tmpdir:
-        fasta_path = os.path.join(tmpdir, filename)
-        image_path = os.path.join(tmpdir, 'decoded_image.jpg')
-        fasta.save(fasta_path)
-        success = decode_dna_to_image(fasta_path, image_path, chunk_size, num_chunks, ecc_bytes)
-        if not success:
-            return jsonify({'error': 'Decoding failed'}), 500
-        return send_file(image_path, as_attachment=True, download_name='decoded_image.jpg')
+    try:
+        params = _decode_params_from_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _submit_job('decode', request.files['fasta'], params)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Job status and per-stage progress
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: The job document (status is queued, running, done or failed).
+      404:
+        description: No such job.
+    """
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'No such job'}), 404
+    return jsonify(_job_view(job))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Download the output of a finished job
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: The encoded FASTA file or the decoded image.
+      404:
+        description: No such job.
+      409:
+        description: The job has not finished successfully.
+    """
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'No such job'}), 404
+    if job['status'] != DONE:
+        return jsonify({'error': f"Job is {job['status']}", 'job': _job_view(job)}), 409
+    return send_file(jobs.store.result_path(job_id), as_attachment=True, download_name=RESULT_NAMES[job['kind']])
 
 @app.route('/binarize', methods=['POST'])
 def binarize():
@@ -177,21 +617,11 @@ def binarize():
     image = request.files['image']
     filename = secure_filename(image.filename)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Save the uploaded image to a temporary path
-        image_path = os.path.join(tmpdir, filename)
-        image.save(image_path)
-
-        # Convert the image to a binary string
-        binary_data = image_to_binary(image_path)
+    # Convert the image to a binary string
+    binary_data = image_to_binary(image.stream)
 
-        # Save the binary string to a temporary file
-        binary_file_path = os.path.join(tmpdir, f"{os.path.splitext(filename)[0]}.bin")
-        with open(binary_file_path, 'w') as f:
-            f.write(binary_data)
-
-        # Send the binary file as a downloadable attachment
-        return send_file(binary_file_path, as_attachment=True, download_name=f"{os.path.splitext(filename)[0]}.bin")
+    # Send the binary string as a downloadable attachment
+    return _send_text(binary_data, f"{os.path.splitext(filename)[0]}.bin")
 
 @app.route('/fountain_encode', methods=['POST'])
 def fountain_encode_api():
@@ -200,6 +630,9 @@ def fountain_encode_api():
     ---
     tags:
       - Encoding APIs
+    produces:
+      - application/json
+      - application/vnd.dna-droplets
     parameters:
       - name: binary_file
         in: formData
@@ -216,20 +649,40 @@ def fountain_encode_api():
         type: number
         default: 1.5
         description: The redundancy factor for the fountain code.
+      - name: degree_distribution
+        in: formData
+        type: string
+        enum: [uniform, ideal_soliton, robust_soliton]
+        default: uniform
+        description: The droplet degree distribution.
+      - name: c
+        in: formData
+        type: number
+        default: 0.1
+        description: Robust soliton c parameter.
+      - name: delta
+        in: formData
+        type: number
+        default: 0.05
+        description: Robust soliton delta parameter.
+      - name: overhead
+        in: formData
+        type: number
+        required: false
+        description: Extra droplets as a fraction of the chunk count (e.g. 0.3). Overrides redundancy_factor when given.
     responses:
       200:
-        description: A JSON object containing the droplets and the number of chunks.
+        description: The droplets, as a JSON list of [[seed], base64 payload] pairs, or as a binary droplet file when the request's Accept header prefers application/vnd.dna-droplets.
         content:
           application/json:
             schema:
-              type: object
-              properties:
-                num_chunks:
-                  type: integer
-                droplets:
-                  type: array
-                  items:
-                    type: array
+              type: array
+              items:
+                type: array
+          application/vnd.dna-droplets:
+            schema:
+              type: string
+              format: binary
     """
     if 'binary_file' not in request.files:
         return jsonify({'error': 'No binary file provided'}), 400
@@ -237,28 +690,14 @@ def fountain_encode_api():
     binary_file = request.files['binary_file']
     chunk_size = int(request.form.get('chunk_size', 32))
     redundancy_factor = float(request.form.get('redundancy_factor', 1.5))
-    filename = secure_filename(binary_file.filename)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        binary_path = os.path.join(tmpdir, filename)
-        binary_file.save(binary_path)
+    droplets, num_chunks = compressAndEncode(binary_file.stream, chunk_size, redundancy_factor,
+                                             _distribution_from_form(), _overhead_from_form())
+    print(num_chunks)
+    if droplets is None:
+        return jsonify({'error': 'Encoding failed'}), 500
 
-        droplets, num_chunks = compressAndEncode(binary_path, chunk_size, redundancy_factor)
-        print(num_chunks)
-        if droplets is None:
-            return jsonify({'error': 'Encoding failed'}), 500
-
-        # Prepare droplets for JSON serialization
-        serializable_droplets = [
-            ([indices], base64.b64encode(droplet).decode('utf-8'))
-            for indices, droplet in droplets
-        ]
-
-        droplets_path = os.path.join(tmpdir, 'droplets.json')
-        with open(droplets_path, 'w') as f:
-            json.dump(serializable_droplets, f)
-
-        return send_file(droplets_path, as_attachment=True, download_name='droplets.json')
+    return _send_droplets(len(droplets), _slices(DropletBatch.from_droplets(droplets)))
 
 
         # response_data = {
@@ -275,12 +714,15 @@ def add_ecc_api():
     ---
     tags:
       - Encoding APIs
+    produces:
+      - application/json
+      - application/vnd.dna-droplets
     parameters:
       - name: droplets_file
         in: formData
         type: file
         required: true
-        description: The JSON file containing the droplets.
+        description: The droplets from /fountain_encode, as JSON or as a binary droplet file.
       - name: ecc_bytes
         in: formData
         type: integer
@@ -288,9 +730,14 @@ def add_ecc_api():
         description: The number of error correction bytes.
     responses:
       200:
-        description: A FASTA file containing the DNA sequences with error correction.
+        description: The droplets with error correction, as JSON or (if the Accept header prefers application/vnd.dna-droplets) as a binary droplet file.
         content:
-          application/octet-stream:
+          application/json:
+            schema:
+              type: array
+              items:
+                type: array
+          application/vnd.dna-droplets:
             schema:
               type: string
               format: binary
@@ -300,34 +747,15 @@ def add_ecc_api():
 
     droplets_file = request.files['droplets_file']
     ecc_bytes = int(request.form.get('ecc_bytes', 10))
-    filename = secure_filename(droplets_file.filename)
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        droplets_path = os.path.join(tmpdir, filename)
-        droplets_file.save(droplets_path)
-
-        with open(droplets_path, 'r') as f:
-            serializable_droplets = json.load(f)
-
-        droplets = [
-            (tuple(indices), base64.b64decode(droplet))
-            for indices, droplet in serializable_droplets
-        ]
-        if not droplets:
-            return jsonify({'error': 'No droplets found in the file'}), 400
-        
-
-        ecc_droplets = addECCInDroplets(droplets, ecc_bytes)
-        # Serialize ecc_droplets to a JSON file
-        serializable_ecc_droplets = [
-            (list(indices), base64.b64encode(droplet).decode('utf-8'))
-            for indices, droplet in ecc_droplets
-        ]
-        droplets_path = os.path.join(tmpdir, 'droplets.json')
-        with open(droplets_path, 'w') as f:
-            json.dump(serializable_ecc_droplets, f)
-
-        return send_file(droplets_path, as_attachment=True, download_name='droplets.json')
+
+    try:
+        count, droplets = _read_droplets(droplets_file)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid droplets file: {e}'}), 400
+    if not count:
+        return jsonify({'error': 'No droplets found in the file'}), 400
+
+    return _send_droplets(count, (addECCInDroplets(batch, ecc_bytes) for batch in droplets))
 
 @app.route('/encode_to_fasta', methods=['POST'])
 def encode_to_fasta_api():
@@ -341,7 +769,23 @@ def encode_to_fasta_api():
         in: formData
         type: file
         required: true
-        description: The JSON file containing the droplets with ECC.
+        description: The droplets with ECC from /add_ecc, as JSON or as a binary droplet file.
+      - name: degree_distribution
+        in: formData
+        type: string
+        enum: [uniform, ideal_soliton, robust_soliton]
+        default: uniform
+        description: The degree distribution the droplets were generated with.
+      - name: c
+        in: formData
+        type: number
+        default: 0.1
+        description: Robust soliton c parameter.
+      - name: delta
+        in: formData
+        type: number
+        default: 0.05
+        description: Robust soliton delta parameter.
     responses:
       200:
         description: A FASTA file containing the DNA sequences.
@@ -355,26 +799,17 @@ def encode_to_fasta_api():
         return jsonify({'error': 'No ECC droplets file provided'}), 400
 
     ecc_droplets_file = request.files['ecc_droplets_file']
-    filename = secure_filename(ecc_droplets_file.filename)
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        ecc_droplets_path = os.path.join(tmpdir, filename)
-        ecc_droplets_file.save(ecc_droplets_path)
-
-        with open(ecc_droplets_path, 'r') as f:
-            serializable_droplets = json.load(f)
-
-        ecc_droplets = [
-            (indices[0], base64.b64decode(droplet))
-            for indices, droplet in serializable_droplets
-        ]
 
-        dna_sequences = encode_droplets_to_dna(ecc_droplets)
-        
-        fasta_path = os.path.join(tmpdir, 'dna_encoded.fasta')
-        save_dna_to_fasta(dna_sequences, fasta_path)
+    try:
+        _, ecc_droplets = _read_droplets(ecc_droplets_file)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid droplets file: {e}'}), 400
 
-        return send_file(fasta_path, as_attachment=True, download_name='dna_encoded.fasta')
+    dna_sequences = (dna for batch in ecc_droplets for dna in encode_droplets_to_dna(batch))
+    # Droplets from /fountain_encode use the default droplet PRNG
+    records = fasta_records(dna_sequences, prng=PRNG_SPLITMIX64, distribution=_distribution_from_form())
+    return Response(iter_fasta(records, STREAM_BATCH), mimetype='application/octet-stream',
+                    headers={'Content-Disposition': 'attachment; filename=dna_encoded.fasta'})
 
 
 
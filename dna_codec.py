@@ -0,0 +1,130 @@
+"""
+Table-driven conversion between bytes and DNA base strings.
+
+Every byte maps to four bases, most significant bit pair first, using the same
+2-bit mapping as the rest of the pipeline (00->A, 01->C, 10->G, 11->T). The
+batch functions work on whole droplet lists at once so the per-base Python work
+of the old bit-string round trip disappears.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+BASES = 'ACGT'
+
+# 256-entry lookup: byte value -> 4-base string
+BYTE_TO_DNA = tuple(
+    ''.join(BASES[(byte >> shift) & 3] for shift in (6, 4, 2, 0))
+    for byte in range(256)
+)
+_BYTE_TO_DNA_ASCII = np.frombuffer(''.join(BYTE_TO_DNA).encode('ascii'), dtype=np.uint8).reshape(256, 4)
+
+# bytes.translate tables: bases -> ASCII base-4 digits (for int(..., 4)) and
+# bases -> 2-bit values (for NumPy packing). Anything else is marked invalid.
+_INVALID = 0xFF
+_DNA_TO_DIGIT = bytearray(b'x' * 256)
+_DNA_TO_VALUE = bytearray([_INVALID] * 256)
+for _value, _base in enumerate(BASES):
+    _DNA_TO_DIGIT[ord(_base)] = ord('0') + _value
+    _DNA_TO_VALUE[ord(_base)] = _value
+_DNA_TO_DIGIT = bytes(_DNA_TO_DIGIT)
+_DNA_TO_VALUE = bytes(_DNA_TO_VALUE)
+
+
+def bytes_to_dna(data: bytes) -> str:
+    """Convert bytes to a DNA string (4 bases per byte)."""
+    return ''.join(map(BYTE_TO_DNA.__getitem__, data))
+
+
+def dna_to_bytes(dna: str) -> bytes:
+    """
+    Convert a DNA string back to bytes.
+    A trailing partial byte is padded with 'A' (zero bits), as the bit-string
+    decoder did. Raises ValueError on characters other than A, C, G, T.
+    """
+    if len(dna) % 4:
+        dna += 'A' * (4 - len(dna) % 4)
+    if not dna:
+        return b''
+    digits = dna.encode('ascii').translate(_DNA_TO_DIGIT)
+    return int(digits, 4).to_bytes(len(dna) // 4, 'big')
+
+
+def bytes_batch_to_dna(payloads: Sequence[bytes]) -> List[str]:
+    """
+    Convert a list of byte strings to DNA strings in one vectorized pass.
+    Args:
+        payloads: Byte strings to convert (e.g. serialized droplets).
+    Returns:
+        One DNA string per payload, in order.
+    """
+    if not payloads:
+        return []
+    joined = np.frombuffer(b''.join(payloads), dtype=np.uint8)
+    text = _BYTE_TO_DNA_ASCII[joined].tobytes().decode('ascii')
+    sequences = []
+    pos = 0
+    for payload in payloads:
+        end = pos + 4 * len(payload)
+        sequences.append(text[pos:end])
+        pos = end
+    return sequences
+
+
+def matrix_to_dna(matrix: np.ndarray) -> List[str]:
+    """
+    Convert the rows of a 2-D uint8 array to DNA strings in one pass.
+    Args:
+        matrix: Array of shape (n, width), e.g. DropletBatch.strand_matrix().
+    Returns:
+        One DNA string of 4 * width bases per row.
+    """
+    if not len(matrix):
+        return []
+    width = 4 * matrix.shape[1]
+    text = _BYTE_TO_DNA_ASCII[matrix].tobytes().decode('ascii')
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+def dna_batch_to_bytes(sequences: Sequence[str]) -> List[Optional[bytes]]:
+    """
+    Convert a list of DNA strings to bytes in one vectorized pass.
+    Args:
+        sequences: DNA strings to convert (e.g. FASTA reads).
+    Returns:
+        One byte string per sequence, in order. Sequences containing
+        characters other than A, C, G, T come back as None so callers can
+        skip bad reads without aborting the whole batch.
+    """
+    if not sequences:
+        return []
+    if any(len(seq) % 4 for seq in sequences):
+        # Ragged reads need per-read padding; use the scalar path for those.
+        return [_dna_to_bytes_or_none(seq) for seq in sequences]
+    try:
+        raw = ''.join(sequences).encode('ascii')
+    except UnicodeEncodeError:
+        return [_dna_to_bytes_or_none(seq) for seq in sequences]
+    values = np.frombuffer(raw.translate(_DNA_TO_VALUE), dtype=np.uint8)
+    invalid = values == _INVALID
+    any_invalid = bool(invalid.any())
+    quads = values.reshape(-1, 4)
+    packed = ((quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]).tobytes()
+
+    results = []
+    pos = 0
+    for seq in sequences:
+        end = pos + len(seq)
+        if any_invalid and invalid[pos:end].any():
+            results.append(None)
+        else:
+            results.append(packed[pos // 4:end // 4])
+        pos = end
+    return results
+
+
+def _dna_to_bytes_or_none(dna: str) -> Optional[bytes]:
+    try:
+        return dna_to_bytes(dna)
+    except ValueError:
+        return None
@@ -0,0 +1,102 @@
+"""
+Biochemical screening of encoded strands.
+
+As in DNA Fountain, the droplet generator can drop seeds whose strands would
+be hard to synthesize or sequence and keep drawing seeds until it has
+enough droplets. The decoder is unaffected: it only ever sees the seeds that
+were kept.
+
+Constraints are identified by a spec string of key=value pairs:
+
+    max_run=3                  no homopolymer longer than 3 bases
+    gc_min=0.45,gc_max=0.55    GC fraction bounds
+    window=50                  apply the GC bounds to every 50-base window
+                               (default: the whole strand)
+
+'default' stands for max_run=3,gc_min=0.45,gc_max=0.55 (DNA Fountain's
+limits). Checks run on a whole batch of equal-length strands at once with
+NumPy rolling sums: a homopolymer of max_run + 1 bases is max_run equal
+neighbouring pairs in a row, and window GC counts are differences of a
+running GC count.
+"""
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+
+_GC = np.zeros(256, dtype=np.int32)
+_GC[ord('G')] = _GC[ord('C')] = 1
+
+
+class StrandConstraints:
+    """GC-content and homopolymer limits for encoded strands."""
+
+    def __init__(self, max_run: int = 3, gc_min: float = 0.45, gc_max: float = 0.55, window: int = None):
+        if max_run is not None and max_run < 1:
+            raise ValueError("max_run must be at least 1")
+        if not 0.0 <= gc_min <= gc_max <= 1.0:
+            raise ValueError("GC bounds must satisfy 0 <= gc_min <= gc_max <= 1")
+        self.max_run = max_run
+        self.gc_min = gc_min
+        self.gc_max = gc_max
+        self.window = window
+
+    @property
+    def spec(self) -> str:
+        fields = [f"max_run={self.max_run}"] if self.max_run is not None else []
+        fields += [f"gc_min={self.gc_min:g}", f"gc_max={self.gc_max:g}"]
+        if self.window:
+            fields.append(f"window={self.window}")
+        return ','.join(fields)
+
+    def check(self, strands: Sequence[str]) -> np.ndarray:
+        """Return a boolean array: True where the strand meets the constraints."""
+        ok = np.zeros(len(strands), dtype=bool)
+        by_length = {}
+        for i, strand in enumerate(strands):
+            by_length.setdefault(len(strand), []).append(i)
+        for length, rows in by_length.items():
+            codes = np.frombuffer(''.join(strands[i] for i in rows).encode('ascii'), dtype=np.uint8)
+            ok[rows] = self._check_codes(codes.reshape(len(rows), length))
+        return ok
+
+    def _check_codes(self, codes: np.ndarray) -> np.ndarray:
+        n, length = codes.shape
+        ok = np.ones(n, dtype=bool)
+        if length == 0:
+            return ok
+        run = self.max_run
+        if run is not None and length > run:
+            same = np.zeros((n, length), dtype=np.int32)
+            np.cumsum(codes[:, 1:] == codes[:, :-1], axis=1, out=same[:, 1:])
+            ok &= ((same[:, run:] - same[:, :-run]) < run).all(axis=1)
+        window = min(self.window or length, length)
+        gc = np.zeros((n, length + 1), dtype=np.int32)
+        np.cumsum(_GC[codes], axis=1, out=gc[:, 1:])
+        counts = gc[:, window:] - gc[:, :-window]
+        eps = 1e-9 * window
+        ok &= (counts.min(axis=1) >= self.gc_min * window - eps) & (counts.max(axis=1) <= self.gc_max * window + eps)
+        return ok
+
+
+@lru_cache(maxsize=None)
+def get_constraints(spec: str) -> StrandConstraints:
+    """Parse a constraints spec string."""
+    spec = spec.strip()
+    if spec in ('', 'default'):
+        return StrandConstraints()
+    kwargs = {}
+    for field in spec.split(','):
+        key, sep, value = field.partition('=')
+        key = key.strip()
+        if not sep or key not in ('max_run', 'gc_min', 'gc_max', 'window'):
+            raise ValueError(f"Bad strand constraint: {field!r}")
+        kwargs[key] = int(value) if key in ('max_run', 'window') else float(value)
+    return StrandConstraints(**kwargs)
+
+
+def resolve_constraints(constraints):
+    """Accept None (no screening), a spec string, or a StrandConstraints instance."""
+    if constraints is None or isinstance(constraints, StrandConstraints):
+        return constraints
+    return get_constraints(constraints)
@@ -1,5 +1,6 @@
 import sys
 from PIL import Image
+from dna_codec import bytes_to_dna, dna_to_bytes
 
 # Binary to DNA mapping
 BIN_TO_DNA = {'00': 'A', '01': 'C', '10': 'G', '11': 'T'}
@@ -28,11 +29,12 @@ def binary_to_image(binary_str, output_path):
         f.write(byte_data)
 
 def encode(image_path, dna_path, binary_path):
-    binary = image_to_binary(image_path)
+    with open(image_path, 'rb') as f:
+        data = f.read()
     with open(binary_path, 'w') as f:
-        f.write(binary)
+        f.write(''.join(f'{byte:08b}' for byte in data))
 
-    dna = binary_to_dna(binary)
+    dna = bytes_to_dna(data)
 
     with open(dna_path, 'w') as f:
         f.write(dna)
@@ -41,8 +43,8 @@ def encode(image_path, dna_path, binary_path):
 def decode(dna_path, output_image_path):
     with open(dna_path, 'r') as f:
         dna = f.read().strip()
-    binary = dna_to_binary(dna)
-    binary_to_image(binary, output_image_path)
+    with open(output_image_path, 'wb') as f:
+        f.write(dna_to_bytes(dna))
     print(f"Decoded {dna_path} to {output_image_path}")
 
 def main():
@@ -0,0 +1,94 @@
+"""
+Array-backed droplet container.
+
+A DropletBatch holds n droplets as one uint32 seed array and one contiguous
+(n, payload_size) uint8 payload buffer, instead of n (seed, bytes) tuples.
+Slicing returns views of the same buffers (no copying), and iterating yields
+(seed, payload) tuples, so code written for List[Tuple[int, bytes]] accepts
+a batch unchanged. Seeds are little-endian, matching the seed field at the
+start of every strand.
+"""
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+SEED_DTYPE = np.dtype('<u4')
+
+
+class DropletBatch:
+    """
+    Droplets sharing one payload size.
+    Args:
+        seeds: Seed array, shape (n,).
+        payloads: Payload buffer, shape (n, payload_size), dtype uint8.
+    """
+
+    def __init__(self, seeds: np.ndarray, payloads: np.ndarray):
+        seeds = np.asarray(seeds, dtype=SEED_DTYPE)
+        payloads = np.asarray(payloads, dtype=np.uint8)
+        if payloads.ndim != 2 or seeds.shape != (payloads.shape[0],):
+            raise ValueError("seeds must have shape (n,) and payloads shape (n, payload_size)")
+        self.seeds = seeds
+        self.payloads = payloads
+
+    @classmethod
+    def from_droplets(cls, droplets: Sequence[Tuple[int, bytes]], payload_size: int = None) -> 'DropletBatch':
+        """Pack (seed, payload) tuples; payloads must all have the same length."""
+        if isinstance(droplets, DropletBatch):
+            return droplets
+        seeds = np.fromiter((seed for seed, _ in droplets), dtype=SEED_DTYPE, count=len(droplets))
+        return cls.from_payload_bytes(seeds, b''.join(payload for _, payload in droplets), payload_size)
+
+    @classmethod
+    def from_payload_bytes(cls, seeds, data: bytes, payload_size: int = None) -> 'DropletBatch':
+        """Wrap payloads already joined into one bytes object (no copy)."""
+        seeds = np.asarray(seeds, dtype=SEED_DTYPE)
+        count = len(seeds)
+        if payload_size is None:
+            payload_size, remainder = divmod(len(data), count) if count else (0, 0)
+            if remainder:
+                raise ValueError("Droplet payloads differ in length")
+        elif len(data) != count * payload_size:
+            raise ValueError("Droplet payloads differ in length")
+        return cls(seeds, np.frombuffer(data, dtype=np.uint8).reshape(count, payload_size))
+
+    @property
+    def payload_size(self) -> int:
+        return self.payloads.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.seeds.nbytes + self.payloads.nbytes
+
+    def __len__(self) -> int:
+        return len(self.seeds)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return DropletBatch(self.seeds[key], self.payloads[key])
+        return int(self.seeds[key]), self.payloads[key].tobytes()
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        for seed, row in zip(self.seeds.tolist(), self.payloads):
+            yield seed, row.tobytes()
+
+    def payload_list(self) -> List[bytes]:
+        """Payloads as separate bytes objects (one copy of the buffer)."""
+        data = self.payloads.tobytes()
+        size = self.payload_size
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def to_list(self) -> List[Tuple[int, bytes]]:
+        return list(zip(self.seeds.tolist(), self.payload_list()))
+
+    def with_payloads(self, payloads: Sequence[bytes]) -> 'DropletBatch':
+        """Same seeds with new (equal-length) payloads, e.g. after adding ECC."""
+        size = len(payloads[0]) if len(payloads) else 0
+        return DropletBatch.from_payload_bytes(self.seeds, b''.join(payloads), size)
+
+    def strand_matrix(self) -> np.ndarray:
+        """(n, 4 + payload_size) matrix of serialized droplets: seed then payload."""
+        matrix = np.empty((len(self), 4 + self.payload_size), dtype=np.uint8)
+        matrix[:, :4] = np.ascontiguousarray(self.seeds).view(np.uint8).reshape(-1, 4)
+        matrix[:, 4:] = self.payloads
+        return matrix
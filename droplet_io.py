@@ -0,0 +1,119 @@
+"""
+Binary droplet files.
+
+The staged API endpoints (/fountain_encode, /add_ecc, /encode_to_fasta) pass
+droplets between each other. Besides the original JSON list of
+[[seed], base64 payload] pairs they can exchange this packed format, which
+is a fixed header followed by fixed-size records:
+
+    8s   magic (DROPLET_MAGIC)
+    u32  payload size in bytes
+    u64  number of records
+    then, per record:
+    u32  seed
+    ...  payload (payload size bytes)
+
+All integers are little-endian. A record is exactly the seed + payload
+bytes that encode_droplets_to_dna turns into a strand, so writing a
+DropletBatch is one copy of its strand matrix and reading a block of
+records gives a DropletBatch of views into that block.
+"""
+import struct
+from itertools import chain
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+from droplet_batch import SEED_DTYPE, DropletBatch
+
+DROPLET_MIMETYPE = 'application/vnd.dna-droplets'
+DROPLET_MAGIC = b'DNADRP1\x00'
+READ_BATCH = 4096  # records per DropletBatch when reading a stream
+
+_HEADER = struct.Struct('<8sIQ')
+
+
+def record_dtype(payload_size: int) -> np.dtype:
+    return np.dtype([('seed', SEED_DTYPE), ('payload', np.uint8, (payload_size,))])
+
+
+def is_droplet_file(prefix: bytes) -> bool:
+    """True if the bytes start like a binary droplet file."""
+    return prefix[:len(DROPLET_MAGIC)] == DROPLET_MAGIC
+
+
+def pack_header(count: int, payload_size: int) -> bytes:
+    return _HEADER.pack(DROPLET_MAGIC, payload_size, count)
+
+
+def iter_droplet_file(batches: Iterable[DropletBatch], count: int) -> Iterator[bytes]:
+    """
+    Serialize droplets piece by piece, e.g. for a streamed response.
+    Args:
+        batches: DropletBatches with one payload size, count droplets in total.
+        count: Total number of droplets (it goes in the header).
+    Yields:
+        The header, then the records of each batch.
+    Raises:
+        ValueError: If the batches disagree on payload size or count.
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    payload_size = first.payload_size if first is not None else 0
+    yield pack_header(count, payload_size)
+    written = 0
+    for batch in chain([first] if first is not None else [], batches):
+        if batch.payload_size != payload_size:
+            raise ValueError("Droplet payloads differ in length")
+        yield batch.strand_matrix().tobytes()
+        written += len(batch)
+    if written != count:
+        raise ValueError(f"Droplet file header says {count} droplets, wrote {written}")
+
+
+def dump_droplets(droplets) -> bytes:
+    """Serialize a DropletBatch (or (seed, payload) list) to bytes."""
+    batch = DropletBatch.from_droplets(droplets)
+    return b''.join(iter_droplet_file([batch], len(batch)))
+
+
+def _read_exact(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Droplet file is truncated")
+    return data
+
+
+def open_droplets(stream, batch_size: int = READ_BATCH) -> Tuple[int, int, Iterator[DropletBatch]]:
+    """
+    Read a binary droplet file incrementally.
+    Args:
+        stream: Binary file-like object positioned at the header.
+        batch_size: Droplets per yielded batch.
+    Returns:
+        (count, payload_size, iterator over DropletBatches).
+    Raises:
+        ValueError: If the header is not a droplet file header, or the
+            records are truncated (checked up front for seekable streams,
+            otherwise while iterating).
+    """
+    magic, payload_size, count = _HEADER.unpack(_read_exact(stream, _HEADER.size))
+    if magic != DROPLET_MAGIC:
+        raise ValueError("Not a binary droplet file")
+    dtype = record_dtype(payload_size)
+    if stream.seekable():
+        start = stream.tell()
+        end = stream.seek(0, 2)
+        stream.seek(start)
+        if end - start < count * dtype.itemsize:
+            raise ValueError("Droplet file is truncated")
+
+    def batches():
+        remaining = count
+        while remaining:
+            n = min(batch_size, remaining)
+            records = np.frombuffer(_read_exact(stream, n * dtype.itemsize), dtype=dtype)
+            yield DropletBatch(records['seed'], records['payload'])
+            remaining -= n
+
+    return count, payload_size, batches()
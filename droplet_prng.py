@@ -0,0 +1,167 @@
+"""
+Per-droplet pseudo-random generators for degree and neighbour selection.
+
+Every droplet derives its neighbour set from its own seed through a private
+generator instance, so encoders and decoders never touch the process-global
+`random` state and can run from any number of threads.
+
+PRNG_SPLITMIX64 is the stable scheme. It is defined entirely by integer
+arithmetic, so every Python version and platform reconstructs the same
+neighbour sets:
+
+    state  = seed mod 2**64
+    next() : state = (state + 0x9E3779B97F4A7C15) mod 2**64
+             z = state
+             z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) mod 2**64
+             z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) mod 2**64
+             return z ^ (z >> 31)
+    randbelow(n): draw next() until it is below 2**64 - (2**64 mod n),
+                  then return it mod n (unbiased rejection sampling)
+    degree       = drawn from the droplet's degree distribution with the same
+                   generator (see degree_distributions; the default uniform
+                   distribution is 1 + randbelow(min(3, num_chunks)))
+    indices      = Floyd's sample of `degree` distinct values from
+                   range(num_chunks): for j in num_chunks-degree .. num_chunks-1,
+                   t = randbelow(j + 1); take j if t was already taken, else t
+
+Decoders look neighbour sets up through `neighbour_cache`, a bounded LRU
+shared by every decode in the process, so retrying a decode over the same
+reads (say with a different ecc_bytes) does not regenerate them. Entries are
+stored as packed uint32 arrays to keep the cache compact.
+
+PRNG_LEGACY reproduces the original scheme (`random.seed(seed)` followed by
+`random.randint` / `random.sample`) on a private `random.Random` instance,
+so FASTA files written before the PRNG was recorded still decode. Its output
+depends on CPython's `random` implementation details, and it only supports
+the uniform degree distribution.
+"""
+import random
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List
+
+from degree_distributions import DIST_UNIFORM, resolve_distribution
+
+PRNG_LEGACY = 'legacy'
+PRNG_SPLITMIX64 = 'splitmix64'
+PRNG_SCHEMES = (PRNG_LEGACY, PRNG_SPLITMIX64)
+
+_MASK64 = (1 << 64) - 1
+
+
+class SplitMix64:
+    """Counter-based 64-bit generator (Steele, Lea & Flood 2014)."""
+
+    def __init__(self, seed: int):
+        self.state = seed & _MASK64
+
+    def next64(self) -> int:
+        self.state = (self.state + 0x9E3779B97F4A7C15) & _MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return z ^ (z >> 31)
+
+    def randbelow(self, n: int) -> int:
+        """Return an unbiased integer in [0, n)."""
+        limit = (1 << 64) - (1 << 64) % n
+        while True:
+            x = self.next64()
+            if x < limit:
+                return x % n
+
+    def sample(self, population: int, k: int) -> List[int]:
+        """Return k distinct integers from range(population) (Floyd's algorithm)."""
+        chosen = []
+        taken = set()
+        for j in range(population - k, population):
+            t = self.randbelow(j + 1)
+            if t in taken:
+                t = j
+            taken.add(t)
+            chosen.append(t)
+        return chosen
+
+
+def droplet_neighbours(seed: int, num_chunks: int, prng: str = PRNG_SPLITMIX64, distribution=None) -> List[int]:
+    """
+    Return the chunk indices XOR-ed into the droplet with the given seed.
+    Args:
+        seed: Droplet seed (stored in the strand).
+        num_chunks: Number of source chunks.
+        prng: PRNG_SPLITMIX64, or PRNG_LEGACY for files from the original scheme.
+        distribution: Degree distribution or spec string (default uniform).
+    Returns:
+        List of distinct chunk indices.
+    """
+    dist = resolve_distribution(distribution)
+    if prng == PRNG_SPLITMIX64:
+        rng = SplitMix64(seed)
+        degree = dist.sample(rng, num_chunks)
+        return rng.sample(num_chunks, degree)
+    if prng == PRNG_LEGACY:
+        if dist.name != DIST_UNIFORM:
+            raise ValueError("The legacy PRNG only supports the uniform degree distribution")
+        rng = random.Random(seed)
+        degree = rng.randint(1, min(dist.max_degree, num_chunks))
+        return rng.sample(range(num_chunks), degree)
+    raise ValueError(f"Unknown PRNG scheme: {prng}")
+
+
+DEFAULT_NEIGHBOUR_CACHE_SIZE = 1 << 18  # entries; roughly 250 bytes each
+
+
+class NeighbourCache:
+    """
+    Bounded, thread-safe LRU of droplet neighbour sets.
+    Args:
+        maxsize: Maximum number of entries (0 disables caching).
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_NEIGHBOUR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, seed: int, num_chunks: int, prng: str = PRNG_SPLITMIX64, distribution=None) -> List[int]:
+        """Same as droplet_neighbours, memoized on (seed, num_chunks, prng, distribution)."""
+        dist = resolve_distribution(distribution)
+        key = (seed, num_chunks, prng, dist.spec)
+        with self._lock:
+            packed = self._entries.get(key)
+            if packed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if packed is not None:
+            indices = array('I')
+            indices.frombytes(packed)
+            return indices.tolist()
+        indices = droplet_neighbours(seed, num_chunks, prng, dist)
+        with self._lock:
+            self.misses += 1
+            if self.maxsize > 0:
+                self._entries[key] = array('I', indices).tobytes()
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return indices
+
+    def resize(self, maxsize: int):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > max(maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+neighbour_cache = NeighbourCache()
@@ -0,0 +1,137 @@
+"""
+Droplet seed schemes.
+
+Every droplet is identified by a 32-bit seed, from which the decoder
+regenerates its neighbour set (see droplet_prng). The encoder picks seeds
+with one of these schemes, all driven by a master seed so that the same
+input and parameters always give the same strands:
+
+    SEED_PERMUTATION  seed i = P_key(i), where P_key is a keyed permutation
+                      of the 32-bit integers (a 4-round Feistel network on
+                      the two 16-bit halves of i). The default.
+    SEED_SEQUENTIAL   seed i = (start + i) mod 2**32, start taken from the key.
+    SEED_RANDOM       the original scheme: random.Random(master_seed).randint.
+                      Kept to reproduce older outputs; seeds can repeat, which
+                      wastes droplets (about n**2 / 2**33 repeats for n seeds).
+
+Permutation and sequential seeds never repeat (for up to 2**32 - 1
+droplets), and a decoder that knows the master seed can map any seed back
+to its position with seed_index, e.g. to tell which droplets of a known
+encoding are missing. METADATA_SEED is reserved for metadata strands and is
+skipped by every scheme, so the droplet at position n has counter n or n + 1.
+
+The master seed may be an integer or a string (object pools derive one per
+block); strings are hashed into the 64-bit key. With no master seed a
+random key is drawn, so output is still collision-free but not repeatable.
+"""
+import hashlib
+import os
+import random
+from typing import Iterator
+
+from droplet_prng import SplitMix64
+from strand_header import METADATA_SEED
+
+SEED_PERMUTATION = 'permutation'
+SEED_SEQUENTIAL = 'sequential'
+SEED_RANDOM = 'random'
+SEED_SCHEMES = (SEED_PERMUTATION, SEED_SEQUENTIAL, SEED_RANDOM)
+
+_MASK32 = 0xFFFFFFFF
+_ROUNDS = 4
+
+
+def check_seed_scheme(scheme: str) -> str:
+    if scheme not in SEED_SCHEMES:
+        raise ValueError(f"Unknown seed scheme: {scheme!r} (expected one of {', '.join(SEED_SCHEMES)})")
+    return scheme
+
+
+def seed_key(master_seed) -> int:
+    """64-bit key for a master seed (an int or a str); None draws a random key."""
+    if master_seed is None:
+        return int.from_bytes(os.urandom(8), 'little')
+    if isinstance(master_seed, int):
+        return master_seed & ((1 << 64) - 1)
+    return int.from_bytes(hashlib.sha256(str(master_seed).encode('utf-8')).digest()[:8], 'little')
+
+
+def _round_keys(key: int):
+    rng = SplitMix64(key)
+    return [rng.next64() & _MASK32 for _ in range(_ROUNDS)]
+
+
+def _feistel(half: int, round_key: int) -> int:
+    z = ((half ^ round_key) * 0x9E3779B1) & _MASK32
+    z ^= z >> 15
+    return ((z * 0x85EBCA77) & _MASK32) >> 16
+
+
+def permute(i: int, round_keys) -> int:
+    """Apply the keyed permutation to a 32-bit counter."""
+    left, right = i >> 16, i & 0xFFFF
+    for k in round_keys:
+        left, right = right, left ^ _feistel(right, k)
+    return (left << 16) | right
+
+
+def unpermute(seed: int, round_keys) -> int:
+    """Inverse of permute."""
+    left, right = seed >> 16, seed & 0xFFFF
+    for k in reversed(round_keys):
+        left, right = right ^ _feistel(left, k), left
+    return (left << 16) | right
+
+
+def iter_seeds(num_droplets: int = None, master_seed=None, scheme: str = SEED_PERMUTATION) -> Iterator[int]:
+    """
+    Yield droplet seeds.
+    Args:
+        num_droplets: How many (default: endlessly; at most 2**32 - 1 for
+            the collision-free schemes).
+        master_seed: Integer or string; None for a random key.
+        scheme: One of SEED_SCHEMES.
+    """
+    if check_seed_scheme(scheme) == SEED_RANDOM:
+        rng = random.Random(master_seed)
+        count = 0
+        while num_droplets is None or count < num_droplets:
+            count += 1
+            seed = rng.randint(0, 2**32 - 1)
+            while seed == METADATA_SEED:  # reserved for metadata strands
+                seed = rng.randint(0, 2**32 - 1)
+            yield seed
+        return
+    key = seed_key(master_seed)
+    if scheme == SEED_SEQUENTIAL:
+        start = key & _MASK32
+        seed_at = lambda i: (start + i) & _MASK32
+    else:
+        round_keys = _round_keys(key)
+        seed_at = lambda i: permute(i, round_keys)
+    count = 0
+    for i in range(1 << 32):
+        if num_droplets is not None and count >= num_droplets:
+            return
+        seed = seed_at(i)
+        if seed != METADATA_SEED:
+            count += 1
+            yield seed
+    if num_droplets is not None and count < num_droplets:
+        raise ValueError("A message cannot have more than 2**32 - 1 droplets")
+
+
+def seed_index(seed: int, master_seed, scheme: str = SEED_PERMUTATION) -> int:
+    """
+    Counter of a droplet seed under a collision-free scheme: the seed is the
+    one iter_seeds produced from counter i (its position, or one past it if
+    METADATA_SEED came earlier).
+    """
+    if master_seed is None:
+        raise ValueError("seed_index needs the master seed")
+    key = seed_key(master_seed)
+    if scheme == SEED_SEQUENTIAL:
+        return (seed - (key & _MASK32)) & _MASK32
+    if scheme == SEED_PERMUTATION:
+        return unpermute(seed, _round_keys(key))
+    raise ValueError(f"Seed scheme {scheme!r} cannot be inverted")
@@ -0,0 +1,111 @@
+"""
+Reed-Solomon error correction for droplets, with cached codecs and batch helpers.
+
+Building an RSCodec computes generator polynomials and Galois field tables,
+so codecs are cached per (ecc_bytes, nsize) and reused for every droplet.
+The compiled `creedsolo` backend is used when it is installed, falling back
+to the pure-Python `reedsolo` module.
+
+Both backends keep the active Galois field tables in module globals, so the
+tables are re-initialised whenever a codec over a different field (nsize
+above 255) is used after another one.
+"""
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import creedsolo as _rs
+except ImportError:
+    import reedsolo as _rs
+
+ReedSolomonError = _rs.ReedSolomonError
+
+BACKEND = _rs.__name__
+FAILED = -1  # correction count reported for droplets that could not be repaired
+
+_active_field = (0x11d, 2, 8)  # field the backend initialises on import
+
+
+@lru_cache(maxsize=None)
+def get_codec(ecc_bytes: int = 10, nsize: int = 255):
+    """Return the shared codec for (ecc_bytes, nsize)."""
+    codec = _rs.RSCodec(ecc_bytes, nsize=nsize)
+    global _active_field
+    _active_field = (codec.prim, codec.generator, codec.c_exp)
+    return codec
+
+
+def _activate(codec):
+    global _active_field
+    field = (codec.prim, codec.generator, codec.c_exp)
+    if field != _active_field:
+        _rs.init_tables(*field)
+        _active_field = field
+
+
+def encode(data: bytes, ecc_bytes: int = 10, nsize: int = 255) -> bytes:
+    codec = get_codec(ecc_bytes, nsize)
+    _activate(codec)
+    return bytes(codec.encode(data))
+
+
+def decode(data: bytes, ecc_bytes: int = 10, nsize: int = 255) -> Tuple[bytes, int]:
+    """
+    Decode one ECC-protected payload.
+    Returns:
+        (message, number of corrected symbols)
+    Raises:
+        ReedSolomonError: If the payload has too many errors.
+    """
+    codec = get_codec(ecc_bytes, nsize)
+    _activate(codec)
+    message, _, errata_pos = codec.decode(data)
+    return bytes(message), len(errata_pos)
+
+
+def encode_batch(payloads: Sequence[bytes], ecc_bytes: int = 10, nsize: int = 255) -> List[bytes]:
+    """Add ECC to a whole list of payloads with one codec."""
+    codec = get_codec(ecc_bytes, nsize)
+    _activate(codec)
+    rs_encode = codec.encode
+    return [bytes(rs_encode(payload)) for payload in payloads]
+
+
+def decode_batch(payloads: Sequence[bytes], ecc_bytes: int = 10, nsize: int = 255) -> Tuple[List[Optional[bytes]], List[int]]:
+    """
+    Remove ECC from a whole list of payloads with one codec.
+    Returns:
+        (messages, corrections): messages[i] is None and corrections[i] is
+        FAILED where the payload could not be repaired; otherwise
+        corrections[i] is the number of symbols corrected.
+    """
+    codec = get_codec(ecc_bytes, nsize)
+    _activate(codec)
+    rs_decode = codec.decode
+    messages = []
+    corrections = []
+    for payload in payloads:
+        try:
+            message, _, errata_pos = rs_decode(payload)
+        except Exception:
+            messages.append(None)
+            corrections.append(FAILED)
+            continue
+        messages.append(bytes(message))
+        corrections.append(len(errata_pos))
+    return messages, corrections
+
+
+def correction_summary(corrections: Sequence[int]) -> Dict[str, object]:
+    """Summarise per-droplet correction counts from decode_batch."""
+    total = len(corrections)
+    failed = sum(1 for c in corrections if c == FAILED)
+    repaired = [c for c in corrections if c != FAILED]
+    return {
+        'droplets': total,
+        'failed': failed,
+        'corrected_droplets': sum(1 for c in repaired if c),
+        'corrected_symbols': sum(repaired),
+        'histogram': dict(sorted(Counter(corrections).items())),
+    }
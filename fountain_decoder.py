@@ -0,0 +1,319 @@
+"""
+Belief-propagation (peeling) decoder for the fountain code.
+
+Each received droplet becomes an equation over the chunks it covers. The
+decoder keeps a chunk -> equations index and a ripple queue of equations
+with exactly one unknown chunk. Solving a chunk XORs it out of every
+equation that covers it, once, so the total work is proportional to the sum
+of droplet degrees instead of repeated passes over all equations.
+
+When the ripple runs dry before every chunk is known, the remaining
+equations are solved over GF(2) (solve_gf2: peeling with inactivation,
+then Gaussian elimination on the inactivated chunks only), so decoding
+succeeds whenever the received droplets span the chunk space.
+
+The decoder is incremental: droplets can be fed one at a time with
+add_droplet() as they are read, and the caller can stop reading as soon as
+is_complete() is true, then collect the message with result().
+"""
+import heapq
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from degree_distributions import resolve_distribution
+from droplet_prng import PRNG_SPLITMIX64, neighbour_cache
+from xor_kernel import pack, unpack, xor_rows
+
+
+class PeelingDecoder:
+    """
+    Peeling decoder over a fixed number of equal-sized chunks.
+    Args:
+        num_chunks: Number of source chunks.
+        chunk_size: Size of each chunk in bytes.
+        prng: Droplet PRNG scheme the droplets were encoded with.
+        distribution: Degree distribution (or spec) the droplets were encoded with.
+        progress: Optional callback(solved_chunks, num_chunks, droplets_used)
+            invoked whenever a chunk is recovered.
+    """
+
+    def __init__(self, num_chunks: int, chunk_size: int, prng: str = PRNG_SPLITMIX64, distribution=None,
+                 progress: Optional[Callable[[int, int, int], None]] = None):
+        self.num_chunks = num_chunks
+        self.chunk_size = chunk_size
+        self.prng = prng
+        self.distribution = resolve_distribution(distribution)
+        self.progress = progress
+        self.chunks: List[Optional[bytes]] = [None] * num_chunks
+        # solved chunks as packed words, for XOR (see xor_kernel)
+        self._words: List[Optional[int]] = [None] * num_chunks
+        self.solved_chunks = 0
+        self.droplets_received = 0
+        self.droplets_used = 0
+        # equation id -> [unknown chunk indices, packed payload]
+        self._equations = {}
+        self._next_equation = 0
+        # chunk index -> ids of pending equations that still cover it
+        self._chunk_equations = {}
+        self._ripple = deque()
+
+    def add_droplet(self, seed: int, payload: bytes) -> bool:
+        """
+        Add one droplet and peel as far as it allows.
+        Returns:
+            True once every chunk is solved; further droplets are ignored.
+        """
+        if self.solved_chunks == self.num_chunks:
+            return True
+        self.droplets_received += 1
+        if len(payload) == self.chunk_size:  # else malformed droplet
+            self._add_equation(neighbour_cache.get(seed, self.num_chunks, self.prng, self.distribution), payload)
+            self._peel()
+        return self.solved_chunks == self.num_chunks
+
+    def add_droplets(self, droplets: Iterable[Tuple[int, bytes]]) -> bool:
+        """Add droplets (or a DropletBatch) until every chunk is solved; returns is_complete()."""
+        for seed, payload in droplets:
+            if self.add_droplet(seed, payload):
+                return True
+        return self.is_complete()
+
+    def is_complete(self) -> bool:
+        return self.solved_chunks == self.num_chunks
+
+    def _add_equation(self, indices: List[int], payload: bytes):
+        payload = pack(payload)
+        unknown = set()
+        for i in indices:
+            value = self._words[i]
+            if value is None:
+                unknown.add(i)
+            else:
+                payload ^= value
+        if not unknown:
+            return  # redundant droplet
+        eq_id = self._next_equation
+        self._next_equation += 1
+        self._equations[eq_id] = [unknown, payload]
+        if len(unknown) == 1:
+            self._ripple.append(eq_id)
+        else:
+            for i in unknown:
+                self._chunk_equations.setdefault(i, []).append(eq_id)
+
+    def _peel(self):
+        while self._ripple:
+            equation = self._equations.pop(self._ripple.popleft(), None)
+            if equation is None:
+                continue  # already reduced to nothing by another ripple entry
+            unknown, payload = equation
+            i = unknown.pop()
+            if self.chunks[i] is not None:
+                continue  # solved by another ripple entry first
+            self._solve(i, payload)
+
+    def _solve(self, i: int, value: int):
+        self._words[i] = value
+        self.chunks[i] = unpack(value, self.chunk_size)
+        self.solved_chunks += 1
+        self.droplets_used += 1
+        for eq_id in self._chunk_equations.pop(i, ()):
+            equation = self._equations.get(eq_id)
+            if equation is None:
+                continue
+            unknown = equation[0]
+            unknown.discard(i)
+            equation[1] ^= value
+            if len(unknown) == 1:
+                self._ripple.append(eq_id)
+            elif not unknown:
+                del self._equations[eq_id]
+        if self.progress is not None:
+            self.progress(self.solved_chunks, self.num_chunks, self.droplets_used)
+
+    def solve_remaining(self) -> bool:
+        """
+        Solve the chunks peeling could not reach by Gaussian elimination.
+        Returns:
+            True if every chunk is now known.
+        """
+        if self.solved_chunks == self.num_chunks:
+            return True
+        covered = set()
+        for unknown, _ in self._equations.values():
+            covered.update(unknown)
+        if len(covered) < self.num_chunks - self.solved_chunks:
+            return False  # some chunk is in no remaining droplet
+        equations = list(self._equations.values())
+        solution = solve_gf2([unknown for unknown, _ in equations],
+                             [unpack(payload, self.chunk_size) for _, payload in equations], self.chunk_size)
+        if solution is None:
+            return False
+        self._equations.clear()
+        self._chunk_equations.clear()
+        for i, value in solution.items():
+            self.chunks[i] = value
+            self._words[i] = pack(value)
+        self.solved_chunks += len(solution)
+        self.droplets_used += len(equations)
+        if self.progress is not None:
+            self.progress(self.solved_chunks, self.num_chunks, self.droplets_used)
+        return True
+
+    def decoded(self, original_length: int) -> bytes:
+        if self.solved_chunks < self.num_chunks:
+            raise ValueError("Decoding failed: Not enough droplets.")
+        return b''.join(self.chunks)[:original_length]
+
+    def result(self, original_length: int = None) -> bytes:
+        """
+        Return the recovered message, first trying Gaussian elimination if
+        peeling stalled.
+        Args:
+            original_length: Length to truncate to (default: all chunks).
+        Raises:
+            ValueError: If the droplets so far do not determine every chunk.
+        """
+        self.solve_remaining()
+        if original_length is None:
+            original_length = self.num_chunks * self.chunk_size
+        return self.decoded(original_length)
+
+
+def solve_gf2(rows: Sequence[Iterable[int]], payloads: Sequence[bytes], chunk_size: int) -> Optional[Dict[int, bytes]]:
+    """
+    Solve a system of XOR equations over GF(2) by inactivation decoding.
+
+    Peeling continues symbolically: whenever no equation has a single
+    unknown left, the most widely used unknown of a lowest-degree equation
+    is inactivated (carried as a symbol) and peeling resumes. Every peeled
+    chunk is then a known payload XOR some inactive chunks, and only the
+    inactive chunks, usually a small fraction, go through dense elimination
+    (_solve_dense).
+    Args:
+        rows: For each equation, the chunk indices it covers.
+        payloads: For each equation, the XOR of those chunks.
+        chunk_size: Payload size in bytes.
+    Returns:
+        Mapping chunk index -> value for every chunk in the system, or None
+        if the equations do not have full rank.
+    """
+    active = [set(row) for row in rows]
+    if len(active) < len(set().union(*active)):
+        return None
+    values = [pack(payload) for payload in payloads]
+    symbols = [0] * len(active)  # bit k set: the equation includes inactive chunk k
+    column_equations: Dict[int, Set[int]] = {}
+    for eq, row in enumerate(active):
+        for chunk in row:
+            column_equations.setdefault(chunk, set()).add(eq)
+    ripple = deque(eq for eq, row in enumerate(active) if len(row) == 1)
+    by_degree = [(len(row), eq) for eq, row in enumerate(active) if len(row) > 1]
+    heapq.heapify(by_degree)
+    pending = set(range(len(active)))
+    peeled: Dict[int, int] = {}  # chunk -> equation it was solved from
+    inactive: List[int] = []
+
+    def eliminate(chunk: int, value: int, symbol: int, source: int = None):
+        for eq in column_equations.pop(chunk):
+            if eq == source:
+                continue
+            row = active[eq]
+            row.discard(chunk)
+            values[eq] ^= value
+            symbols[eq] ^= symbol
+            if len(row) == 1:
+                ripple.append(eq)
+            elif row:
+                heapq.heappush(by_degree, (len(row), eq))
+
+    while column_equations:
+        while ripple:
+            eq = ripple.popleft()
+            if eq not in pending or len(active[eq]) != 1:
+                continue  # solved already, or emptied into a check equation
+            chunk = next(iter(active[eq]))
+            pending.discard(eq)
+            peeled[chunk] = eq
+            eliminate(chunk, values[eq], symbols[eq], eq)
+        while by_degree and len(active[by_degree[0][1]]) != by_degree[0][0]:
+            heapq.heappop(by_degree)  # stale entry
+        if not by_degree:
+            break
+        eq = by_degree[0][1]
+        keep = min(active[eq], key=lambda chunk: len(column_equations[chunk]))
+        for chunk in sorted(active[eq] - {keep}, key=lambda chunk: -len(column_equations[chunk])):
+            eliminate(chunk, 0, 1 << len(inactive))
+            inactive.append(chunk)
+    if column_equations:
+        return None
+
+    # what is left pending has no active chunks: checks on the inactive ones
+    checks = sorted(pending)
+    solved = _solve_dense([symbols[eq] for eq in checks], [values[eq] for eq in checks], len(inactive), chunk_size)
+    if solved is None:
+        return None
+    result = {chunk: solved[k].tobytes() for k, chunk in enumerate(inactive)}
+    for chunk, eq in peeled.items():
+        value = values[eq]
+        if symbols[eq]:
+            value ^= pack(xor_rows(solved, _bit_indices(symbols[eq], len(inactive))).tobytes())
+        result[chunk] = unpack(value, chunk_size)
+    return result
+
+
+def _bit_indices(mask: int, width: int) -> np.ndarray:
+    bits = np.unpackbits(np.frombuffer(mask.to_bytes((width + 7) // 8, 'little'), dtype=np.uint8), bitorder='little')
+    return np.flatnonzero(bits)
+
+
+def _solve_dense(masks: Sequence[int], values: Sequence[int], num_cols: int, chunk_size: int) -> Optional[np.ndarray]:
+    """
+    Gaussian elimination over GF(2) on bit-mask equations.
+    Args:
+        masks: For each equation, the columns it covers as a bit mask.
+        values: For each equation, the packed XOR of those columns.
+        num_cols: Number of unknowns.
+        chunk_size: Payload size in bytes.
+    Returns:
+        (num_cols, chunk_size) uint8 array of the unknowns, or None if the
+        equations do not have full rank.
+    """
+    if len(masks) < num_cols:
+        return None
+    if num_cols == 0:
+        return np.zeros((0, chunk_size), dtype=np.uint8)
+    # bit-packed coefficient matrix: one row per equation, 64 columns per word
+    words = (num_cols + 63) // 64
+    coeffs = np.frombuffer(b''.join(mask.to_bytes(words * 8, 'little') for mask in masks),
+                           dtype='<u8').reshape(len(masks), words).astype(np.uint64)
+    payload = np.frombuffer(b''.join(unpack(value, chunk_size) for value in values),
+                            dtype=np.uint8).reshape(len(values), chunk_size).copy()
+    # XOR payload rows a word at a time when the chunk size allows it
+    payload_words = payload.view(np.uint64) if chunk_size % 8 == 0 else payload
+
+    # forward elimination: only rows below the pivot, only words from the pivot's on
+    for col in range(num_cols):
+        word, bit = divmod(col, 64)
+        has_bit = ((coeffs[col:, word] >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        candidates = np.flatnonzero(has_bit)
+        if candidates.size == 0:
+            return None
+        pivot = col + candidates[0]
+        if pivot != col:
+            coeffs[[col, pivot]] = coeffs[[pivot, col]]
+            payload_words[[col, pivot]] = payload_words[[pivot, col]]
+        targets = col + candidates[1:]
+        if targets.size:
+            coeffs[targets, word:] ^= coeffs[col, word:]
+            payload_words[targets] ^= payload_words[col]
+
+    # back-substitution on the upper-triangular rows
+    for col in range(num_cols - 1, 0, -1):
+        word, bit = divmod(col, 64)
+        targets = np.flatnonzero((coeffs[:col, word] >> np.uint64(bit)) & np.uint64(1))
+        if targets.size:
+            payload_words[targets] ^= payload_words[col]
+    return payload[:num_cols]
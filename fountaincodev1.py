@@ -172,7 +172,7 @@ def remove_error_correction(data: bytes, ecc_bytes: int = 10) -> bytes:
     rsc = RSCodec(ecc_bytes)
     return rsc.decode(data)[0]
 
-def decode_dna_fasta_to_image(fasta_file: str, output_image: str, chunk_size: int, ecc_bytes: int = 10):
+def decode_dna_fasta_to_image(fasta_file: str, output_image: str, chunk_size: int, ecc_bytes: int = 10, num_chunks: int = None):
     # 1. Load DNA sequences
     dna_sequences = load_dna_from_fasta(fasta_file)
 
@@ -190,21 +190,15 @@ def decode_dna_fasta_to_image(fasta_file: str, output_image: str, chunk_size: in
             continue  # skip if ECC fails
         droplets.append((seed, payload))
 
-    # 3. Use known num_chunks from encoding (should be passed as argument)
+    # 3. num_chunks must be the value used for encoding
     if not droplets:
         print("No valid droplets found.")
         return
 
     # 4. Fountain decode (single attempt with known num_chunks)
     try:
-        # num_chunks should be passed as an argument for robust decoding
-        # For now, infer from global or pass as needed
-        from inspect import currentframe
-        frame = currentframe()
-        # Try to get num_chunks from caller's local variables
-        num_chunks = frame.f_back.f_locals.get('num_chunks', None)
         if num_chunks is None:
-            print("num_chunks not found. Please pass num_chunks as an argument.")
+            print("num_chunks not given. Please pass num_chunks as an argument.")
             return
         print("Decoding with num_chunks:", num_chunks)
         decoded = fountain_decode(droplets, chunk_size, num_chunks, chunk_size * num_chunks)
@@ -268,4 +262,4 @@ if __name__ == "__main__":
 
 
     # Decode from FASTA and reconstruct image
-    decode_dna_fasta_to_image("model_dna_encoded.fasta", "output_imageFinal.jpg", chunk_size, ecc_bytes=10)
+    decode_dna_fasta_to_image("model_dna_encoded.fasta", "output_imageFinal.jpg", chunk_size, ecc_bytes=10, num_chunks=num_chunks)
@@ -1,14 +1,45 @@
-import random
 from typing import List, Tuple
 import zlib
 from PIL import Image
 import io
-from reedsolo import RSCodec
+import ecc
+from dna_codec import bytes_to_dna, dna_to_bytes, bytes_batch_to_dna, dna_batch_to_bytes, matrix_to_dna
+from droplet_batch import DropletBatch
+from droplet_prng import PRNG_LEGACY, PRNG_SCHEMES, PRNG_SPLITMIX64, droplet_neighbours
+from fountain_decoder import PeelingDecoder
+from degree_distributions import DIST_UNIFORM, resolve_distribution
+from xor_kernel import pack_chunks, unpack, xor_payloads, xor_words
+from parallel_pipeline import batched, decode_strands_parallel, default_workers, encode_seeds_parallel
+from sequence_io import read_records, write_fasta
+from strand_header import METADATA_SCAN, METADATA_SEED, build_header, find_header, interleave_metadata, metadata_strands
+from strand_index import read_address
+from dna_constraints import resolve_constraints
+from droplet_seeds import SEED_PERMUTATION, SEED_SCHEMES, check_seed_scheme, iter_seeds
+from itertools import chain
+import math
+import time
 
 # Binary to DNA mapping
 BIN_TO_DNA = {'00': 'A', '01': 'C', '10': 'G', '11': 'T'}
 DNA_TO_BIN = {v: k for k, v in BIN_TO_DNA.items()}
 
+# Payload format, recorded as "version=N" in every FASTA record header
+# alongside the droplet PRNG ("prng=...") and degree distribution
+# ("dist=..."). Untagged files written by this tool are the legacy format,
+# PRNG and distribution; untagged reads from a sequencer carry no such
+# information, so the decoder only assumes the legacy values when asked to.
+FORMAT_BITSTRING = 1  # zlib of the file's ASCII '0101...' bit-string (legacy)
+FORMAT_RAW = 2        # zlib of the raw file bytes
+FORMATS = (FORMAT_BITSTRING, FORMAT_RAW)
+
+LEGACY_PARAMS = {'version': FORMAT_BITSTRING, 'prng': PRNG_LEGACY, 'dist': DIST_UNIFORM}
+UNTAGGED_PARAMS = dict.fromkeys(LEGACY_PARAMS)  # "not recorded"
+
+# Bump whenever the same input and parameters would encode to different
+# strands (e.g. a change to seeds, droplets or the strand layout); cached
+# encode results (see result_cache) are keyed by it.
+CODEC_VERSION = 5
+
 def binary_to_image(binary_str, output_path):
     byte_data = bytearray(int(binary_str[i:i+8], 2) for i in range(0, len(binary_str), 8))
     with open(output_path, 'wb') as f:
@@ -20,71 +51,80 @@ def pad_chunk(chunk: bytes, size: int) -> bytes:
 
 # XOR multiple byte arrays
 def xor_bytes(arrays: List[bytes], size: int) -> bytes:
-    result = bytearray(pad_chunk(arrays[0], size))
-    for arr in arrays[1:]:
-        arr_padded = pad_chunk(arr, size)
-        for i in range(size):
-            result[i] ^= arr_padded[i]
-    return bytes(result)
+    return xor_payloads(arrays, size)
 
 def binary_to_dna(data):
-    mapping = {'00':'A', '01':'C', '10':'G', '11':'T'}
-    bits = ''.join(f"{byte:08b}" for byte in data)
-    dna = ''.join(mapping[bits[i:i+2]] for i in range(0, len(bits), 2))
-    return dna
-
-# Fountain Encode
-def fountain_encode(data: bytes, chunk_size: int, num_droplets: int) -> Tuple[List[Tuple[int, bytes]], int]:
-    chunks = [data[i:i+chunk_size] for i in range(0, len(data), chunk_size)]
-    num_chunks = len(chunks)
-    droplets = []
-
-    for _ in range(num_droplets):
-        seed = random.randint(0, 2**32 - 1)
-        random.seed(seed)
-        degree = random.randint(1, min(3, num_chunks))
-        indices = random.sample(range(num_chunks), degree)
-        selected_chunks = [chunks[i] for i in indices]
-        payload = xor_bytes(selected_chunks, chunk_size)
-        droplets.append((seed, payload))
-    
-    return droplets, num_chunks
+    return bytes_to_dna(data)
 
-# Fountain Decode
-def fountain_decode(droplets: List[Tuple[int, bytes]], chunk_size: int, num_chunks: int, original_length: int) -> bytes:
-    chunks = [None] * num_chunks
-    equations = []
+# Droplet seeds
+def iter_droplet_seeds(num_droplets: int = None, master_seed: int = None, seed_scheme: str = SEED_PERMUTATION):
+    """Yield 32-bit droplet seeds (endlessly if num_droplets is None); a fixed master_seed gives a fixed sequence (see droplet_seeds)."""
+    return iter_seeds(num_droplets, master_seed, seed_scheme)
 
-    for seed, payload in droplets:
-        random.seed(seed)
-        degree = random.randint(1, min(3, num_chunks))
-        indices = random.sample(range(num_chunks), degree)
-        equations.append((indices, bytearray(payload)))
+def draw_droplet_seeds(num_droplets: int, master_seed: int = None, seed_scheme: str = SEED_PERMUTATION) -> List[int]:
+    """Draw 32-bit droplet seeds; a fixed master_seed gives a fixed seed list."""
+    return list(iter_droplet_seeds(num_droplets, master_seed, seed_scheme))
 
-    progress = True
-    while progress:
-        progress = False
-        for indices, payload in equations:
-            known = [(i, chunks[i]) for i in indices if chunks[i] is not None]
-            unknown = [i for i in indices if chunks[i] is None]
-            if len(unknown) == 1:
-                i = unknown[0]
-                for j, value in known:
-                    for k in range(len(payload)):
-                        payload[k] ^= value[k]
-                chunks[i] = bytes(payload)
-                progress = True
+def droplets_from_seeds(words: List[int], chunk_size: int, seeds, prng: str = PRNG_SPLITMIX64, distribution=None) -> List[Tuple[int, bytes]]:
+    """Build the droplet for each seed from chunks packed with xor_kernel.pack_chunks."""
+    num_chunks = len(words)
+    distribution = resolve_distribution(distribution)
+    droplets = []
+    for seed in seeds:
+        indices = droplet_neighbours(seed, num_chunks, prng, distribution)
+        droplets.append((seed, unpack(xor_words(words, indices), chunk_size)))
+    return droplets
+
+def droplet_batch_from_seeds(words: List[int], chunk_size: int, seeds, prng: str = PRNG_SPLITMIX64, distribution=None) -> DropletBatch:
+    """Like droplets_from_seeds, but build a DropletBatch."""
+    seeds = list(seeds)
+    num_chunks = len(words)
+    distribution = resolve_distribution(distribution)
+    payloads = b''.join(unpack(xor_words(words, droplet_neighbours(seed, num_chunks, prng, distribution)), chunk_size)
+                        for seed in seeds)
+    return DropletBatch.from_payload_bytes(seeds, payloads, chunk_size)
 
-    if any(c is None for c in chunks):
-        raise ValueError("Decoding failed: Not enough droplets.")
+# Fountain Encode
+def fountain_encode(data: bytes, chunk_size: int, num_droplets: int, prng: str = PRNG_SPLITMIX64, distribution=None, master_seed: int = None, as_batch: bool = False, seed_scheme: str = SEED_PERMUTATION) -> Tuple[List[Tuple[int, bytes]], int]:
+    """
+    Generate num_droplets droplets from data, with seeds from master_seed
+    and seed_scheme (see droplet_seeds).
+    Returns:
+        (droplets, num_chunks); droplets is a DropletBatch if as_batch is
+        set, else a list of (seed, payload) tuples.
+    """
+    words = pack_chunks(data, chunk_size)
+    seeds = draw_droplet_seeds(num_droplets, master_seed, seed_scheme)
+    if as_batch:
+        return droplet_batch_from_seeds(words, chunk_size, seeds, prng, distribution), len(words)
+    return droplets_from_seeds(words, chunk_size, seeds, prng, distribution), len(words)
 
-    return b''.join(chunks)[:original_length]
+# Fountain Decode
+def fountain_decode(droplets: List[Tuple[int, bytes]], chunk_size: int, num_chunks: int, original_length: int, prng: str = PRNG_SPLITMIX64, distribution=None, progress=None) -> bytes:
+    """
+    Recover the message from droplets with the peeling decoder, falling back
+    to Gaussian elimination over GF(2) if peeling stalls.
+    Args:
+        droplets: (seed, payload) pairs, or a DropletBatch.
+        chunk_size: Size of each chunk in bytes.
+        num_chunks: Number of chunks.
+        original_length: Length of the message to return.
+        prng: Droplet PRNG scheme the droplets were encoded with.
+        distribution: Degree distribution (or spec) the droplets were encoded with.
+        progress: Optional callback(solved_chunks, num_chunks, droplets_used).
+    """
+    decoder = PeelingDecoder(num_chunks, chunk_size, prng, distribution, progress)
+    decoder.add_droplets(droplets)
+    if decoder.solved_chunks < num_chunks and decoder.solve_remaining():
+        print("Peeling stalled; solved the remaining chunks by Gaussian elimination")
+    decoded = decoder.decoded(original_length)
+    print(f"Recovered {num_chunks} chunks using {decoder.droplets_used} of {decoder.droplets_received} droplets read")
+    return decoded
 
 
 
 def image_to_binary(image_path):
-    with open(image_path, 'rb') as f:
-        data = f.read()
+    data = read_input(image_path)
     return ''.join(f'{byte:08b}' for byte in data)
 
 # def binary_to_dna(binary_str):
@@ -100,6 +140,22 @@ def readFile(path):
     with open(path, 'rb') as file:
         return file.read()
 
+def read_input(source) -> bytes:
+    """Read all bytes from a path, a binary file-like object, or bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        return source.read()
+    return readFile(source)
+
+def write_output(target, data: bytes):
+    """Write bytes to a path or a binary file-like object."""
+    if hasattr(target, 'write'):
+        target.write(data)
+        return
+    with open(target, 'wb') as f:
+        f.write(data)
+
 def writeFile(path, binary):
     with open(path, 'w') as file:
         file.write(binary)
@@ -110,260 +166,501 @@ def writeCompressedBinary(input_data: bytes, output_filename: str):
      #   f.write(compressed_data)
     return compressed_data;   
 
+def prepare_message(data: bytes, format_version: int = FORMAT_RAW) -> bytes:
+    """Compress file bytes into the message that gets fountain encoded."""
+    if format_version == FORMAT_BITSTRING:
+        data = ''.join(f'{byte:08b}' for byte in data).encode('ascii')
+    elif format_version != FORMAT_RAW:
+        raise ValueError(f"Unknown format version: {format_version}")
+    return zlib.compress(data)
+
+def restore_message(decompressed: bytes, format_version: int = FORMAT_RAW) -> bytes:
+    """Turn a decompressed message back into the original file bytes."""
+    if format_version == FORMAT_BITSTRING:
+        if not decompressed:
+            return b''
+        return int(decompressed, 2).to_bytes(len(decompressed) // 8, 'big')
+    if format_version != FORMAT_RAW:
+        raise ValueError(f"Unknown format version: {format_version}")
+    return decompressed
+
 def readAndDecompress(filename: str) -> bytes:
     with open(filename, 'rb') as f:
         compressed = f.read()
     return zlib.decompress(compressed)
 
 def add_error_correction(data: bytes, ecc_bytes: int = 10) -> bytes:
-    rsc = RSCodec(ecc_bytes)
-    return rsc.encode(data)
+    return ecc.encode(data, ecc_bytes)
 
 import struct
 
 def encode_droplets_to_dna(ecc_droplets) -> List[str]:
-    dna_sequences = []
-
-
-    for seed, payload in ecc_droplets:
-        # Serialize metadata: store the seed as 4 bytes (unsigned int)
-        meta = struct.pack('I', seed)
-        full_payload = meta + payload  # Metadata + ECC-protected data
-
-        dna_seq = binary_to_dna(full_payload)
-        dna_sequences.append(dna_seq)
-
-    return dna_sequences
+    # Serialize metadata: store the seed as 4 bytes (unsigned int), followed
+    # by the ECC-protected data, then map the whole batch to DNA at once.
+    if isinstance(ecc_droplets, DropletBatch):
+        return matrix_to_dna(ecc_droplets.strand_matrix())
+    full_payloads = [struct.pack('I', seed) + payload for seed, payload in ecc_droplets]
+    return bytes_batch_to_dna(full_payloads)
+
+def save_dna_to_fasta(dna_sequences: List[str], filename: str = "dna_droplets.fasta", format_version: int = None, prng: str = None, distribution: str = None):
+    """
+    Write DNA sequences as FASTA to a path (gzip if it ends in '.gz') or a
+    text or binary file-like object. dna_sequences may be any iterable,
+    including a generator; it is written out as it is consumed.
+    """
+    return write_fasta(filename, fasta_records(dna_sequences, format_version, prng, distribution))
+
+def fasta_records(dna_sequences, format_version: int = None, prng: str = None, distribution: str = None):
+    """(header, sequence) FASTA records for DNA sequences, with the parameter tags read back by _parse_header_params."""
+    tag = f" version={format_version}" if format_version is not None else ""
+    if prng is not None:
+        tag += f" prng={prng}"
+    if distribution is not None:
+        tag += f" dist={resolve_distribution(distribution).spec}"
+    return ((f"droplet_{i}{tag}", seq) for i, seq in enumerate(dna_sequences))
+
+def _parse_header_params(header: str = None, untagged: dict = LEGACY_PARAMS) -> dict:
+    """
+    Read the encoding parameters from a record header (without its '>' or
+    '@'). Tags missing from a tagged header take the legacy values; a header
+    with no tags at all gives `untagged`.
+    """
+    tags = {}
+    for field in (header or '').split()[1:]:
+        key, sep, value = field.partition('=')
+        if sep and key in LEGACY_PARAMS:
+            tags[key] = int(value) if key == 'version' else value
+    return {**LEGACY_PARAMS, **tags} if tags else dict(untagged)
 
-def save_dna_to_fasta(dna_sequences: List[str], filename: str = "dna_droplets.fasta"):
-    with open(filename, 'w') as f:
-        for i, seq in enumerate(dna_sequences):
-            f.write(f">droplet_{i}\n")
-            f.write(f"{seq}\n")
+def override_params(params: dict, format_version: int = None, prng: str = None, distribution=None) -> dict:
+    """Encoding parameters read from a file, with the ones given explicitly taking precedence."""
+    overrides = {'version': format_version, 'prng': prng, 'dist': distribution}
+    return {key: overrides[key] if overrides[key] is not None else value for key, value in params.items()}
 
 
 # --- Decoding from FASTA ---
 def dna_to_binary(dna: str) -> bytes:
     """Convert a DNA string back to bytes."""
-    mapping = {'A': '00', 'C': '01', 'G': '10', 'T': '11'}
-    bits = ''.join(mapping[base] for base in dna)
-    # Pad bits to a multiple of 8
-    if len(bits) % 8 != 0:
-        bits += '0' * (8 - len(bits) % 8)
-    return bytes(int(bits[i:i+8], 2) for i in range(0, len(bits), 8))
+    return dna_to_bytes(dna)
 
 def load_dna_from_fasta(filename: str) -> list:
     """Load DNA sequences from a FASTA file."""
-    sequences = []
-    with open(filename, 'r') as f:
-        seq = ''
-        for line in f:
-            if line.startswith('>'):
-                if seq:
-                    sequences.append(seq.strip())
-                    seq = ''
-            else:
-                seq += line.strip()
-        if seq:
-            sequences.append(seq.strip())
-    return sequences
+    return read_fasta(filename)[0]
 
-def remove_error_correction(data: bytes, ecc_bytes: int = 10) -> bytes:
-    rsc = RSCodec(ecc_bytes)
-    return rsc.decode(data)[0]
+def stream_sequences(source, untagged: dict = LEGACY_PARAMS):
+    """
+    Stream DNA sequences from FASTA or FASTQ without loading the whole file.
+    Args:
+        source: Path, or a text or binary file-like object; gzip-compressed
+            input is detected and decompressed on the fly.
+        untagged: Parameters to report if the first record header has no
+            tags: the legacy values, or UNTAGGED_PARAMS to get None for each.
+    Returns:
+        (sequences, params): an iterator over the sequences, and the
+        'version', 'prng' and 'dist' recorded in the first record header.
+    """
+    records = read_records(source)
+    first = next(records, None)
+    if first is None:
+        return iter(()), dict(untagged)
+    header, seq = first
+    return chain([seq], (seq for _, seq in records)), _parse_header_params(header, untagged)
+
+def read_fasta(source) -> Tuple[List[str], dict]:
+    """
+    Load DNA sequences and encoding parameters from FASTA (or FASTQ).
+    Args:
+        source: Path, or a text or binary file-like object.
+    Returns:
+        (sequences, params) where params holds the 'version', 'prng' and
+        'dist' recorded in the first record header (legacy values if untagged).
+    """
+    sequences, params = stream_sequences(source)
+    return list(sequences), params
 
-def decode_dna_fasta_to_image(fasta_file: str, output_image: str, chunk_size: int, ecc_bytes: int = 10):
-    # 1. Load DNA sequences
-    dna_sequences = load_dna_from_fasta(fasta_file)
+def remove_error_correction(data: bytes, ecc_bytes: int = 10) -> bytes:
+    return ecc.decode(data, ecc_bytes)[0]
 
-    # 2. Convert DNA to binary, extract seed and payload, remove ECC
-    droplets = []
-    for dna_seq in dna_sequences:
-        binary = dna_to_binary(dna_seq)
-        if len(binary) < 4:
+def dna_to_droplets(dna_sequences: List[str], ecc_bytes: int = 10, corrections: list = None) -> List[Tuple[int, bytes]]:
+    """
+    Map DNA strands back to (seed, payload) droplets, dropping unreadable ones.
+    Args:
+        dna_sequences: DNA strands.
+        ecc_bytes: Number of error correction bytes per droplet.
+        corrections: Optional list extended with the per-strand correction
+            counts from ecc.decode_batch (ecc.FAILED where ECC failed).
+    """
+    seeds = []
+    payloads = []
+    for binary in dna_batch_to_bytes(dna_sequences):
+        if binary is None or len(binary) < 4:
             continue  # skip invalid
         seed = int.from_bytes(binary[:4], 'little')
-        payload_ecc = binary[4:]
-        try:
-            payload = remove_error_correction(payload_ecc, ecc_bytes)
-        except Exception:
-            continue  # skip if ECC fails
-        droplets.append((seed, payload))
-
-    # 3. Use known num_chunks from encoding (should be passed as argument)
-    if not droplets:
-        print("No valid droplets found.")
-        return
+        if seed == METADATA_SEED:
+            continue  # metadata strand (see strand_header)
+        seeds.append(seed)
+        payloads.append(binary[4:])
+    messages, counts = ecc.decode_batch(payloads, ecc_bytes)
+    if corrections is not None:
+        corrections.extend(counts)
+    # skip droplets where ECC failed
+    return [(seed, payload) for seed, payload in zip(seeds, messages) if payload is not None]
+
+DECODE_BATCH = 256  # strands parsed and RS-decoded per batch; also how far decoding reads past completion
+
+def decode_strand_batch(dna_sequences: List[str], ecc_bytes: int = 10) -> Tuple[int, List[Tuple[int, bytes]], List[int]]:
+    """
+    Decode one batch of strands.
+    Returns:
+        (number of strands, valid droplets, per-strand correction counts)
+    """
+    corrections = []
+    droplets = dna_to_droplets(dna_sequences, ecc_bytes, corrections)
+    return len(dna_sequences), droplets, corrections
 
-    # 4. Fountain decode (single attempt with known num_chunks)
-    try:
-        # num_chunks should be passed as an argument for robust decoding
-        # For now, infer from global or pass as needed
-        from inspect import currentframe
-        frame = currentframe()
-        # Try to get num_chunks from caller's local variables
-        num_chunks = frame.f_back.f_locals.get('num_chunks', None)
-        if num_chunks is None:
-            print("num_chunks not found. Please pass num_chunks as an argument.")
-            return
-        decoded = fountain_decode(droplets, chunk_size, num_chunks, chunk_size * num_chunks)
-        try:
-            decompressed = zlib.decompress(decoded)
-            # Save decompressed binary
-            with open("binary1.dat", 'wb') as f:
-                f.write(decompressed)
-            # Save as image
-            binary_to_image(decompressed, output_image)
-            print(f"✅ Decoding and decompression successful! Image saved as {output_image}")
-            return
-        except Exception:
-            print("Decompression failed after decoding.")
-            return
-    except Exception as e:
-        print(f"❌ Decoding failed: {e}")
+def iter_droplets(dna_sequences, ecc_bytes: int = 10, stats: dict = None, workers: int = 1, batch_size: int = DECODE_BATCH):
+    """
+    Stream valid (seed, payload) droplets from DNA strands, batch by batch.
+    Args:
+        dna_sequences: DNA strands (any iterable; consumed lazily).
+        ecc_bytes: Number of error correction bytes per droplet.
+        stats: Optional dict updated with 'strands' (strands read so far)
+            and 'corrections' (per-strand counts from ecc.decode_batch).
+        workers: Number of processes parsing and RS-decoding strands;
+            droplets are yielded in input order either way.
+        batch_size: Strands per batch.
+    """
+    if stats is not None:
+        stats.setdefault('strands', 0)
+        stats.setdefault('corrections', [])
+    if workers > 1:
+        results = decode_strands_parallel(dna_sequences, ecc_bytes, workers, batch_size)
+    else:
+        results = (decode_strand_batch(batch, ecc_bytes) for batch in batched(dna_sequences, batch_size))
+    for strands, droplets, corrections in results:
+        if stats is not None:
+            stats['strands'] += strands
+            stats['corrections'].extend(corrections)
+        yield from droplets
+
+def decode_dna_fasta_to_image(fasta_file: str, output_image: str, chunk_size: int, ecc_bytes: int = 10, num_chunks: int = None):
+    """
+    Decode a FASTA file to an image. num_chunks is read from the metadata
+    strand when there is one, and must be passed otherwise.
+    """
+    decode_dna_to_image(fasta_file, output_image, chunk_size, num_chunks, ecc_bytes)
 
 def binary_to_image(binary_str, output_path):
     byte_data = bytearray(int(binary_str[i:i+8], 2) for i in range(0, len(binary_str), 8))
     with open(output_path, 'wb') as f:
         f.write(byte_data)
 
-# Example Usage
-if __name__ == "__main__":
-    
-    binary = image_to_binary("DNA.jpg")
-    with open("binary.dat", 'w') as f:
-        f.write(binary)
-
-    binary_data = readFile("binary.dat")
-    message = writeCompressedBinary(binary_data, "compressed_output.bin")
-    chunk_size = 32
-
-    chunks = [message[i:i+chunk_size] for i in range(0, len(message), chunk_size)]
-    num_chunks = len(chunks)
-    print(num_chunks)
-    redundancy_factor = 1.5
-    num_droplets = int(num_chunks * redundancy_factor * 20)
-    print(num_droplets)
-
-    # Encode
-    droplets, num_chunks = fountain_encode(message, chunk_size, num_droplets)
-    print(len(droplets))
-
-
-    ecc_droplets = [
-        (indices, add_error_correction(droplet))
-        for indices, droplet in droplets
-    ]
-
-    dna_sequences = encode_droplets_to_dna(ecc_droplets)
-
-    save_dna_to_fasta(dna_sequences, "model_dna_encoded.fasta")
-
+# --- API Functions ---
+def droplet_count(num_chunks: int, redundancy_factor: float = 1.5, overhead: float = None, min_extra: int = 0) -> int:
+    """
+    Number of droplets to generate for a message.
+    With `overhead` set, generate num_chunks * (1 + overhead) droplets;
+    otherwise keep the original num_chunks * redundancy_factor * 20. Either
+    way, generate at least num_chunks + min_extra: a fractional overhead
+    leaves a message of a few chunks only a few spare droplets.
+    """
+    if overhead is None:
+        count = int(num_chunks * redundancy_factor * 20)
+    elif overhead < 0:
+        raise ValueError("overhead must be >= 0")
+    else:
+        count = math.ceil(num_chunks * (1 + overhead))
+    return max(count, num_chunks + min_extra)
+
+def encode_bytes_to_dna(data: bytes, chunk_size: int = 32, ecc_bytes: int = 10, redundancy_factor: float = 1.5, format_version: int = FORMAT_RAW, prng: str = PRNG_SPLITMIX64, distribution=None, overhead: float = None, master_seed: int = None, workers: int = 1, constraints=None, seed_scheme: str = SEED_PERMUTATION) -> List[str]:
+    """
+    Encode file bytes to DNA sequences entirely in memory.
+    Args:
+        data: File contents.
+        chunk_size: Size of each chunk in bytes.
+        ecc_bytes: Number of error correction bytes per droplet.
+        redundancy_factor: Redundancy multiplier for droplets.
+        format_version: FORMAT_RAW compresses the file bytes directly;
+            FORMAT_BITSTRING reproduces the legacy bit-string payload.
+        prng: Droplet PRNG scheme (see droplet_prng).
+        distribution: Degree distribution or spec (see degree_distributions).
+        overhead: Extra droplets as a fraction of num_chunks; overrides
+            redundancy_factor when set.
+        master_seed: Seed for the droplet seeds; a fixed value (int or str)
+            gives the same strands on every run.
+        workers: Number of encoder processes; above 1 the droplets are
+            built in parallel (see parallel_pipeline) with identical output.
+        constraints: Strand screening rules or spec (see dna_constraints);
+            seeds whose strands break them are skipped.
+        seed_scheme: How droplet seeds derive from master_seed: the
+            collision-free 'permutation' (default) or 'sequential', or the
+            original 'random' (see droplet_seeds).
+    Returns:
+        List of DNA sequences: one per droplet, with copies of the
+        metadata strands (see strand_header) interleaved.
+    """
+    return list(stream_bytes_to_dna(data, chunk_size, ecc_bytes, redundancy_factor, format_version, prng, distribution, overhead, master_seed, workers, constraints, seed_scheme=seed_scheme))
 
-    # Decode from FASTA and reconstruct image
-    decode_dna_fasta_to_image("model_dna_encoded.fasta", "output_imageFinal.jpg", chunk_size, ecc_bytes=10)
+ENCODE_BATCH = 4096  # droplets built, ECC-protected and converted per batch
 
+def _no_progress(stage: str, done: int, total: int):
+    pass
+MAX_SCREENED_PER_DROPLET = 1000  # give up if constraints reject nearly every candidate
 
-# --- API Functions ---
-def encode_image_to_dna(image_path: str, fasta_output: str, chunk_size: int = 32, ecc_bytes: int = 10, redundancy_factor: float = 1.5) -> None:
+def stream_bytes_to_dna(data: bytes, chunk_size: int = 32, ecc_bytes: int = 10, redundancy_factor: float = 1.5, format_version: int = FORMAT_RAW, prng: str = PRNG_SPLITMIX64, distribution=None, overhead: float = None, master_seed: int = None, workers: int = 1, constraints=None, batch_size: int = ENCODE_BATCH, progress=None, seed_scheme: str = SEED_PERMUTATION, prefix: str = '', min_extra_droplets: int = 0):
+    """
+    Like encode_bytes_to_dna, but yield the DNA strands batch by batch, so
+    the droplets never all sit in memory at once. Copies of the metadata
+    strands are interleaved with the droplet strands (see strand_header).
+
+    progress, if given, is called as progress(stage, done, total) for the
+    stages 'compress' and 'droplets' (once per batch of droplets).
+    prefix is prepended to every strand (e.g. an object_store address),
+    before the strands are screened against the constraints.
+    min_extra_droplets is the least number of droplets written beyond
+    num_chunks (see droplet_count).
+    """
+    constraints = resolve_constraints(constraints)
+    check_seed_scheme(seed_scheme)
+    progress = progress or _no_progress
+    progress('compress', 0, 1)
+    message = prepare_message(data, format_version)
+    progress('compress', 1, 1)
+    header = build_header(message, len(data), chunk_size, ecc_bytes, format_version, prng, distribution)
+    num_chunks = header['num_chunks']
+    metadata = [prefix + dna for dna in metadata_strands(header, constraints, prefix)]
+    num_droplets = droplet_count(num_chunks, redundancy_factor, overhead, min_extra_droplets)
+    progress('droplets', 0, num_droplets)
+    seeds = iter_droplet_seeds(None if constraints else num_droplets, master_seed, seed_scheme)
+    if workers > 1:
+        batches = encode_seeds_parallel(message, chunk_size, seeds, ecc_bytes, prng, distribution, workers, batch_size)
+    else:
+        words = pack_chunks(message, chunk_size)
+        batches = (encode_droplets_to_dna(addECCInDroplets(droplet_batch_from_seeds(words, chunk_size, batch, prng, distribution), ecc_bytes))
+                   for batch in batched(seeds, batch_size))
+    strands = _droplet_strands(batches, num_droplets, constraints, progress, prefix)
+    try:
+        yield from interleave_metadata(strands, metadata, num_droplets)
+    finally:
+        strands.close()
+
+def _droplet_strands(batches, num_droplets: int, constraints, progress, prefix: str = ''):
+    """The first num_droplets prefixed strands of the batches that pass the constraints (all of them without)."""
+    if constraints is None:
+        done = 0
+        for strands in batches:
+            yield from (prefix + dna for dna in strands) if prefix else strands
+            done += len(strands)
+            progress('droplets', done, num_droplets)
+        return
+    accepted = candidates = 0
+    try:
+        for strands in batches:
+            if prefix:
+                strands = [prefix + dna for dna in strands]
+            for strand, ok in zip(strands, constraints.check(strands)):
+                candidates += 1
+                if ok:
+                    yield strand
+                    accepted += 1
+                    if accepted == num_droplets:
+                        progress('droplets', accepted, num_droplets)
+                        return
+            progress('droplets', accepted, num_droplets)
+            if candidates >= MAX_SCREENED_PER_DROPLET * num_droplets:
+                raise ValueError(f"Strand constraints {constraints.spec} rejected {candidates - accepted} of {candidates} candidate droplets")
+    finally:
+        batches.close()
+        rejected = candidates - accepted
+        print(f"Screening ({constraints.spec}): kept {accepted} of {candidates} candidate droplets, "
+              f"{rejected / max(candidates, 1):.1%} rejected")
+
+def encode_image_to_dna(image_path, fasta_output, chunk_size: int = 32, ecc_bytes: int = 10, redundancy_factor: float = 1.5, format_version: int = FORMAT_RAW, prng: str = PRNG_SPLITMIX64, distribution=None, overhead: float = None, master_seed: int = None, workers: int = 1, constraints=None, progress=None, seed_scheme: str = SEED_PERMUTATION) -> None:
     """
     Encode an image file to DNA sequences and save as FASTA.
     Args:
-        image_path: Path to input image file.
-        fasta_output: Path to output FASTA file.
+        image_path: Path to input image file, binary file-like object, or bytes.
+        fasta_output: Path to output FASTA file, or a text file-like object.
         chunk_size: Size of each chunk in bytes.
         ecc_bytes: Number of error correction bytes per droplet.
         redundancy_factor: Redundancy multiplier for droplets.
+        format_version: FORMAT_RAW compresses the file bytes directly;
+            FORMAT_BITSTRING reproduces the legacy bit-string payload.
+        prng: Droplet PRNG scheme (see droplet_prng).
+        distribution: Degree distribution or spec (see degree_distributions).
+        overhead: Extra droplets as a fraction of num_chunks; overrides
+            redundancy_factor when set.
+        master_seed: Seed for the droplet seeds (reproducible output).
+        workers: Number of encoder processes.
+        constraints: Strand screening rules or spec (see dna_constraints).
+        progress: Optional callback(stage, done, total) (see stream_bytes_to_dna).
+        seed_scheme: 'permutation' (default), 'sequential' or 'random' (see droplet_seeds).
     """
-    binary = image_to_binary(image_path)
-    
-    #convert binary to bytes
-    #binary_data = bytes(int(binary[i:i+8], 2) for i in range(0, len(binary), 8))
-    # print(binary)
-
-    with open("binary.dat", 'w') as f:
-        f.write(binary)
-    binary_data = readFile("binary.dat")
-    # print(binary_data)
-
-    message = writeCompressedBinary(binary_data, "compressed_output.bin")
-    chunks = [message[i:i+chunk_size] for i in range(0, len(message), chunk_size)]
-    num_chunks = len(chunks)
-    print(num_chunks)
-    num_droplets = int(num_chunks * redundancy_factor * 20)
-    droplets, num_chunks = fountain_encode(message, chunk_size, num_droplets)
-    print(num_chunks)
-    ecc_droplets = [
-        (indices, add_error_correction(droplet, ecc_bytes))
-        for indices, droplet in droplets
-    ]
-    dna_sequences = encode_droplets_to_dna(ecc_droplets)
-    save_dna_to_fasta(dna_sequences, fasta_output)
+    write_fasta(fasta_output, image_to_fasta_records(image_path, chunk_size, ecc_bytes, redundancy_factor, format_version, prng, distribution, overhead, master_seed, workers, constraints, progress, seed_scheme))
     return
 
-def decode_dna_to_image(fasta_file: str, output_image: str, chunk_size: int, num_chunks: int, ecc_bytes: int = 10) -> bool:
+def image_to_fasta_records(image_path, chunk_size: int = 32, ecc_bytes: int = 10, redundancy_factor: float = 1.5, format_version: int = FORMAT_RAW, prng: str = PRNG_SPLITMIX64, distribution=None, overhead: float = None, master_seed: int = None, workers: int = 1, constraints=None, progress=None, seed_scheme: str = SEED_PERMUTATION):
     """
-    Decode DNA sequences from FASTA and reconstruct the image.
+    Like encode_image_to_dna, but return the FASTA records as a generator
+    of (header, sequence) instead of writing them, e.g. to stream them as
+    an HTTP response. The input is read, and the constraints spec checked,
+    before this returns; the encoding itself runs as records are consumed.
+    """
+    data = read_input(image_path)
+    constraints = resolve_constraints(constraints)
+    check_seed_scheme(seed_scheme)
+    dna_sequences = stream_bytes_to_dna(data, chunk_size, ecc_bytes, redundancy_factor, format_version, prng, distribution, overhead, master_seed, workers, constraints, progress=progress, seed_scheme=seed_scheme)
+    return fasta_records(dna_sequences, format_version, prng, distribution or DIST_UNIFORM)
+
+def decode_dna_to_bytes(dna_sequences: List[str], chunk_size: int = None, num_chunks: int = None, ecc_bytes: int = None, format_version: int = None, prng: str = None, distribution=None, workers: int = 1, progress=None) -> bytes:
+    """
+    Decode DNA sequences back to the original file bytes entirely in memory.
+
+    When the strands include metadata strands (see strand_header), the
+    parameters they record are used and the arguments below are only needed
+    for files written without them. Those need at least chunk_size and
+    num_chunks, as with the original encoder; format_version, prng and
+    distribution not given take the original encoder's values
+    (LEGACY_PARAMS).
     Args:
-        fasta_file: Path to input FASTA file.
-        output_image: Path to output image file.
+        dna_sequences: DNA strands read from FASTA (any iterable; consumed lazily).
         chunk_size: Size of each chunk in bytes (must match encoding).
         num_chunks: Number of chunks (must match encoding).
-        ecc_bytes: Number of error correction bytes per droplet.
+        ecc_bytes: Number of error correction bytes per droplet (default 10).
+        format_version: Payload format the strands were encoded with.
+        prng: Droplet PRNG scheme the strands were encoded with.
+        distribution: Degree distribution (or spec) the strands were encoded with.
+        workers: Number of processes parsing and RS-decoding strands.
+        progress: Optional callback(stage, done, total), called for the
+            stages 'metadata', 'chunks' (solved of num_chunks) and 'decompress'.
+    Returns:
+        The original file bytes.
+    Raises:
+        ValueError: If the parameters are unknown, there are no valid
+            droplets, fountain decoding fails or the checksum does not match.
+        zlib.error: If the decoded message does not decompress.
+    """
+    progress = progress or _no_progress
+    progress('metadata', 0, 1)
+    header, dna_sequences = find_header(dna_sequences)
+    progress('metadata', 1, 1)
+    if header is not None:
+        print(f"Metadata: {header['num_chunks']} chunks of {header['chunk_size']} bytes, "
+              f"{header['ecc_bytes']} ECC bytes, {header['file_length']} byte file, dist={header['dist']}")
+        chunk_size, num_chunks, ecc_bytes = header['chunk_size'], header['num_chunks'], header['ecc_bytes']
+        format_version, prng, distribution = header['version'], header['prng'], header['dist']
+        message_length = header['message_length']
+    else:
+        missing = [name for name, value in (('chunk_size', chunk_size), ('num_chunks', num_chunks)) if value is None]
+        if missing:
+            raise ValueError(f"No metadata strand found in the first {METADATA_SCAN} reads; "
+                             f"{' and '.join(missing)} must be given.")
+        legacy = [name for name, value in (('format_version', format_version), ('prng', prng),
+                                           ('distribution', distribution)) if value is None]
+        format_version = LEGACY_PARAMS['version'] if format_version is None else format_version
+        prng = LEGACY_PARAMS['prng'] if prng is None else prng
+        distribution = LEGACY_PARAMS['dist'] if distribution is None else distribution
+        print(f"No metadata strand found; decoding {num_chunks} chunks of {chunk_size} bytes, "
+              f"format {format_version}, prng={prng}, dist={resolve_distribution(distribution).spec}"
+              + (f" ({', '.join(legacy)} assumed from the original encoder)" if legacy else ''))
+        message_length = chunk_size * num_chunks
+    if ecc_bytes is None:
+        ecc_bytes = 10
+
+    stats = {'strands': 0, 'corrections': []}
+    decoder = PeelingDecoder(num_chunks, chunk_size, prng, distribution,
+                             lambda solved, total, used: progress('chunks', solved, total))
+    progress('chunks', 0, num_chunks)
+    droplets = iter_droplets(dna_sequences, ecc_bytes, stats, workers)
+    start = time.perf_counter()
+    try:
+        for seed, payload in droplets:
+            if decoder.add_droplet(seed, payload):
+                print(f"All {num_chunks} chunks solved after {stats['strands']} reads; stopped reading")
+                break
+        else:
+            if decoder.droplets_received == 0:
+                raise ValueError("No valid droplets found.")
+            if decoder.solve_remaining():
+                print("Peeling stalled; solved the remaining chunks by Gaussian elimination")
+        decoded = decoder.decoded(message_length)
+        print(f"Recovered {num_chunks} chunks using {decoder.droplets_used} of {decoder.droplets_received} droplets read")
+    finally:
+        droplets.close()
+        elapsed = time.perf_counter() - start
+        summary = ecc.correction_summary(stats['corrections'])
+        print(f"ECC: {summary['droplets']} strands, {summary['corrected_droplets']} corrected "
+              f"({summary['corrected_symbols']} symbols), {summary['failed']} unrecoverable")
+        print(f"Decoded {stats['strands']} strands in {elapsed:.2f}s "
+              f"({stats['strands'] / max(elapsed, 1e-9):,.0f} strands/s, {workers} worker{'s' if workers > 1 else ''})")
+    if header is not None and zlib.crc32(decoded) != header['crc32']:
+        raise ValueError("Decoded message does not match the checksum in the metadata strand.")
+    progress('decompress', 0, 1)
+    data = restore_message(zlib.decompress(decoded), format_version)
+    progress('decompress', 1, 1)
+    return data
+
+def decode_dna_to_image(fasta_file, output_image, chunk_size: int = None, num_chunks: int = None, ecc_bytes: int = None, workers: int = 1, address: int = None, format_version: int = None, prng: str = None, distribution=None) -> bool:
+    """
+    Decode DNA sequences from FASTA and reconstruct the image.
+    Args:
+        fasta_file: Path to input FASTA/FASTQ file (optionally gzipped), or a file-like object.
+        output_image: Path to output image file, or a binary file-like object.
+        chunk_size: Size of each chunk in bytes; only needed for files
+            without a metadata strand.
+        num_chunks: Number of chunks; only needed for files without a
+            metadata strand.
+        ecc_bytes: Number of error correction bytes per droplet (default 10
+            for files without a metadata strand).
+        workers: Number of processes parsing and RS-decoding strands.
+        address: Decode only the strands with this address prefix (an
+            object_store block); uses the file's read index when it has one
+            (see strand_index).
+        format_version, prng, distribution: Encoding parameters for files
+            without a metadata strand, overriding the FASTA record tags
+            (untagged files from this tool: FORMAT_BITSTRING, PRNG_LEGACY
+            and DIST_UNIFORM).
     Returns:
         True if decoding and decompression successful, else False.
     """
-    dna_sequences = load_dna_from_fasta(fasta_file)
-    droplets = []
-    for dna_seq in dna_sequences:
-        binary = dna_to_binary(dna_seq)
-        if len(binary) < 4:
-            continue
-        seed = int.from_bytes(binary[:4], 'little')
-        payload_ecc = binary[4:]
-        try:
-            payload = remove_error_correction(payload_ecc, ecc_bytes)
-        except Exception:
-            continue
-        droplets.append((seed, payload))
-    if not droplets:
-        print("No valid droplets found.")
-        return False
+    if address is not None:
+        dna_sequences, params = read_address(fasta_file, address), dict(UNTAGGED_PARAMS)
+    else:
+        dna_sequences, params = stream_sequences(fasta_file, UNTAGGED_PARAMS)
+    params = override_params(params, format_version, prng, distribution)
     try:
-        decoded = fountain_decode(droplets, chunk_size, num_chunks, chunk_size * num_chunks)
-        try:
-            decompressed = zlib.decompress(decoded)
-            with open("binary1.dat", 'wb') as f:
-                f.write(decompressed)
-            binary_to_image(decompressed, output_image)
-            print(f"✅ Decoding and decompression successful! Image saved as {output_image}")
-            return True
-        except Exception:
-            print("Decompression failed after decoding.")
-            return False
-    except Exception as e:
+        image_data = decode_dna_to_bytes(dna_sequences, chunk_size, num_chunks, ecc_bytes, params['version'], params['prng'], params['dist'], workers)
+    except zlib.error:
+        print("Decompression failed after decoding.")
+        return False
+    except ValueError as e:
         print(f"❌ Decoding failed: {e}")
         return False
+    write_output(output_image, image_data)
+    print(f"✅ Decoding and decompression successful! Image saved as {output_image}")
+    return True
     
 
 # --- API Functions ---
-def compressAndEncode(binary_path: str, chunk_size: int = 32, redundancy_factor: float = 1.5) -> None:
+def compressAndEncode(binary_path, chunk_size: int = 32, redundancy_factor: float = 1.5, distribution=None, overhead: float = None) -> None:
     """
     Compress and encode a binary file into fountain code droplets.
     Args:
-        binary_path: Path to the input binary file.
+        binary_path: Path to the input binary file, binary file-like object, or bytes.
         chunk_size: Size of each data chunk.
         redundancy_factor: Redundancy factor for the fountain code.
+        distribution: Degree distribution or spec (see degree_distributions).
+        overhead: Extra droplets as a fraction of num_chunks; overrides
+            redundancy_factor when set.
     """
 
-    with open(binary_path, 'rb') as f:
-        binary_data = f.read()
+    binary_data = read_input(binary_path)
 
     message = writeCompressedBinary(binary_data, "compressed_output.bin")
     chunks = [message[i:i+chunk_size] for i in range(0, len(message), chunk_size)]
     num_chunks = len(chunks)
-    num_droplets = int(num_chunks * redundancy_factor * 20)
-    droplets, num_chunks = fountain_encode(message, chunk_size, num_droplets)
+    num_droplets = droplet_count(num_chunks, redundancy_factor, overhead)
+    droplets, num_chunks = fountain_encode(message, chunk_size, num_droplets, distribution=distribution)
 
     return droplets, num_chunks
     # ecc_droplets = [
@@ -381,13 +678,102 @@ def addECCInDroplets(droplets: List[Tuple[int, bytes]], ecc_bytes: int) -> List[
     """
     Add error correction code (ECC) to each droplet.
     Args:
-        droplets: List of droplets to encode.
+        droplets: List of droplets to encode, or a DropletBatch.
         ecc_bytes: Number of error correction bytes to add.
     Returns:
-        List of droplets with ECC added.
+        Droplets with ECC added, in the same form they were given.
     """
+    if isinstance(droplets, DropletBatch):
+        return droplets.with_payloads(ecc.encode_batch(droplets.payload_list(), ecc_bytes))
+    payloads = ecc.encode_batch([droplet for _, droplet in droplets], ecc_bytes)
+    return [(indices, payload) for (indices, _), payload in zip(droplets, payloads)]
+
+
+# Example Usage
+def run_example():
+    message = prepare_message(readFile("DNA.jpg"), FORMAT_BITSTRING)
+    chunk_size = 32
+
+    chunks = [message[i:i+chunk_size] for i in range(0, len(message), chunk_size)]
+    num_chunks = len(chunks)
+    redundancy_factor = 1.5
+    num_droplets = droplet_count(num_chunks, redundancy_factor)
+    print(num_droplets)
+
+    # Encode
+    droplets, num_chunks = fountain_encode(message, chunk_size, num_droplets)
+    print(len(droplets))
+
+
     ecc_droplets = [
-        (indices, add_error_correction(droplet, ecc_bytes))
+        (indices, add_error_correction(droplet))
         for indices, droplet in droplets
     ]
-    return ecc_droplets
+
+    dna_sequences = encode_droplets_to_dna(ecc_droplets)
+
+    save_dna_to_fasta(dna_sequences, "model_dna_encoded.fasta", FORMAT_BITSTRING, PRNG_SPLITMIX64)
+
+
+    # Decode from FASTA and reconstruct image
+    decode_dna_fasta_to_image("model_dna_encoded.fasta", "output_imageFinal.jpg", chunk_size, ecc_bytes=10, num_chunks=num_chunks)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Store files in DNA with fountain codes.")
+    sub = parser.add_subparsers(dest='command')
+
+    enc = sub.add_parser('encode', help="encode a file to FASTA")
+    enc.add_argument('input')
+    enc.add_argument('fasta_output')
+    enc.add_argument('--chunk-size', type=int, default=32)
+    enc.add_argument('--ecc-bytes', type=int, default=10)
+    enc.add_argument('--redundancy-factor', type=float, default=1.5)
+    enc.add_argument('--overhead', type=float, default=None)
+    enc.add_argument('--distribution', default=None, help="degree distribution spec, e.g. robust_soliton:c=0.1,delta=0.05")
+    enc.add_argument('--master-seed', type=int, default=None, help="fixed seed for reproducible output")
+    enc.add_argument('--seed-scheme', choices=SEED_SCHEMES, default=SEED_PERMUTATION,
+                     help="how droplet seeds derive from the master seed (permutation and sequential never repeat a seed)")
+    enc.add_argument('--workers', type=int, default=1, help="encoder processes (0 = one per CPU)")
+    enc.add_argument('--screen', default=None, metavar='SPEC',
+                     help="reject strands breaking GC/homopolymer limits, e.g. 'default' or max_run=3,gc_min=0.4,gc_max=0.6,window=50")
+
+    dec = sub.add_parser('decode', help="decode a FASTA file")
+    dec.add_argument('fasta_input')
+    dec.add_argument('output')
+    dec.add_argument('--chunk-size', type=int, default=None, help="only for files without a metadata strand")
+    dec.add_argument('--num-chunks', type=int, default=None, help="only for files without a metadata strand")
+    dec.add_argument('--ecc-bytes', type=int, default=None, help="only for files without a metadata strand (default 10)")
+    dec.add_argument('--format', type=int, choices=FORMATS, default=None, dest='format_version',
+                     help="only for files without a metadata strand or FASTA tags (default 1, as the original encoder)")
+    dec.add_argument('--prng', choices=PRNG_SCHEMES, default=None,
+                     help="only for files without a metadata strand or FASTA tags (default legacy, as the original encoder)")
+    dec.add_argument('--distribution', default=None,
+                     help="only for files without a metadata strand or FASTA tags (default uniform, as the original encoder)")
+    dec.add_argument('--workers', type=int, default=1, help="RS-decoding processes (0 = one per CPU)")
+    dec.add_argument('--address', type=int, default=None, help="decode only strands with this address prefix")
+
+    sub.add_parser('example', help="round-trip DNA.jpg through the bit-string format")
+
+    args = parser.parse_args(argv)
+    if args.command == 'encode':
+        workers = args.workers or default_workers()
+        encode_image_to_dna(args.input, args.fasta_output, args.chunk_size, args.ecc_bytes, args.redundancy_factor,
+                            distribution=args.distribution, overhead=args.overhead,
+                            master_seed=args.master_seed, workers=workers, constraints=args.screen,
+                            seed_scheme=args.seed_scheme)
+    elif args.command == 'decode':
+        if not decode_dna_to_image(args.fasta_input, args.output, args.chunk_size, args.num_chunks, args.ecc_bytes,
+                                   args.workers or default_workers(), args.address,
+                                   args.format_version, args.prng, args.distribution):
+            raise SystemExit(1)
+    elif args.command == 'example':
+        run_example()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
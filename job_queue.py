@@ -0,0 +1,257 @@
+"""
+Background encode/decode jobs for the API.
+
+Encoding or decoding a large file takes far longer than a proxy will hold a
+request open, so the API can queue the work instead: submitting returns a
+job id at once, a bounded pool of local worker processes runs the pipeline,
+and the client polls the job and downloads the result when it is done.
+
+Jobs live on the filesystem, one directory per job under the store root:
+
+    <root>/<job_id>/job.json   status document (rewritten atomically)
+    <root>/<job_id>/input      uploaded file
+    <root>/<job_id>/result     output, once the job is done
+
+so every gunicorn worker can report on and serve any job, whichever worker
+accepted it. Status documents look like
+
+    {"id": ..., "kind": "encode", "status": "running", "stage": "droplets",
+     "stages": {"compress": {"done": 1, "total": 1},
+                "droplets": {"done": 8192, "total": 56250}}, ...}
+
+with status one of queued, running, done or failed (with an "error"
+message). Jobs are run by the process that accepted them; a job whose
+process died stays queued/running until it expires. Jobs are removed
+JOB_TTL seconds after they finish (or, if they never do, were created).
+
+Settings come from the environment: DNA_JOB_DIR (store root),
+DNA_JOB_WORKERS (pool size, default 2), DNA_JOB_QUEUE (jobs one process
+accepts before refusing more, default 16) and DNA_JOB_TTL (seconds).
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+JOB_ROOT = os.environ.get('DNA_JOB_DIR', os.path.join(tempfile.gettempdir(), 'dna_jobs'))
+JOB_WORKERS = int(os.environ.get('DNA_JOB_WORKERS', 2))
+JOB_QUEUE = int(os.environ.get('DNA_JOB_QUEUE', 16))
+JOB_TTL = int(os.environ.get('DNA_JOB_TTL', 24 * 3600))
+PROGRESS_INTERVAL = 0.5  # seconds between progress writes within a stage
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+JOB_KINDS = ('encode', 'decode')
+RESULT_NAMES = {'encode': 'dna_encoded.fasta', 'decode': 'decoded_image.jpg'}
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFull(Exception):
+    """Raised when a process already has JOB_QUEUE unfinished jobs."""
+
+
+class JobStore:
+    """Job directories under a root directory."""
+
+    def __init__(self, root: str = JOB_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> str:
+        if not _JOB_ID.match(job_id):
+            raise KeyError(job_id)
+        return os.path.join(self.root, job_id)
+
+    def input_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'input')
+
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'result')
+
+    def create(self, kind: str, params: dict, source) -> dict:
+        """
+        Store a new queued job.
+        Args:
+            kind: 'encode' or 'decode'.
+            params: JSON-serializable keyword arguments for the pipeline.
+            source: Uploaded input, as a binary file-like object or bytes.
+        Returns:
+            The job document.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        with open(self.input_path(job_id), 'wb') as f:
+            if isinstance(source, (bytes, bytearray)):
+                f.write(source)
+            else:
+                shutil.copyfileobj(source, f)
+        job = {'id': job_id, 'kind': kind, 'params': params, 'status': QUEUED,
+               'stage': None, 'stages': {}, 'error': None,
+               'created': time.time(), 'started': None, 'finished': None}
+        self.save(job)
+        return job
+
+    def save(self, job: dict):
+        path = os.path.join(self.job_dir(job['id']), 'job.json')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """The job document, or None if there is no such job."""
+        try:
+            with open(os.path.join(self.job_dir(job_id), 'job.json')) as f:
+                return json.load(f)
+        except (KeyError, OSError, ValueError):
+            return None
+
+    def purge(self, max_age: float = JOB_TTL) -> int:
+        """Delete jobs that finished (or were created) more than max_age seconds ago; returns how many."""
+        cutoff = time.time() - max_age
+        removed = 0
+        for job_id in os.listdir(self.root):
+            job = self.get(job_id)
+            if job is not None and (job['finished'] or job['created']) < cutoff:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+                removed += 1
+        return removed
+
+
+class _ProgressWriter:
+    """progress(stage, done, total) callback that records progress in the job document."""
+
+    def __init__(self, store: JobStore, job: dict):
+        self.store = store
+        self.job = job
+        self.last_write = 0.0
+
+    def __call__(self, stage: str, done: int, total: int):
+        job = self.job
+        job['stages'][stage] = {'done': done, 'total': total}
+        now = time.monotonic()
+        if stage != job['stage'] or done >= total or now - self.last_write >= PROGRESS_INTERVAL:
+            job['stage'] = stage
+            self.store.save(job)
+            self.last_write = now
+
+
+def run_job(root: str, job_id: str) -> str:
+    """
+    Run one job to completion, recording its progress in the store. Runs in
+    a pool worker process.
+    Returns:
+        The final status.
+    """
+    from fountaincodev2 import (UNTAGGED_PARAMS, decode_dna_to_bytes, encode_image_to_dna, override_params,
+                                stream_sequences, write_output)
+
+    store = JobStore(root)
+    job = store.get(job_id)
+    if job is None:
+        return FAILED  # expired before it ran
+    job['status'] = RUNNING
+    job['started'] = time.time()
+    store.save(job)
+    progress = _ProgressWriter(store, job)
+    result_path = store.result_path(job_id)
+    tmp = result_path + '.tmp'
+    params = job['params']
+    try:
+        if job['kind'] == 'encode':
+            encode_image_to_dna(store.input_path(job_id), tmp, progress=progress, **params)
+        else:
+            dna_sequences, header_params = stream_sequences(store.input_path(job_id), UNTAGGED_PARAMS)
+            header_params = override_params(header_params, params.get('format_version'), params.get('prng'),
+                                            params.get('distribution'))
+            data = decode_dna_to_bytes(dna_sequences, params.get('chunk_size'), params.get('num_chunks'),
+                                       params.get('ecc_bytes'), header_params['version'], header_params['prng'],
+                                       header_params['dist'], params.get('workers', 1), progress=progress)
+            write_output(tmp, data)
+        os.replace(tmp, result_path)
+        job['status'] = DONE
+    except Exception as e:
+        job['status'] = FAILED
+        job['error'] = f"{type(e).__name__}: {e}"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    job['finished'] = time.time()
+    store.save(job)
+    return job['status']
+
+
+class JobQueue:
+    """
+    Bounded local worker pool feeding on a JobStore.
+    Args:
+        store: Where jobs are kept.
+        workers: Worker processes running jobs.
+        max_pending: Unfinished jobs this process accepts before submit
+            raises QueueFull.
+    """
+
+    def __init__(self, store: JobStore = None, workers: int = JOB_WORKERS, max_pending: int = JOB_QUEUE):
+        self.store = store or JobStore()
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # created on first use, so that forking gunicorn workers do not inherit it
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, kind: str, params: dict, source) -> dict:
+        """
+        Store a job and queue it on the worker pool.
+        Returns:
+            The queued job document.
+        Raises:
+            QueueFull: If max_pending jobs are already unfinished.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs already queued")
+            self._pending += 1
+        try:
+            self.store.purge()
+            job = self.store.create(kind, params, source)
+            try:
+                future = self._pool().submit(run_job, self.store.root, job['id'])
+            except BrokenProcessPool:
+                # a worker process died; start a fresh pool
+                self._executor = None
+                future = self._pool().submit(run_job, self.store.root, job['id'])
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(lambda f, job_id=job['id']: self._release(job_id, f))
+        return job
+
+    def _release(self, job_id: Optional[str], future=None):
+        with self._lock:
+            self._pending -= 1
+        if future is not None and future.exception() is not None:
+            # the worker process died before it could record the outcome
+            job = self.store.get(job_id)
+            if job is not None and job['status'] in (QUEUED, RUNNING):
+                job.update(status=FAILED, error=f"{type(future.exception()).__name__}: {future.exception()}",
+                           finished=time.time())
+                self.store.save(job)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,288 @@
+"""
+Multi-file object store on top of the fountain pipeline.
+
+A pool holds any number of objects (files). Their bytes are laid end to end
+in one logical stream, which is cut into fixed-size blocks; small files
+share a block and large files span several. Every block is encoded as its
+own fountain code (with its own metadata strands, see strand_header), so it
+decodes independently of the others.
+
+Each strand in the pool is prefixed with the address of its block (see
+strand_index for the prefix and the on-disk read index). Address INDEX_ADDRESS holds
+the pool index, a JSON document listing every object's name, offset in the
+logical stream, length and CRC-32. Reading an object, or a byte range of
+one, decodes the index and then only the blocks that overlap the range.
+When the pool file has an up-to-date read index, only the reads of those
+blocks are read from disk; otherwise the file is scanned for their prefixes.
+
+Usage:
+    python object_store.py pack pool.fasta photo.jpg notes.txt --block-size 65536 --index
+    python object_store.py index pool.fasta
+    python object_store.py list pool.fasta
+    python object_store.py get pool.fasta notes.txt notes_copy.txt
+"""
+import argparse
+import json
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from droplet_seeds import SEED_PERMUTATION, SEED_SCHEMES
+from fountaincodev2 import FORMAT_RAW, decode_dna_to_bytes, stream_bytes_to_dna, write_output
+from sequence_io import read_sequences, write_fasta
+from strand_index import ADDRESS_LENGTH, address_prefix, build_index as build_read_index, load_index, read_address
+
+POOL_FORMAT = 1
+INDEX_ADDRESS = 0
+DEFAULT_BLOCK_SIZE = 64 * 1024
+MIN_EXTRA_DROPLETS = 32  # spare droplets per block whatever the overhead, for small blocks like the index
+READ_SIZE = 1 << 20
+
+
+def _describe(name: str, source) -> dict:
+    """Length and CRC-32 of an object, read in bounded pieces."""
+    length = 0
+    crc = 0
+    for piece in _read_pieces(source):
+        length += len(piece)
+        crc = zlib.crc32(piece, crc)
+    return {'name': name, 'length': length, 'crc32': crc}
+
+
+def _read_pieces(source) -> Iterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source)
+        return
+    with open(source, 'rb') as f:
+        while True:
+            piece = f.read(READ_SIZE)
+            if not piece:
+                return
+            yield piece
+
+
+def _iter_blocks(sources: Iterable, block_size: int) -> Iterator[bytes]:
+    """Cut the concatenation of all sources into block_size pieces."""
+    pending = bytearray()
+    for source in sources:
+        for piece in _read_pieces(source):
+            pending += piece
+            while len(pending) >= block_size:
+                yield bytes(pending[:block_size])
+                del pending[:block_size]
+    if pending:
+        yield bytes(pending)
+
+
+def _block_seed(master_seed, address: int):
+    return None if master_seed is None else f"{master_seed}/{address}"
+
+
+def _encode_block(address: int, data: bytes, encode_kwargs: dict, master_seed) -> Iterator[Tuple[str, str]]:
+    # prefixed before screening, so any constraints apply to the strands as written
+    strands = stream_bytes_to_dna(data, master_seed=_block_seed(master_seed, address), prefix=address_prefix(address),
+                                  **encode_kwargs)
+    for i, dna in enumerate(strands):
+        yield f"block_{address:08x}_{i}", dna
+
+
+def build_index(objects: Dict[str, object], block_size: int = DEFAULT_BLOCK_SIZE) -> dict:
+    """
+    Lay objects out in the logical stream.
+    Args:
+        objects: Object name -> bytes or path, in pool order.
+        block_size: Bytes of the logical stream per block.
+    Returns:
+        The pool index.
+    """
+    entries = []
+    offset = 0
+    for name, source in objects.items():
+        entry = _describe(name, source)
+        entry['offset'] = offset
+        offset += entry['length']
+        entries.append(entry)
+    return {
+        'format': POOL_FORMAT,
+        'block_size': block_size,
+        'num_blocks': -(-offset // block_size),
+        'objects': entries,
+    }
+
+
+def pool_records(objects: Dict[str, object], block_size: int = DEFAULT_BLOCK_SIZE, master_seed: int = None, **encode_kwargs) -> Tuple[dict, Iterator[Tuple[str, str]]]:
+    """
+    Encode objects into a pool.
+    Args:
+        objects: Object name -> bytes or path, in pool order.
+        block_size: Bytes of the logical stream per block.
+        master_seed: Seed for reproducible output; each block derives its
+            own droplet seeds from it.
+        encode_kwargs: chunk_size, ecc_bytes, redundancy_factor, prng,
+            distribution, overhead, workers, constraints, seed_scheme and
+            min_extra_droplets (default MIN_EXTRA_DROPLETS), as for
+            stream_bytes_to_dna.
+    Returns:
+        (index, iterator over (FASTA header, strand) records); the index
+        block comes first, then the data blocks in address order.
+    """
+    encode_kwargs.setdefault('format_version', FORMAT_RAW)
+    encode_kwargs.setdefault('min_extra_droplets', MIN_EXTRA_DROPLETS)
+    index = build_index(objects, block_size)
+
+    def records():
+        index_data = json.dumps(index, separators=(',', ':')).encode('utf-8')
+        yield from _encode_block(INDEX_ADDRESS, index_data, encode_kwargs, master_seed)
+        for address, block in enumerate(_iter_blocks(objects.values(), block_size), start=1):
+            yield from _encode_block(address, block, encode_kwargs, master_seed)
+
+    return index, records()
+
+
+def write_pool(fasta_output, objects: Dict[str, object], block_size: int = DEFAULT_BLOCK_SIZE, master_seed: int = None, **encode_kwargs) -> dict:
+    """
+    Encode objects into a pool and write it as FASTA.
+    Args:
+        fasta_output: Path (gzip if it ends in '.gz'), or a file-like object.
+        objects: Object name -> bytes or path, in pool order.
+        block_size: Bytes of the logical stream per block.
+        master_seed: Seed for reproducible output.
+        encode_kwargs: Passed on to stream_bytes_to_dna.
+    Returns:
+        The pool index.
+    """
+    index, records = pool_records(objects, block_size, master_seed, **encode_kwargs)
+    write_fasta(fasta_output, records)
+    return index
+
+
+def decode_block(source, address: int, workers: int = 1) -> bytes:
+    """Decode one block, reading only as far into the pool as it needs."""
+    return decode_dna_to_bytes(read_address(source, address), workers=workers)
+
+
+def decode_blocks(source, addresses: Iterable[int], workers: int = 1) -> Dict[int, bytes]:
+    """
+    Decode several blocks: through the read index when the pool has one,
+    otherwise by collecting their strands in one pass over the pool.
+    """
+    index = load_index(source) if isinstance(source, (str, os.PathLike)) else None
+    if index is not None:
+        return {address: decode_dna_to_bytes(read_address(source, address, index), workers=workers)
+                for address in addresses}
+    wanted = {address_prefix(address): address for address in addresses}
+    strands: Dict[int, List[str]] = {address: [] for address in wanted.values()}
+    for seq in read_sequences(source):
+        address = wanted.get(seq[:ADDRESS_LENGTH])
+        if address is not None:
+            strands[address].append(seq[ADDRESS_LENGTH:])
+    return {address: decode_dna_to_bytes(block, workers=workers) for address, block in strands.items()}
+
+
+def read_index(source, workers: int = 1) -> dict:
+    """Decode the pool index."""
+    index = json.loads(decode_block(source, INDEX_ADDRESS, workers))
+    if index.get('format') != POOL_FORMAT:
+        raise ValueError(f"Unsupported pool format: {index.get('format')}")
+    return index
+
+
+def find_object(index: dict, name: str) -> dict:
+    for entry in index['objects']:
+        if entry['name'] == name:
+            return entry
+    raise KeyError(f"No object named {name!r} in the pool")
+
+
+def block_span(index: dict, start: int, end: int) -> range:
+    """Addresses of the blocks holding logical-stream bytes [start, end)."""
+    block_size = index['block_size']
+    if end <= start:
+        return range(0)
+    return range(start // block_size + 1, (end - 1) // block_size + 2)
+
+
+def read_object(source, name: str, start: int = 0, end: int = None, index: dict = None, workers: int = 1) -> bytes:
+    """
+    Read one object, or the byte range [start, end) of it, from a pool.
+    Args:
+        source: Pool FASTA/FASTQ path (it is read more than once).
+        name: Object name.
+        start: First byte of the object to return.
+        end: End of the range (default: end of the object).
+        index: Pool index, if already decoded.
+        workers: Number of processes parsing and RS-decoding strands.
+    Returns:
+        The requested bytes.
+    Raises:
+        KeyError: If the pool has no such object.
+        ValueError: If a block cannot be decoded, or a whole-object read
+            does not match the recorded CRC-32.
+    """
+    index = index or read_index(source, workers)
+    entry = find_object(index, name)
+    length = entry['length']
+    end = length if end is None else min(end, length)
+    start = max(0, min(start, end))
+    lo, hi = entry['offset'] + start, entry['offset'] + end
+    addresses = block_span(index, lo, hi)
+    blocks = decode_blocks(source, addresses, workers)
+    stream_start = (addresses.start - 1) * index['block_size'] if addresses else lo
+    data = b''.join(blocks[address] for address in addresses)[lo - stream_start:hi - stream_start]
+    if start == 0 and end == length and zlib.crc32(data) != entry['crc32']:
+        raise ValueError(f"Object {name!r} does not match its CRC-32")
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command')
+
+    pack = sub.add_parser('pack', help="encode files into a pool")
+    pack.add_argument('fasta_output')
+    pack.add_argument('files', nargs='+')
+    pack.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+    pack.add_argument('--chunk-size', type=int, default=32)
+    pack.add_argument('--ecc-bytes', type=int, default=10)
+    pack.add_argument('--overhead', type=float, default=None)
+    pack.add_argument('--distribution', default=None)
+    pack.add_argument('--master-seed', type=int, default=None)
+    pack.add_argument('--seed-scheme', choices=SEED_SCHEMES, default=SEED_PERMUTATION)
+    pack.add_argument('--index', action='store_true', help="also write the read index")
+
+    reindex = sub.add_parser('index', help="write the read index of a pool file")
+    reindex.add_argument('fasta_input')
+
+    listing = sub.add_parser('list', help="list the objects in a pool")
+    listing.add_argument('fasta_input')
+
+    get = sub.add_parser('get', help="extract one object (or a byte range of it)")
+    get.add_argument('fasta_input')
+    get.add_argument('name')
+    get.add_argument('output')
+    get.add_argument('--start', type=int, default=0)
+    get.add_argument('--end', type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == 'pack':
+        objects = {os.path.basename(path): path for path in args.files}
+        index = write_pool(args.fasta_output, objects, args.block_size, args.master_seed,
+                           chunk_size=args.chunk_size, ecc_bytes=args.ecc_bytes,
+                           overhead=args.overhead, distribution=args.distribution,
+                           seed_scheme=args.seed_scheme)
+        print(f"Packed {len(index['objects'])} objects into {index['num_blocks']} blocks")
+        if args.index:
+            build_read_index(args.fasta_output)
+    elif args.command == 'index':
+        print(f"Wrote {build_read_index(args.fasta_input)}")
+    elif args.command == 'list':
+        for entry in read_index(args.fasta_input)['objects']:
+            print(f"{entry['length']:>12}  {entry['name']}")
+    elif args.command == 'get':
+        write_output(args.output, read_object(args.fasta_input, args.name, args.start, args.end))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Multi-process encode and decode pipelines.
+
+The droplet seeds (draw_droplet_seeds) are split into contiguous batches,
+and each worker process builds the droplets, adds ECC and converts to DNA for
+its batch. Batches come back in seed order, so the output is identical to a
+single-process run with the same master seed. Only a few batches are in
+flight at a time, so strands can be written out as they are produced.
+
+The packed message is sent to each worker once through the pool initializer,
+not once per batch.
+
+On the decode side, strands are read in batches and each batch is parsed,
+mapped back to bytes and RS-corrected in a worker process. Only a few batches
+are in flight at a time, and results are yielded in input order as they
+complete, so the fountain decoder can consume droplets while later batches
+are still being corrected.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from droplet_prng import PRNG_SPLITMIX64
+from xor_kernel import pack_chunks
+
+_worker_state = {}
+
+
+def default_workers() -> int:
+    """Number of worker processes to use when none is given."""
+    return os.cpu_count() or 1
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to `size` consecutive items."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _init_worker(message: bytes, chunk_size: int, ecc_bytes: int, prng: str, distribution):
+    _worker_state.update(
+        words=pack_chunks(message, chunk_size),
+        chunk_size=chunk_size,
+        ecc_bytes=ecc_bytes,
+        prng=prng,
+        distribution=distribution,
+    )
+
+
+def _encode_batch(seeds: Sequence[int]) -> List[str]:
+    from fountaincodev2 import addECCInDroplets, droplet_batch_from_seeds, encode_droplets_to_dna
+
+    state = _worker_state
+    droplets = droplet_batch_from_seeds(state['words'], state['chunk_size'], seeds, state['prng'], state['distribution'])
+    return encode_droplets_to_dna(addECCInDroplets(droplets, state['ecc_bytes']))
+
+
+def encode_seeds_parallel(message: bytes, chunk_size: int, seeds: Iterable[int], ecc_bytes: int = 10, prng: str = PRNG_SPLITMIX64, distribution=None, workers: int = None, batch_size: int = 4096) -> Iterator[List[str]]:
+    """
+    Encode a prepared message into DNA strands across worker processes.
+    Args:
+        message: Output of prepare_message.
+        chunk_size: Size of each chunk in bytes.
+        seeds: Droplet seeds, in output order (any iterable; consumed lazily).
+        ecc_bytes: Number of error correction bytes per droplet.
+        prng: Droplet PRNG scheme (see droplet_prng).
+        distribution: Degree distribution spec (see degree_distributions).
+        workers: Number of worker processes (default: CPU count).
+        batch_size: Seeds handed to a worker at a time.
+    Yields:
+        Lists of DNA sequences, one per seed, in seed order.
+    """
+    workers = workers or default_workers()
+    if hasattr(distribution, 'spec'):
+        distribution = distribution.spec
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(message, chunk_size, ecc_bytes, prng, distribution))
+    yield from _ordered_results(executor, _encode_batch, batched(seeds, batch_size), 2 * workers)
+
+
+def _decode_batch(dna_sequences: List[str], ecc_bytes: int):
+    from fountaincodev2 import decode_strand_batch
+
+    return decode_strand_batch(dna_sequences, ecc_bytes)
+
+
+def decode_strands_parallel(dna_sequences: Iterable[str], ecc_bytes: int = 10, workers: int = None, batch_size: int = 4096) -> Iterator[Tuple[int, list, List[int]]]:
+    """
+    Parse and RS-decode strands across worker processes.
+    Args:
+        dna_sequences: DNA strands (any iterable; consumed lazily).
+        ecc_bytes: Number of error correction bytes per droplet.
+        workers: Number of worker processes (default: CPU count).
+        batch_size: Strands per batch handed to a worker.
+    Yields:
+        (strands, droplets, corrections) per batch, in input order, as
+        returned by fountaincodev2.decode_strand_batch.
+    """
+    workers = workers or default_workers()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    batches = ((batch, ecc_bytes) for batch in batched(dna_sequences, batch_size))
+    yield from _ordered_results(executor, _decode_batch, batches, 2 * workers, unpack=True)
+
+
+def _ordered_results(executor, fn, args: Iterable, max_pending: int, unpack: bool = False) -> Iterator:
+    """Run fn over args on the executor, yielding results in order with a bounded backlog."""
+    pending = deque()
+    try:
+        for arg in args:
+            pending.append(executor.submit(fn, *arg) if unpack else executor.submit(fn, arg))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
@@ -0,0 +1,159 @@
+"""
+Content-addressed cache of encode results.
+
+Encoding the same file with the same parameters twice gives equivalent
+FASTA (identical, with a master seed), so the API keeps finished outputs
+and serves repeats from disk. An entry is keyed by the SHA-256 of the
+input, the encoding parameters that affect the strands and the codec
+version (fountaincodev2.CODEC_VERSION), so a new encoder never serves
+outputs of an old one.
+
+The cache is a directory of <key>.fasta files shared by every gunicorn
+worker. Entries are written to a temporary file while the response streams
+and renamed into place only when complete, so readers never see a partial
+entry. A hit touches the file's mtime, and after each store the least
+recently used entries are deleted until the cache fits in its byte budget.
+Hit/miss/store/eviction counters live in stats.json, updated under a file
+lock so all workers add to the same totals.
+
+Settings come from the environment: DNA_CACHE_DIR (cache directory) and
+DNA_CACHE_MAX_BYTES (budget, default 1 GiB; 0 disables the cache).
+"""
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+CACHE_DIR = os.environ.get('DNA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dna_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('DNA_CACHE_MAX_BYTES', 1 << 30))
+ENTRY_SUFFIX = '.fasta'
+COUNTERS = ('hits', 'misses', 'stores', 'evictions')
+
+
+def cache_key(data: bytes, params: dict, version: int) -> str:
+    """Key for the result of encoding data with params under a codec version."""
+    digest = hashlib.sha256()
+    digest.update(hashlib.sha256(data).digest())
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    digest.update(str(version).encode('ascii'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of encoded FASTA files on local disk.
+    Args:
+        root: Cache directory (shared by every process using it).
+        max_bytes: Total size of the entries to keep; 0 disables caching.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ENTRY_SUFFIX)
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open the entry for key (counting a hit or a miss), or return None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        try:
+            os.utime(path)  # most recently used
+        except OSError:
+            pass  # evicted meanwhile; the open file is still readable
+        self._count('hits')
+        return f
+
+    def write_through(self, key: str, chunks: Iterable) -> Iterator:
+        """
+        Pass chunks (str or bytes) through while storing them under key.
+        The entry is only stored if the iteration runs to the end.
+        """
+        if not self.enabled:
+            yield from chunks
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        complete = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk.encode('ascii') if isinstance(chunk, str) else chunk)
+                    yield chunk
+            os.replace(tmp, self._path(key))
+            complete = True
+        finally:
+            if not complete:
+                os.remove(tmp)
+        self._count('stores')
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits; returns how many."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass  # another worker got there first
+            total -= size
+        if evicted:
+            self._count('evictions', evicted)
+        return evicted
+
+    def _count(self, name: str, n: int = 1):
+        with open(os.path.join(self.root, 'stats.json'), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                stats = json.loads(f.read() or '{}')
+            except ValueError:
+                stats = {}
+            stats[name] = stats.get(name, 0) + n
+            f.seek(0)
+            f.truncate()
+            json.dump(stats, f)
+
+    def stats(self) -> dict:
+        """Counters shared by all processes, plus the current size of the cache."""
+        try:
+            with open(os.path.join(self.root, 'stats.json')) as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                stats = json.loads(f.read() or '{}')
+        except (OSError, ValueError):
+            stats = {}
+        result = {name: stats.get(name, 0) for name in COUNTERS}
+        lookups = result['hits'] + result['misses']
+        result['hit_rate'] = result['hits'] / lookups if lookups else 0.0
+        entries = self._entries()
+        result.update(entries=len(entries), bytes=sum(size for _, size, _ in entries), max_bytes=self.max_bytes)
+        return result
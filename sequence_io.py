@@ -0,0 +1,217 @@
+"""
+Streaming FASTA/FASTQ reader and writer.
+
+Records are read as a generator over large blocks of the input, so memory
+use does not grow with the number of strands. Input may be FASTA or FASTQ
+(detected from the first record marker), with sequences wrapped over several
+lines, and may be gzip-compressed (detected from the gzip magic bytes, for
+paths and file-like objects alike). Output is written in batches of joined
+records rather than one small write per line.
+"""
+import gzip
+import io
+import zlib
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+BLOCK_SIZE = 1 << 20  # bytes read per I/O call
+WRITE_BATCH = 4096  # records joined per write call
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _read_blocks(stream, block_size: int) -> Iterator:
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def _gunzip_blocks(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(wbits=31)
+    for block in blocks:
+        while block:
+            yield decompressor.decompress(block)
+            block = decompressor.unused_data
+            if block:  # concatenated gzip members
+                decompressor = zlib.decompressobj(wbits=31)
+
+
+def iter_blocks(source, block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """
+    Yield the text of a sequence file in large blocks.
+    Args:
+        source: Path, bytes, or a text or binary file-like object; gzip
+            input is decompressed on the fly.
+        block_size: Bytes read per I/O call.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if not hasattr(source, 'read'):
+        with open(source, 'rb') as f:
+            yield from iter_blocks(f, block_size)
+        return
+    blocks = _read_blocks(source, block_size)
+    first = next(blocks, None)
+    if first is None:
+        return
+    if isinstance(first, str):
+        yield first
+        yield from blocks
+        return
+    blocks = _chain_first(first, blocks)
+    if first[:2] == _GZIP_MAGIC:
+        blocks = _gunzip_blocks(blocks)
+    for block in blocks:
+        yield block.decode('ascii')
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+def iter_lines(blocks: Iterable[str]) -> Iterator[str]:
+    """Split text blocks into lines, without line terminators."""
+    tail = ''
+    for block in blocks:
+        lines = (tail + block).split('\n')
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    if tail:
+        yield tail.rstrip('\r')
+
+
+def _fasta_records(lines: Iterator[str], position) -> Iterator[Tuple[str, str, Optional[int]]]:
+    header = None
+    start = None
+    seq = []
+    for line in lines:
+        if line.startswith('>'):
+            if seq:
+                yield header, ''.join(seq), start
+            header = line[1:]
+            start = position()
+            seq = []
+        else:
+            seq.append(line.strip())
+    if seq:
+        yield header, ''.join(seq), start
+
+
+def _fastq_records(lines: Iterator[str], position) -> Iterator[Tuple[str, str, Optional[int]]]:
+    for line in lines:
+        if not line.startswith('@'):
+            continue
+        header = line[1:]
+        start = position()
+        seq = []
+        for line in lines:
+            if line.startswith('+'):
+                break
+            seq.append(line.strip())
+        seq = ''.join(seq)
+        quality = 0
+        # quality lines may start with '@' or '+', so consume them by length
+        while quality < len(seq):
+            line = next(lines, None)
+            if line is None:
+                break
+            quality += len(line.strip())
+        yield header, seq, start
+
+
+def _no_position() -> None:
+    return None
+
+
+def parse_records(lines: Iterator[str], position: Callable[[], Optional[int]] = _no_position) -> Iterator[Tuple[str, str, Optional[int]]]:
+    """
+    Parse FASTA or FASTQ records (the format is taken from the first record
+    marker) from an iterator of lines.
+    Args:
+        lines: Lines without terminators.
+        position: Called right after a header line is read; its result is
+            reported as that record's position (e.g. the line's byte offset).
+    Yields:
+        (header without the marker, sequence, position).
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        records = _fastq_records if line.startswith('@') else _fasta_records
+        yield from records(_chain_first(line, lines), position)
+        return
+
+
+def read_records(source) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (header, sequence) records from FASTA or FASTQ.
+    Args:
+        source: Path, bytes, or a text or binary file-like object, optionally
+            gzip-compressed.
+    Yields:
+        (header without the '>' or '@' marker, sequence). Records with an
+        empty sequence are skipped.
+    """
+    for header, seq, _ in parse_records(iter_lines(iter_blocks(source))):
+        yield header, seq
+
+
+def read_sequences(source) -> Iterator[str]:
+    """Stream just the sequences from FASTA or FASTQ."""
+    for _, seq in read_records(source):
+        yield seq
+
+
+def _is_binary(target) -> bool:
+    if isinstance(target, io.TextIOBase):
+        return False
+    return isinstance(target, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(target, 'mode', '')
+
+
+def write_fasta(target, records: Iterable[Tuple[str, str]], batch_size: int = WRITE_BATCH) -> int:
+    """
+    Write (header, sequence) records as FASTA.
+    Args:
+        target: Path (gzip-compressed if it ends in '.gz'), or a text or
+            binary file-like object.
+        records: Any iterable of (header, sequence); consumed lazily.
+        batch_size: Records joined into each write call.
+    Returns:
+        Number of records written.
+    """
+    if not hasattr(target, 'write'):
+        opener = gzip.open if str(target).endswith('.gz') else open
+        with opener(target, 'wt') as f:
+            return write_fasta(f, records, batch_size)
+    binary = _is_binary(target)
+    counter = [0]
+    for text in iter_fasta(records, batch_size, counter):
+        target.write(text.encode('ascii') if binary else text)
+    return counter[0]
+
+
+def iter_fasta(records: Iterable[Tuple[str, str]], batch_size: int = WRITE_BATCH, counter: list = None) -> Iterator[str]:
+    """
+    Yield FASTA text for (header, sequence) records, batch_size records at a
+    time, e.g. as the body of a streamed HTTP response.
+    Args:
+        records: Any iterable of (header, sequence); consumed lazily.
+        batch_size: Records joined into each yielded string.
+        counter: Optional one-item list; its item is increased by the
+            number of records yielded.
+    """
+    batch = []
+    for header, seq in records:
+        batch.append(f">{header}\n{seq}\n")
+        if len(batch) >= batch_size:
+            if counter is not None:
+                counter[0] += len(batch)
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        if counter is not None:
+            counter[0] += len(batch)
+        yield ''.join(batch)
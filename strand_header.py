@@ -0,0 +1,296 @@
+"""
+Self-describing metadata strands.
+
+Every encoded file carries metadata strands with what the decoder needs to
+size its buffers, so chunk_size, num_chunks and ecc_bytes no longer have to
+be passed out of band. The header is a fixed-size record:
+
+    u8   header layout version (HEADER_VERSION)
+    u8   payload format version (FORMAT_BITSTRING / FORMAT_RAW)
+    u8   droplet PRNG scheme, as an index into droplet_prng.PRNG_SCHEMES
+    u8   ECC bytes per droplet
+    u16  chunk size
+    u32  number of chunks
+    u64  message length (bytes fountain-coded, before chunk padding)
+    u64  original file length
+    u32  CRC-32 of the message
+    u8   degree distribution, as an index into DISTRIBUTIONS
+    f64  first distribution parameter (uniform: max_degree; robust: c)
+    f64  second distribution parameter (robust: delta)
+
+All integers are little-endian; unused parameters are 0. Oligo pools need
+one strand length, so a metadata strand is exactly as long as a droplet
+strand (the seed, then chunk_size bytes with their Reed-Solomon ECC): it
+looks like a droplet whose seed field is METADATA_SEED (a value never drawn
+for a droplet), followed by one RS-protected fragment of the header:
+
+    u8   nonce, XOR NONCE_MASK
+    u8   fragment index, whitened
+    ...  the next fragment_size() bytes of the header, whitened (the
+         last fragment zero-padded)
+
+where whitened means XOR the keystream of the nonce.
+
+A fragment codeword is at most one RS block (RS_BLOCK bytes). Reed-Solomon
+adds ECC per block, so a droplet payload longer than one block would not
+come out the same length as a fragment; such strands carry the rest of the
+whitening keystream after the codeword, outside the ECC, and the decoder
+ignores it.
+
+The header is mostly small integers and zero bytes, which would map to long
+runs of A. Whitening makes a metadata strand look like any other strand,
+and the encoder tries nonces until the strand also passes the strand
+screening constraints (see dna_constraints), the same way droplet seeds
+are screened. METADATA_SEED itself maps to the balanced, run-free
+ACGTTGCACAGTGTCA.
+
+A copy of the header is as many strands as it takes fragments (two at the
+default 32-byte chunks and 10 ECC bytes). The fragments always use
+HEADER_ECC_BYTES of Reed-Solomon protection, so they can be read before
+the droplet ECC size is known; the decoder takes the fragment size from
+the strand length (up to one RS block).
+
+Sequencing returns reads in no particular order, so the copies are spread
+through the file, one every METADATA_INTERVAL droplets (and at least
+METADATA_COPIES in all). Every fragment then makes up about one read in
+METADATA_INTERVAL whatever the read order, and find_header only ever looks
+at the first METADATA_SCAN reads: the chance that a fragment is missing
+from them is about exp(-METADATA_SCAN / METADATA_INTERVAL).
+"""
+import struct
+import zlib
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import ecc
+from dna_codec import bytes_to_dna, dna_to_bytes
+from dna_constraints import resolve_constraints
+from droplet_prng import PRNG_SCHEMES, SplitMix64
+from degree_distributions import (DIST_IDEAL_SOLITON, DIST_ROBUST_SOLITON, DIST_UNIFORM, IdealSoliton, RobustSoliton,
+                                  UniformDistribution, resolve_distribution)
+
+HEADER_VERSION = 2
+HEADER_ECC_BYTES = 10
+RS_BLOCK = 255  # bytes per Reed-Solomon codeword (see ecc)
+METADATA_SEED = 0xB44BE41B
+NONCE_MASK = 0x5A
+METADATA_COPIES = 8  # header copies in even the smallest file
+METADATA_INTERVAL = 256  # droplets per header copy
+METADATA_SCAN = 16 * METADATA_INTERVAL  # reads buffered while looking for the header
+DISTRIBUTIONS = (DIST_UNIFORM, DIST_IDEAL_SOLITON, DIST_ROBUST_SOLITON)
+
+_HEADER = struct.Struct('<BBBBHIQQIBdd')
+_SEED = struct.Struct('<I')
+_WHITENING_KEY = 0x6D65746164617461
+
+
+def build_header(message: bytes, file_length: int, chunk_size: int, ecc_bytes: int, format_version: int, prng: str, distribution=None) -> dict:
+    """Collect the header fields for an encoded message."""
+    return {
+        'version': format_version,
+        'prng': prng,
+        'dist': resolve_distribution(distribution).spec,
+        'ecc_bytes': ecc_bytes,
+        'chunk_size': chunk_size,
+        'num_chunks': -(-len(message) // chunk_size),
+        'message_length': len(message),
+        'file_length': file_length,
+        'crc32': zlib.crc32(message),
+    }
+
+
+def _pack_distribution(spec) -> Tuple[int, float, float]:
+    dist = resolve_distribution(spec)
+    if isinstance(dist, UniformDistribution):
+        return DISTRIBUTIONS.index(DIST_UNIFORM), dist.max_degree, 0.0
+    if isinstance(dist, IdealSoliton):
+        return DISTRIBUTIONS.index(DIST_IDEAL_SOLITON), 0.0, 0.0
+    if isinstance(dist, RobustSoliton):
+        return DISTRIBUTIONS.index(DIST_ROBUST_SOLITON), dist.c, dist.delta
+    raise ValueError(f"Degree distribution {dist.spec} cannot be recorded in a metadata header")
+
+
+def _unpack_distribution(index: int, first: float, second: float) -> str:
+    if index >= len(DISTRIBUTIONS):
+        raise ValueError(f"Unknown degree distribution index: {index}")
+    name = DISTRIBUTIONS[index]
+    if name == DIST_UNIFORM:
+        return UniformDistribution(int(first)).spec
+    if name == DIST_IDEAL_SOLITON:
+        return IdealSoliton().spec
+    return RobustSoliton(first, second).spec
+
+
+def pack_header(header: dict) -> bytes:
+    return _HEADER.pack(HEADER_VERSION, header['version'], PRNG_SCHEMES.index(header['prng']),
+                        header['ecc_bytes'], header['chunk_size'], header['num_chunks'],
+                        header['message_length'], header['file_length'], header['crc32'],
+                        *_pack_distribution(header['dist']))
+
+
+def unpack_header(data: bytes) -> dict:
+    """
+    Parse a packed header.
+    Raises:
+        ValueError: If the data is not a header this version understands.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Metadata header is truncated")
+    (layout, format_version, prng, ecc_bytes, chunk_size, num_chunks,
+     message_length, file_length, crc32, dist, first, second) = _HEADER.unpack_from(data)
+    if layout != HEADER_VERSION:
+        raise ValueError(f"Unsupported metadata header version: {layout}")
+    if prng >= len(PRNG_SCHEMES):
+        raise ValueError(f"Unknown PRNG scheme index: {prng}")
+    return {
+        'version': format_version,
+        'prng': PRNG_SCHEMES[prng],
+        'dist': _unpack_distribution(dist, first, second),
+        'ecc_bytes': ecc_bytes,
+        'chunk_size': chunk_size,
+        'num_chunks': num_chunks,
+        'message_length': message_length,
+        'file_length': file_length,
+        'crc32': crc32,
+    }
+
+
+def payload_size(chunk_size: int, ecc_bytes: int) -> int:
+    """Bytes after the seed in a droplet strand: a chunk with its Reed-Solomon ECC (added per RS block)."""
+    return len(ecc.encode(bytes(chunk_size), ecc_bytes))
+
+
+def fragment_size(chunk_size: int, ecc_bytes: int) -> int:
+    """Header bytes carried per metadata strand for a droplet strand of the given sizes."""
+    return min(payload_size(chunk_size, ecc_bytes), RS_BLOCK) - HEADER_ECC_BYTES - 2
+
+
+def _whiten(data: bytes, nonce: int) -> bytes:
+    """XOR data with the keystream of a nonce (its own inverse)."""
+    rng = SplitMix64(_WHITENING_KEY ^ nonce)
+    stream = b''.join(rng.next64().to_bytes(8, 'little') for _ in range(-(-len(data) // 8)))
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(stream[:len(data)], 'little')).to_bytes(len(data), 'little')
+
+
+def _metadata_strand(index: int, piece: bytes, nonce: int, fill: int) -> str:
+    """The strand of one fragment, with fill bytes of keystream after its codeword."""
+    body = _whiten(bytes([index]) + piece + bytes(fill), nonce)
+    fragment = bytes([nonce ^ NONCE_MASK]) + body[:len(body) - fill]
+    return bytes_to_dna(_SEED.pack(METADATA_SEED) + ecc.encode(fragment, HEADER_ECC_BYTES) + body[len(body) - fill:])
+
+
+def metadata_strands(header: dict, constraints=None, prefix: str = '') -> List[str]:
+    """
+    Return one copy of the header as DNA metadata strands, one per fragment,
+    each as long as a droplet strand of the encoding.
+    Args:
+        header: Header fields (see build_header).
+        constraints: Strand screening rules or spec (see dna_constraints)
+            the strands have to pass.
+        prefix: DNA the strands will be written after (an object_store
+            address); screened together with each strand, but not included.
+    Raises:
+        ValueError: If the droplet strands are too short to carry fragments,
+            or no nonce gives a fragment strand that passes the constraints.
+    """
+    size = fragment_size(header['chunk_size'], header['ecc_bytes'])
+    if size < 1:
+        raise ValueError(f"chunk_size + ecc_bytes must be at least {HEADER_ECC_BYTES + 3} to hold metadata strands")
+    fill = payload_size(header['chunk_size'], header['ecc_bytes']) - (size + HEADER_ECC_BYTES + 2)
+    constraints = resolve_constraints(constraints)
+    packed = pack_header(header)
+    strands = []
+    for index, start in enumerate(range(0, len(packed), size)):
+        piece = packed[start:start + size].ljust(size, b'\0')
+        if constraints is None:
+            strands.append(_metadata_strand(index, piece, 0, fill))
+            continue
+        candidates = [_metadata_strand(index, piece, nonce, fill) for nonce in range(256)]
+        passed = np.flatnonzero(constraints.check([prefix + dna for dna in candidates]))
+        if not passed.size:
+            raise ValueError(f"No metadata strand passes the strand constraints {constraints.spec}")
+        strands.append(candidates[passed[0]])
+    return strands
+
+
+def metadata_copies(num_droplets: int) -> int:
+    """Number of header copies written with num_droplets droplets."""
+    return max(METADATA_COPIES, -(-num_droplets // METADATA_INTERVAL))
+
+
+def interleave_metadata(droplet_strands: Iterable[str], metadata: List[str], num_droplets: int) -> Iterator[str]:
+    """
+    Spread metadata_copies(num_droplets) copies of the metadata strands
+    evenly through a stream of num_droplets droplet strands, starting with
+    one copy in front.
+    """
+    copies = metadata_copies(num_droplets)
+    written = 0
+    done = 0
+    for strand in droplet_strands:
+        while written < copies and written * num_droplets // copies <= done:
+            yield from metadata
+            written += 1
+        yield strand
+        done += 1
+    for _ in range(written, copies):
+        yield from metadata
+
+
+def parse_metadata_strand(dna: str) -> Optional[Tuple[int, bytes]]:
+    """Return the (fragment index, header bytes) carried by a strand, or None if it is not a readable metadata strand."""
+    try:
+        data = dna_to_bytes(dna)
+    except ValueError:
+        return None
+    if len(data) <= _SEED.size + HEADER_ECC_BYTES + 2 or _SEED.unpack_from(data)[0] != METADATA_SEED:
+        return None
+    try:
+        fragment = ecc.decode(data[_SEED.size:_SEED.size + RS_BLOCK], HEADER_ECC_BYTES)[0]
+    except Exception:
+        return None
+    fragment = _whiten(fragment[1:], fragment[0] ^ NONCE_MASK)
+    return fragment[0], fragment[1:]
+
+
+def assemble_header(fragments: Dict[int, bytes]) -> Optional[dict]:
+    """The header once every fragment of it has been collected (index -> bytes), else None."""
+    if not fragments:
+        return None
+    size = len(next(iter(fragments.values())))
+    count = -(-_HEADER.size // size)
+    if any(i not in fragments or len(fragments[i]) != size for i in range(count)):
+        return None
+    try:
+        return unpack_header(b''.join(fragments[i] for i in range(count)))
+    except ValueError:
+        return None
+
+
+def find_header(dna_sequences: Iterable[str], limit: int = METADATA_SCAN) -> Tuple[Optional[dict], Iterator[str]]:
+    """
+    Look for a complete set of metadata fragments at the start of a strand stream.
+    Args:
+        dna_sequences: DNA strands (any iterable).
+        limit: Give up after this many strands; they are held in memory
+            until the search ends.
+    Returns:
+        (header or None, iterator over all the strands, including the ones
+        already searched).
+    """
+    strands = iter(dna_sequences)
+    seen = []
+    fragments = {}
+    for dna in strands:
+        seen.append(dna)
+        fragment = parse_metadata_strand(dna)
+        if fragment is not None and fragment[0] not in fragments:
+            fragments[fragment[0]] = fragment[1]
+            header = assemble_header(fragments)
+            if header is not None:
+                return header, chain(seen, strands)
+        if len(seen) >= limit:
+            break
+    return None, chain(seen, strands)
@@ -0,0 +1,184 @@
+"""
+Strand addresses and an on-disk address -> file offset index.
+
+Strands in an object pool (see object_store) start with an address prefix
+of ADDRESS_LENGTH bases. Selecting the reads of one address is the
+in-silico equivalent of PCR with that address's primers. The prefix must
+not break the strand screening limits (see dna_constraints) however small
+the address, so it is not the plain 2-bit mapping, where address 0 would be
+a run of 16 A's: each pair of bases is one strong (C/G) and one weak (A/T)
+base in either order, eight pairs carrying one octal digit of the address,
+most significant first. A prefix therefore has no run longer than two and
+exactly half GC, and there are MAX_ADDRESS + 1 addresses.
+
+build_index scans an uncompressed FASTA/FASTQ file once and writes a
+sidecar (<file>.idx) listing, for every address, the byte spans of the file
+holding its records; runs of consecutive records with the same address are
+merged into one span. The sidecar is a fixed header followed by a table of
+(address u32, offset u64, length u64) rows sorted by address, memory-mapped
+and binary-searched on lookup, so fetching the reads of one address costs a
+lookup plus reading just those spans, however large the pool is.
+
+Sidecar header: magic (8 bytes), indexed file size (u64), indexed file
+mtime in ns (u64). An index whose size or mtime no longer match the file is
+ignored, and lookups fall back to scanning the file.
+"""
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from sequence_io import parse_records, read_sequences
+
+ADDRESS_PAIRS = ('CA', 'CT', 'GA', 'GT', 'AC', 'AG', 'TC', 'TG')
+ADDRESS_DIGITS = 8
+ADDRESS_LENGTH = 2 * ADDRESS_DIGITS  # bases
+MAX_ADDRESS = len(ADDRESS_PAIRS) ** ADDRESS_DIGITS - 1
+INDEX_SUFFIX = '.idx'
+
+_PAIR_DIGIT = {pair: digit for digit, pair in enumerate(ADDRESS_PAIRS)}
+_MAGIC = b'DNAIDX2\x00'
+_HEADER = struct.Struct('<8sQQ')
+SPAN_DTYPE = np.dtype([('address', '<u4'), ('offset', '<u8'), ('length', '<u8')])
+
+
+def address_prefix(address: int) -> str:
+    """DNA prefix carried by every strand with the given address."""
+    if not 0 <= address <= MAX_ADDRESS:
+        raise ValueError(f"Address {address} is out of range (0..{MAX_ADDRESS})")
+    pairs = []
+    for _ in range(ADDRESS_DIGITS):
+        address, digit = divmod(address, len(ADDRESS_PAIRS))
+        pairs.append(ADDRESS_PAIRS[digit])
+    return ''.join(reversed(pairs))
+
+
+def parse_address(seq: str) -> Optional[int]:
+    """Address encoded at the start of a strand, or None if it has none."""
+    if len(seq) < ADDRESS_LENGTH:
+        return None
+    address = 0
+    for i in range(0, ADDRESS_LENGTH, 2):
+        digit = _PAIR_DIGIT.get(seq[i:i + 2])
+        if digit is None:
+            return None
+        address = address * len(ADDRESS_PAIRS) + digit
+    return address
+
+
+def index_path_for(path: str) -> str:
+    return str(path) + INDEX_SUFFIX
+
+
+class _OffsetLines:
+    """Lines of a binary file, tracking the byte offset of the last one returned."""
+
+    def __init__(self, f):
+        self._lines = iter(f)
+        self.start = 0  # offset of the last line returned
+        self.end = 0  # offset just past it
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = next(self._lines)
+        self.start = self.end
+        self.end += len(line)
+        return line.decode('ascii').rstrip('\n').rstrip('\r')
+
+
+def iter_record_spans(path: str) -> Iterator[Tuple[int, int, Optional[int]]]:
+    """
+    Yield (offset, length, address) for every FASTA/FASTQ record in a file.
+    A record spans from its header line to the next record's header line.
+    Raises:
+        ValueError: If the file is gzip-compressed (offsets would not be seekable).
+    """
+    with open(path, 'rb') as f:
+        if f.read(2) == b'\x1f\x8b':
+            raise ValueError("Cannot index a gzip-compressed file; decompress it first")
+        f.seek(0)
+        lines = _OffsetLines(f)
+        start = address = None
+        for _, seq, offset in parse_records(lines, lambda: lines.start):
+            if start is not None:
+                yield start, offset - start, address
+            start, address = offset, parse_address(seq)
+        if start is not None:
+            yield start, lines.end - start, address
+
+
+def build_index(path: str, index_path: str = None) -> str:
+    """
+    Index the addressed records of an uncompressed FASTA/FASTQ file.
+    Args:
+        path: FASTA/FASTQ file.
+        index_path: Where to write the index (default: path + '.idx').
+    Returns:
+        The index path.
+    """
+    index_path = index_path or index_path_for(path)
+    rows = []
+    for offset, length, address in iter_record_spans(path):
+        if address is None:
+            continue
+        if rows and rows[-1][0] == address and rows[-1][1] + rows[-1][2] == offset:
+            rows[-1][2] += length  # extend the current run
+        else:
+            rows.append([address, offset, length])
+    table = np.array([tuple(row) for row in rows], dtype=SPAN_DTYPE)
+    table = table[np.argsort(table['address'], kind='stable')]
+    stat = os.stat(path)
+    with open(index_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns))
+        f.write(table.tobytes())
+    return index_path
+
+
+def load_index(path: str, index_path: str = None) -> Optional[np.ndarray]:
+    """Memory-map the index of a file, or return None if it is missing or stale."""
+    index_path = index_path or index_path_for(path)
+    try:
+        with open(index_path, 'rb') as f:
+            magic, size, mtime_ns = _HEADER.unpack(f.read(_HEADER.size))
+        stat = os.stat(path)
+    except (OSError, struct.error):
+        return None
+    if magic != _MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+        return None
+    if os.path.getsize(index_path) == _HEADER.size:
+        return np.zeros(0, dtype=SPAN_DTYPE)
+    return np.memmap(index_path, dtype=SPAN_DTYPE, mode='r', offset=_HEADER.size)
+
+
+def lookup(index: np.ndarray, address: int) -> np.ndarray:
+    """Spans (offset, length) of the records with the given address."""
+    lo = np.searchsorted(index['address'], address, 'left')
+    hi = np.searchsorted(index['address'], address, 'right')
+    return index[lo:hi]
+
+
+def read_address(source, address: int, index: np.ndarray = None) -> Iterator[str]:
+    """
+    Yield the strands with the given address, with the prefix removed.
+    Args:
+        source: FASTA/FASTQ path or file-like object.
+        address: Strand address.
+        index: Loaded index; by default the sidecar of a path source is
+            used when it is up to date, and the file is scanned otherwise.
+    """
+    if index is None and isinstance(source, (str, os.PathLike)):
+        index = load_index(source)
+    if index is None:
+        prefix = address_prefix(address)
+        for seq in read_sequences(source):
+            if seq.startswith(prefix):
+                yield seq[ADDRESS_LENGTH:]
+        return
+    with open(source, 'rb') as f:
+        for span in lookup(index, address):
+            f.seek(int(span['offset']))
+            for seq in read_sequences(f.read(int(span['length']))):
+                yield seq[ADDRESS_LENGTH:]
@@ -0,0 +1,43 @@
+"""
+Golden vectors for the droplet PRNG.
+
+The decoder regenerates every droplet's neighbour set from the seed stored
+in its strand, so these outputs are part of the format: a change that
+breaks one of them breaks old outputs. Bump fountaincodev2.CODEC_VERSION
+and update the vectors on purpose, never to make the test pass.
+
+Run with: python -m pytest -q
+"""
+from droplet_prng import SplitMix64, droplet_neighbours
+
+
+def test_splitmix64_outputs():
+    rng = SplitMix64(0)
+    assert [rng.next64() for _ in range(3)] == [0xE220A8397B1DCDAF, 0x6E789E6AA1B965F4, 0x06C45D188009454F]
+    rng = SplitMix64(0x1234)
+    assert [rng.next64() for _ in range(2)] == [0x5F642F87D5E23888, 0x5A4D78533D034CB5]
+
+
+def test_droplet_neighbours():
+    # seed -> degree -> chunk indices, for each PRNG and distribution
+    cases = [
+        (0, 100, 'splitmix64', 'uniform', [54, 79]),
+        (1, 100, 'splitmix64', 'uniform', [77, 66, 35]),
+        (0xDEADBEEF, 100, 'splitmix64', 'uniform', [98, 29]),
+        (0, 1000, 'splitmix64', 'robust_soliton', [190, 820, 444]),
+        (1, 1000, 'splitmix64', 'robust_soliton', [367, 822, 235]),
+        (0xDEADBEEF, 1000, 'splitmix64', 'robust_soliton', [809, 229]),
+        (0, 100, 'legacy', 'uniform', [97, 53]),
+        (1, 100, 'legacy', 'uniform', [72]),
+        (0xDEADBEEF, 100, 'legacy', 'uniform', [54]),
+    ]
+    for seed, num_chunks, prng, distribution, expected in cases:
+        assert droplet_neighbours(seed, num_chunks, prng, distribution) == expected, (seed, prng, distribution)
+
+
+def test_neighbours_are_distinct_and_in_range():
+    for seed in range(200):
+        neighbours = droplet_neighbours(seed, 37, 'splitmix64', 'robust_soliton')
+        assert 1 <= len(neighbours) <= 37
+        assert len(set(neighbours)) == len(neighbours)
+        assert all(0 <= i < 37 for i in neighbours)
@@ -0,0 +1,52 @@
+"""
+Droplet seed schemes.
+
+The vectors pin the seeds of existing encodings: a decoder given the master
+seed relies on seed_index inverting them, so they must never change.
+
+Run with: python -m pytest -q
+"""
+import random
+
+import pytest
+
+from droplet_seeds import (SEED_PERMUTATION, SEED_RANDOM, SEED_SEQUENTIAL, _round_keys, iter_seeds, permute,
+                           seed_index, unpermute)
+from strand_header import METADATA_SEED
+
+
+def test_seed_vectors():
+    assert list(iter_seeds(4, 42, SEED_PERMUTATION)) == [1702065665, 2717517856, 1765118474, 3263915700]
+    assert list(iter_seeds(2, 'pool/1', SEED_PERMUTATION)) == [2225532951, 2969956202]
+    assert list(iter_seeds(4, 42, SEED_SEQUENTIAL)) == [42, 43, 44, 45]
+    assert list(iter_seeds(2, 'pool/1', SEED_SEQUENTIAL)) == [2620004880, 2620004881]
+    assert list(iter_seeds(4, 42, SEED_RANDOM)) == [2746317213, 1181241943, 958682846, 3163119785]
+    assert seed_index(3263915700, 42) == 3
+
+
+def test_permutation_round_trip():
+    rng = random.Random(1)
+    round_keys = _round_keys(rng.getrandbits(64))
+    for i in [0, 1, 0xFFFF, 0x10000, 0xFFFFFFFF] + [rng.getrandbits(32) for _ in range(1000)]:
+        assert unpermute(permute(i, round_keys), round_keys) == i
+
+
+@pytest.mark.parametrize('scheme', [SEED_PERMUTATION, SEED_SEQUENTIAL])
+def test_seeds_do_not_repeat_and_invert(scheme):
+    seeds = list(iter_seeds(20000, 'pool/7', scheme))
+    assert len(set(seeds)) == len(seeds)
+    assert [seed_index(seed, 'pool/7', scheme) for seed in seeds[:100]] == list(range(100))
+
+
+def test_metadata_seed_is_skipped():
+    assert list(iter_seeds(3, METADATA_SEED - 1, SEED_SEQUENTIAL)) == [
+        METADATA_SEED - 1, METADATA_SEED + 1, METADATA_SEED + 2]
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError, match='Unknown seed scheme'):
+        list(iter_seeds(1, 0, 'shuffled'))
+    with pytest.raises(ValueError):
+        seed_index(1, None)
+    with pytest.raises(ValueError):
+        seed_index(1, 0, SEED_RANDOM)
@@ -0,0 +1,124 @@
+"""
+Behaviour of the peeling decoder and the GF(2) fallback.
+
+Run with: python -m pytest -q
+"""
+import os
+import random
+import time
+
+import pytest
+
+from droplet_prng import droplet_neighbours
+from fountain_decoder import PeelingDecoder, solve_gf2
+from fountaincodev2 import fountain_encode
+from xor_kernel import xor_payloads
+
+CHUNK_SIZE = 16
+
+
+def _droplet(chunks, seed, prng='splitmix64', distribution='robust_soliton'):
+    indices = droplet_neighbours(seed, len(chunks), prng, distribution)
+    return seed, xor_payloads([chunks[i] for i in indices], CHUNK_SIZE)
+
+
+def test_decodes_and_stops_once_complete():
+    data = os.urandom(100 * CHUNK_SIZE - 5)
+    droplets, num_chunks = fountain_encode(data, CHUNK_SIZE, 200, 'splitmix64', 'robust_soliton', master_seed=1)
+    decoder = PeelingDecoder(num_chunks, CHUNK_SIZE, 'splitmix64', 'robust_soliton')
+    used = 0
+    for seed, payload in droplets:
+        used += 1
+        if decoder.add_droplet(seed, payload):
+            break
+    assert decoder.is_complete()
+    assert used < len(droplets)
+    assert decoder.droplets_received == used
+    assert decoder.result(len(data)) == data
+    # once complete, further droplets are ignored
+    assert decoder.add_droplet(*droplets[-1])
+    assert decoder.droplets_received == used
+
+
+def test_degree_one_droplets_solve_their_chunk():
+    chunks = [os.urandom(CHUNK_SIZE) for _ in range(3)]
+    decoder = PeelingDecoder(3, CHUNK_SIZE, 'splitmix64', 'uniform')
+    seed = next(s for s in range(1000) if len(droplet_neighbours(s, 3, 'splitmix64', 'uniform')) == 1)
+    (index,) = droplet_neighbours(seed, 3, 'splitmix64', 'uniform')
+    decoder.add_droplet(*_droplet(chunks, seed, distribution='uniform'))
+    assert decoder.solved_chunks == 1
+    assert decoder.chunks[index] == chunks[index]
+
+
+def test_ignores_malformed_and_redundant_droplets():
+    chunks = [os.urandom(CHUNK_SIZE) for _ in range(20)]
+    decoder = PeelingDecoder(20, CHUNK_SIZE, 'splitmix64', 'robust_soliton')
+    decoder.add_droplet(5, b'short')
+    assert decoder.solved_chunks == 0
+    for seed in range(500):
+        if decoder.add_droplet(*_droplet(chunks, seed)):
+            break
+    assert decoder.result() == b''.join(chunks)
+
+
+def test_progress_reports_every_solved_chunk():
+    data = os.urandom(30 * CHUNK_SIZE)
+    droplets, num_chunks = fountain_encode(data, CHUNK_SIZE, 90, 'splitmix64', 'robust_soliton', master_seed=2)
+    calls = []
+    decoder = PeelingDecoder(num_chunks, CHUNK_SIZE, 'splitmix64', 'robust_soliton',
+                             progress=lambda solved, total, used: calls.append((solved, total)))
+    assert decoder.add_droplets(droplets)
+    assert calls[-1] == (num_chunks, num_chunks)
+    assert [solved for solved, _ in calls] == sorted(solved for solved, _ in calls)
+
+
+def test_too_few_droplets_raise():
+    data = os.urandom(50 * CHUNK_SIZE)
+    droplets, num_chunks = fountain_encode(data, CHUNK_SIZE, 30, 'splitmix64', 'robust_soliton', master_seed=3)
+    decoder = PeelingDecoder(num_chunks, CHUNK_SIZE, 'splitmix64', 'robust_soliton')
+    assert not decoder.add_droplets(droplets)
+    with pytest.raises(ValueError):
+        decoder.result(len(data))
+
+
+def test_solve_gf2_small_system():
+    a, b, c = (os.urandom(CHUNK_SIZE) for _ in range(3))
+    rows = [{0, 1}, {1, 2}, {0, 1, 2}]
+    payloads = [xor_payloads([a, b], CHUNK_SIZE), xor_payloads([b, c], CHUNK_SIZE),
+                xor_payloads([a, b, c], CHUNK_SIZE)]
+    assert solve_gf2(rows, payloads, CHUNK_SIZE) == {0: a, 1: b, 2: c}
+    # the rows are not modified
+    assert rows == [{0, 1}, {1, 2}, {0, 1, 2}]
+
+
+def test_solve_gf2_rank_deficient():
+    a, b, c = (os.urandom(CHUNK_SIZE) for _ in range(3))
+    rows = [{0, 1}, {1, 2}, {0, 2}]  # the third is the sum of the first two
+    payloads = [xor_payloads([a, b], CHUNK_SIZE), xor_payloads([b, c], CHUNK_SIZE),
+                xor_payloads([a, c], CHUNK_SIZE)]
+    assert solve_gf2(rows, payloads, CHUNK_SIZE) is None
+    assert solve_gf2(rows[:2], payloads[:2], CHUNK_SIZE) is None
+
+
+def test_solve_gf2_random_dense_systems():
+    rng = random.Random(5)
+    for _ in range(20):
+        n = rng.randint(1, 150)
+        chunks = [os.urandom(CHUNK_SIZE) for _ in range(n)]
+        rows = [set(rng.sample(range(n), rng.randint(1, n))) for _ in range(n + 10)] + [set(range(n))]
+        payloads = [xor_payloads([chunks[i] for i in row], CHUNK_SIZE) for row in rows]
+        assert solve_gf2(rows, payloads, CHUNK_SIZE) == dict(enumerate(chunks))
+
+
+def test_gf2_fallback_scales_to_tens_of_thousands_of_chunks():
+    # at 3% overhead peeling stalls almost at once and leaves ~15k unknowns,
+    # which dense Gauss-Jordan elimination took minutes over
+    data = os.urandom(16000 * CHUNK_SIZE)
+    droplets, num_chunks = fountain_encode(data, CHUNK_SIZE, 16480, 'splitmix64', 'robust_soliton', master_seed=7)
+    decoder = PeelingDecoder(num_chunks, CHUNK_SIZE, 'splitmix64', 'robust_soliton')
+    assert not decoder.add_droplets(droplets)
+    assert num_chunks - decoder.solved_chunks > 10000
+    start = time.perf_counter()
+    assert decoder.solve_remaining()
+    assert time.perf_counter() - start < 20
+    assert decoder.decoded(len(data)) == data
@@ -0,0 +1,114 @@
+"""
+Queued encode/decode jobs, and how the API reports bad job parameters.
+
+Run with: python -m pytest -q
+"""
+import io
+import os
+import time
+
+import pytest
+
+import dna_api
+from job_queue import DONE, FAILED, QUEUED, JobQueue, JobStore, QueueFull, run_job
+
+DATA = b'job queue test input ' * 40
+ENCODE_PARAMS = {'chunk_size': 32, 'ecc_bytes': 10, 'redundancy_factor': 2.0, 'master_seed': 3}
+
+
+def _wait(store, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_store_create_get_purge(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create('encode', ENCODE_PARAMS, io.BytesIO(DATA))
+    assert job['status'] == QUEUED
+    assert store.get(job['id']) == job
+    with open(store.input_path(job['id']), 'rb') as f:
+        assert f.read() == DATA
+    assert store.get('../' + job['id']) is None
+    assert store.get('0' * 32) is None
+    with pytest.raises(ValueError):
+        store.create('transcode', {}, DATA)
+    assert store.purge() == 0
+    assert store.purge(max_age=-1) == 1
+    assert store.get(job['id']) is None
+
+
+def test_encode_then_decode_in_process(tmp_path):
+    store = JobStore(str(tmp_path))
+    encode = store.create('encode', ENCODE_PARAMS, DATA)
+    assert run_job(store.root, encode['id']) == DONE
+    encode = store.get(encode['id'])
+    assert encode['stages']['droplets']['done'] == encode['stages']['droplets']['total']
+    with open(store.result_path(encode['id']), 'rb') as f:
+        decode = store.create('decode', {}, f)
+    assert run_job(store.root, decode['id']) == DONE
+    with open(store.result_path(decode['id']), 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_failure_is_recorded(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.create('decode', {}, b'>not dna\nNNNN\n')
+    assert run_job(store.root, job['id']) == FAILED
+    job = store.get(job['id'])
+    assert job['error'].startswith('ValueError')
+    assert not os.path.exists(store.result_path(job['id']))
+
+
+def test_queue_runs_jobs_and_refuses_when_full(tmp_path):
+    queue = JobQueue(JobStore(str(tmp_path)), workers=1, max_pending=1)
+    try:
+        job = queue.submit('encode', ENCODE_PARAMS, DATA)
+        with pytest.raises(QueueFull):
+            queue.submit('encode', ENCODE_PARAMS, DATA)
+        assert _wait(queue.store, job['id'])['status'] == DONE
+        deadline = time.monotonic() + 10
+        while queue._pending and time.monotonic() < deadline:  # released by the future's callback
+            time.sleep(0.01)
+        assert queue._pending == 0
+        queue.submit('encode', ENCODE_PARAMS, DATA)
+    finally:
+        queue.shutdown()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(dna_api, 'jobs', JobQueue(JobStore(str(tmp_path)), workers=1))
+    yield dna_api.app.test_client()
+    dna_api.jobs.shutdown()
+
+
+@pytest.mark.parametrize('path, upload, form', [
+    ('/encode', 'image', {'chunk_size': 'abc'}),
+    ('/encode', 'image', {'degree_distribution': 'nope'}),
+    ('/jobs/encode', 'image', {'redundancy_factor': 'lots'}),
+    ('/jobs/encode', 'image', {'degree_distribution': 'robust_soliton', 'delta': 'x'}),
+    ('/jobs/decode', 'fasta', {'num_chunks': 'ten'}),
+    ('/decode', 'fasta', {'chunk_size': '3.5'}),
+])
+def test_bad_parameters_are_client_errors(client, path, upload, form):
+    response = client.post(path, data=dict(form, **{upload: (io.BytesIO(DATA), 'input')}))
+    assert response.status_code == 400
+    assert response.get_json()['error']
+    assert not os.listdir(dna_api.jobs.store.root)
+
+
+def test_job_endpoints(client):
+    response = client.post('/jobs/encode', data={'image': (io.BytesIO(DATA), 'input'), 'master_seed': '3'})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert response.headers['Location'].endswith(job['status_url'])
+    assert _wait(dna_api.jobs.store, job['id'])['status'] == DONE
+    view = client.get(job['status_url']).get_json()
+    fasta = client.get(view['result_url']).data
+    assert fasta.startswith(b'>')
+    assert client.get('/jobs/' + '0' * 32).status_code == 404
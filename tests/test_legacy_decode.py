@@ -0,0 +1,46 @@
+"""
+Files from the original encoder still decode with the original contract:
+only chunk_size and num_chunks are given.
+
+data/legacy_v0.fasta was written by the baseline encode_image_to_dna
+(chunk_size 32, ecc_bytes 10, 13 chunks, legacy PRNG, uniform degrees,
+bit-string payload) from LEGACY_INPUT.
+
+Run with: python -m pytest -q
+"""
+import io
+import os
+
+import pytest
+
+from fountaincodev2 import decode_dna_to_bytes, decode_dna_to_image, read_fasta
+
+LEGACY_FASTA = os.path.join(os.path.dirname(__file__), 'data', 'legacy_v0.fasta')
+LEGACY_INPUT = b'DNA storage legacy fixture: ' + bytes(range(256))
+
+
+def test_decode_bytes_with_chunk_size_and_num_chunks():
+    sequences, _ = read_fasta(LEGACY_FASTA)
+    assert decode_dna_to_bytes(sequences, 32, 13) == LEGACY_INPUT
+
+
+def test_decode_file_with_chunk_size_and_num_chunks(tmp_path):
+    output = tmp_path / 'out.bin'
+    assert decode_dna_to_image(LEGACY_FASTA, str(output), 32, 13)
+    assert output.read_bytes() == LEGACY_INPUT
+
+
+def test_decode_without_parameters_fails_clearly():
+    sequences, _ = read_fasta(LEGACY_FASTA)
+    with pytest.raises(ValueError, match='chunk_size and num_chunks must be given'):
+        decode_dna_to_bytes(sequences)
+
+
+def test_decode_endpoint():
+    from dna_api import app
+    with open(LEGACY_FASTA, 'rb') as f:
+        fasta = f.read()
+    response = app.test_client().post('/decode', data={'fasta': (io.BytesIO(fasta), 'legacy.fasta'),
+                                                       'chunk_size': '32', 'num_chunks': '13'})
+    assert response.status_code == 200
+    assert response.data == LEGACY_INPUT
@@ -0,0 +1,36 @@
+"""
+Behaviour of the multi-file object store.
+
+Run with: python -m pytest -q
+"""
+import os
+import random
+
+import object_store
+
+
+def _objects(seed: int) -> dict:
+    rng = random.Random(seed)
+    return {'photo.jpg': rng.randbytes(3000), 'notes.txt': b'fountain codes ' * 100}
+
+
+def test_index_block_decodes_for_every_seed(tmp_path):
+    # README settings; the index is only a few chunks, so a fractional
+    # overhead alone leaves it a handful of spare droplets
+    path = str(tmp_path / 'pool.fasta')
+    for seed in range(30):
+        objects = _objects(seed)
+        index = object_store.write_pool(path, objects, 2048, seed, distribution='robust_soliton', overhead=0.5)
+        assert object_store.read_index(path) == index, seed
+
+
+def test_read_objects_and_ranges(tmp_path):
+    path = str(tmp_path / 'pool.fasta')
+    objects = _objects(1)
+    object_store.write_pool(path, objects, 1024, 7, distribution='robust_soliton', overhead=0.5)
+    for with_index in (False, True):
+        if with_index:
+            object_store.build_read_index(path)
+        assert object_store.read_object(path, 'notes.txt') == objects['notes.txt']
+        assert object_store.read_object(path, 'photo.jpg', 1000, 2500) == objects['photo.jpg'][1000:2500]
+    assert os.path.exists(path + '.idx')
@@ -0,0 +1,81 @@
+"""
+Encode result cache: keys, write-through storage, LRU eviction and the
+/encode cache headers.
+
+Run with: python -m pytest -q
+"""
+import io
+import os
+
+import pytest
+
+import dna_api
+from result_cache import ResultCache, cache_key
+
+PARAMS = {'chunk_size': 32, 'ecc_bytes': 10, 'master_seed': 1}
+
+
+def test_cache_key():
+    key = cache_key(b'data', PARAMS, 5)
+    assert key == cache_key(b'data', dict(reversed(list(PARAMS.items()))), 5)
+    assert len({key, cache_key(b'datb', PARAMS, 5), cache_key(b'data', dict(PARAMS, master_seed=2), 5),
+                cache_key(b'data', PARAMS, 6)}) == 4
+
+
+def test_write_through_stores_only_complete_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    assert cache.open('a') is None
+    assert list(cache.write_through('a', ['>s\n', b'ACGT\n'])) == ['>s\n', b'ACGT\n']
+    with cache.open('a') as f:
+        assert f.read() == b'>s\nACGT\n'
+    # a client that disconnects mid-stream leaves nothing behind
+    chunks = cache.write_through('b', ['>s\n', 'ACGT\n'])
+    next(chunks)
+    chunks.close()
+    assert cache.open('b') is None
+    assert sorted(os.listdir(str(tmp_path))) == ['a.fasta', 'stats.json']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries']) == (1, 2, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(1 / 3)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=250)
+    for i, key in enumerate('abc'):
+        list(cache.write_through(key, [b'x' * 100]))
+        os.utime(os.path.join(str(tmp_path), key + '.fasta'), ns=(i * 10**9, i * 10**9))
+    # 'c' did not fit alongside 'a' and 'b'; the oldest went
+    assert cache.open('a') is None
+    cache.open('b').close()  # now more recent than 'c'
+    list(cache.write_through('d', [b'x' * 100]))
+    assert cache.open('c') is None
+    assert cache.open('b') is not None
+    assert cache.stats()['evictions'] == 2
+
+
+def test_disabled_cache_passes_through(tmp_path):
+    cache = ResultCache(str(tmp_path / 'off'), max_bytes=0)
+    assert list(cache.write_through('a', ['x'])) == ['x']
+    assert cache.open('a') is None
+    assert os.listdir(str(tmp_path / 'off')) == []
+
+
+def test_encode_endpoint_serves_repeats_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(dna_api, 'cache', ResultCache(str(tmp_path), max_bytes=1 << 20))
+    client = dna_api.app.test_client()
+
+    def encode(headers=None, **form):
+        data = dict({'image': (io.BytesIO(b'cached input ' * 50), 'input'), 'master_seed': '7'}, **form)
+        return client.post('/encode', data=data, headers=headers)
+
+    first = encode()
+    assert first.headers['X-Cache'] == 'MISS'
+    assert first.data.startswith(b'>')  # the entry is stored once the stream is consumed
+    second = encode()
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.data == first.data
+    # workers does not change the output, so it is not part of the key
+    assert encode(workers='2').headers['X-Cache'] == 'HIT'
+    assert encode(chunk_size='40').headers['X-Cache'] == 'MISS'
+    assert encode(headers={'Cache-Control': 'no-cache'}).headers['X-Cache'] == 'MISS'
+    assert client.get('/cache/stats').get_json()['hits'] == 2
@@ -0,0 +1,49 @@
+"""
+Behaviour of the streaming FASTA/FASTQ reader and writer.
+
+Run with: python -m pytest -q
+"""
+import gzip
+import io
+
+from sequence_io import read_records, read_sequences, write_fasta
+
+FASTA = ">seq1 version=2\nACGT\nTTGA\n>seq2\nGGCC\n\n>seq3\r\nAAAA\r\n"
+# quality lines starting with '@' and '+' must not be taken for markers
+FASTQ = "@r1\nACGTACGT\n+\n@@@@+++!\n@r2 prng=splitmix64\nACGT\nTT\n+r2\n+@\n@@@@\n@r3\nGGGG\n+\nIIII\n"
+
+
+def test_fasta_records():
+    assert list(read_records(io.StringIO(FASTA))) == [('seq1 version=2', 'ACGTTTGA'), ('seq2', 'GGCC'), ('seq3', 'AAAA')]
+
+
+def test_fastq_records():
+    assert list(read_records(FASTQ.encode('ascii'))) == [
+        ('r1', 'ACGTACGT'), ('r2 prng=splitmix64', 'ACGTTT'), ('r3', 'GGGG')]
+
+
+def test_sources():
+    expected = list(read_sequences(FASTA.encode('ascii')))
+    assert list(read_sequences(io.StringIO(FASTA))) == expected
+    assert list(read_sequences(io.BytesIO(FASTA.encode('ascii')))) == expected
+    # gzip input, also as concatenated members, is detected by its magic bytes
+    assert list(read_sequences(gzip.compress(FASTA.encode('ascii')) * 2)) == expected * 2
+
+
+def test_records_span_read_blocks():
+    # records cut by the 1 MiB read blocks, quality lines included
+    records = [(f"r{i}", 'ACGT' * 50) for i in range(6000)]
+    text = ''.join(f"@{header}\n{seq}\n+\n{'@' * len(seq)}\n" for header, seq in records)
+    assert len(text) > 1 << 20
+    assert list(read_records(text.encode('ascii'))) == records
+
+
+def test_write_fasta_round_trip(tmp_path):
+    records = [(f"strand_{i}", 'ACGT' * (i + 1)) for i in range(10)]
+    for name in ('out.fasta', 'out.fasta.gz'):
+        path = tmp_path / name
+        assert write_fasta(str(path), iter(records), batch_size=3) == len(records)
+        assert list(read_records(str(path))) == records
+    buffer = io.BytesIO()
+    write_fasta(buffer, records)
+    assert buffer.getvalue().decode('ascii').startswith('>strand_0\nACGT\n>strand_1\n')
@@ -0,0 +1,62 @@
+"""
+Golden vectors and behaviour of the self-describing metadata strands.
+
+The header layout and the metadata strands are read back from DNA, so a
+change that breaks one of these vectors breaks old outputs: bump
+fountaincodev2.CODEC_VERSION and update them on purpose, never to make the
+test pass.
+
+Run with: python -m pytest -q
+"""
+import os
+import random
+
+import pytest
+
+from fountaincodev2 import decode_dna_to_bytes, stream_bytes_to_dna
+from strand_header import (build_header, find_header, metadata_strands, pack_header, parse_metadata_strand,
+                           unpack_header)
+
+
+def test_header_layout():
+    header = build_header(b'golden vector message', 21, 32, 10, 2, 'splitmix64', 'robust_soliton')
+    packed = pack_header(header)
+    assert packed.hex() == ('0202010a2000010000001500000000000000150000000000000035f76255'
+                            '029a9999999999b93f9a9999999999a93f')
+    assert unpack_header(packed) == header
+    assert metadata_strands(header) == [
+        'ACGTTGCACAGTGTCACCGGTTTAGAGACCGACTGGCCCACGACATTAGTAATAGGCCTGCTTGCAGGTCCCGTTTAGGATGTGTCGCCGGCTAAAGGATGC'
+        'CCACGGCAGGCAACGCGAGAGCACCAGCTCGCTCTAGTCCACCGGAACTCACAACTTTCTCAGCACTCCTGCATATAATTGG',
+        'ACGTTGCACAGTGTCACCGGTTTCGAGATAAATGAGTACTTCGAGGCCAGGACTATCGACTGCATACGCATAAGCGGTACCTCTCTAACCCGTAAAGTCGG'
+        'CCCACGGCAGGCAACGCGAGAGCACCAGGGACGGGGGGCAACATTTCCATTCGCCTCGCGCAGTCTGCACTTAACACAACGGC',
+    ]
+    # screened: the first whitening nonce that passes the default constraints
+    assert metadata_strands(header, 'default') == [
+        'ACGTTGCACAGTGTCACCGCGTCGGATAGACTATGTCGATAGCAGCCCAAAGTCCAGTCATAGATCGTGCTTATCTGGATGGGTCGCTCTCGTACTTGTTC'
+        'GCCAGTTAGTTATTATCCCAATGCGTACTAACCGGTACTGAAGACACTCACCCGTAGTTGGTGCACTGCCCTGAGGAACTATT',
+        'ACGTTGCACAGTGTCACCGCGTCTGATAACTTGGATTTAAGCTCAATAGCGGCGTCGAGTCCAGCCCTAACGGGTGATGGATAGTATGCAGCTACTTTGGC'
+        'GCCAGTTAGTTATTATCCCAATGCGTACACCGGTCGGCCTCCTGACAGAATAGTGGAGCCAGAAAGAAACCGTAAGGACCCTA',
+    ]
+
+
+@pytest.mark.parametrize('distribution', ['uniform', 'ideal_soliton', 'robust_soliton'])
+def test_header_round_trip(distribution):
+    header = build_header(os.urandom(1000), 1234, 32, 10, 2, 'splitmix64', distribution)
+    fragments = dict(parse_metadata_strand(dna) for dna in metadata_strands(header))
+    assert sorted(fragments) == [0, 1]
+    strands = metadata_strands(header) + ['ACGT' * 46]
+    found, rest = find_header(strands)
+    assert found == header
+    assert list(rest) == strands  # the strands read while searching are replayed
+
+
+@pytest.mark.parametrize('chunk_size, ecc_bytes', [(32, 10), (235, 20), (240, 20), (246, 10), (300, 20), (500, 40)])
+def test_metadata_strands_match_droplet_length(chunk_size, ecc_bytes):
+    # Reed-Solomon adds ECC per 255-byte block, so payloads above one block
+    # grow by more than ecc_bytes; metadata strands must still match
+    data = os.urandom(8000)
+    strands = list(stream_bytes_to_dna(data, chunk_size, ecc_bytes, overhead=0.5, master_seed=1,
+                                       distribution='robust_soliton'))
+    assert len(set(map(len, strands))) == 1
+    random.Random(chunk_size).shuffle(strands)
+    assert decode_dna_to_bytes(strands) == data
@@ -0,0 +1,101 @@
+"""
+Address prefixes and the on-disk read index.
+
+The prefixes are read back from DNA and the .idx sidecar from disk, so a
+change that breaks one of the vectors here breaks old pools: bump the
+format on purpose, never to make the test pass.
+
+Run with: python -m pytest -q
+"""
+import os
+import struct
+
+import numpy as np
+
+from dna_constraints import get_constraints
+from strand_index import (ADDRESS_LENGTH, MAX_ADDRESS, address_prefix, build_index, iter_record_spans, load_index,
+                          lookup, parse_address, read_address)
+
+
+def test_address_prefixes():
+    expected = {
+        0: 'CACACACACACACACA',
+        1: 'CACACACACACACACT',
+        8: 'CACACACACACACTCA',
+        0o1234567: 'CACTGAGTACAGTCTG',
+        MAX_ADDRESS: 'TGTGTGTGTGTGTGTG',
+    }
+    for address, prefix in expected.items():
+        assert address_prefix(address) == prefix
+        assert parse_address(prefix + 'ACGT') == address
+    assert parse_address('A' * ADDRESS_LENGTH) is None
+
+
+def test_prefixes_are_balanced_and_run_free():
+    constraints = get_constraints('max_run=2,gc_min=0.5,gc_max=0.5')
+    for address in (0, 1, 2, 63, 64, 4095, 4096, 123456, MAX_ADDRESS):
+        assert constraints.check([address_prefix(address)]).all(), address
+
+
+def _write_pool(path, fastq=False):
+    blocks = {2: ['ACGT' * 5, 'TTGA' * 5], 0: ['GGCC' * 5], 1: ['CATG' * 5]}
+    with open(path, 'w') as f:
+        for address in (0, 2, 1, 2):
+            for i, seq in enumerate(blocks[address]):
+                seq = address_prefix(address) + seq
+                if fastq:
+                    f.write(f"@b{address}_{i}\n{seq}\n+\n{'@' * len(seq)}\n")
+                else:
+                    f.write(f">b{address}_{i}\n{seq[:20]}\n{seq[20:]}\n")
+        f.write(">unaddressed\nACGTACGT\n")
+    return blocks
+
+
+def test_record_spans_cover_the_file(tmp_path):
+    path = str(tmp_path / 'pool.fasta')
+    _write_pool(path)
+    spans = list(iter_record_spans(path))
+    assert [address for _, _, address in spans] == [0, 2, 2, 1, 2, 2, None]
+    assert sum(length for _, length, _ in spans) == os.path.getsize(path)
+    assert all(offset + length == next_offset for (offset, length, _), (next_offset, _, _) in zip(spans, spans[1:]))
+
+
+def test_sidecar_layout(tmp_path):
+    path = str(tmp_path / 'pool.fasta')
+    _write_pool(path)
+    with open(build_index(path), 'rb') as f:
+        data = f.read()
+    magic, size, _ = struct.unpack_from('<8sQQ', data)
+    assert (magic, size) == (b'DNAIDX2\x00', os.path.getsize(path))
+    table = np.frombuffer(data[24:], dtype=[('address', '<u4'), ('offset', '<u8'), ('length', '<u8')])
+    # consecutive records of one address are merged into one span, then the
+    # spans are sorted by address, keeping file order within an address
+    spans = list(iter_record_spans(path))
+    runs = [(0, spans[0][0], spans[0][1]), (2, spans[1][0], spans[1][1] + spans[2][1]),
+            (1, spans[3][0], spans[3][1]), (2, spans[4][0], spans[4][1] + spans[5][1])]
+    assert table.tolist() == sorted(runs, key=lambda run: run[0])
+
+
+def test_read_address_with_and_without_index(tmp_path):
+    for name, fastq in (('pool.fasta', False), ('pool.fastq', True)):
+        path = str(tmp_path / name)
+        blocks = _write_pool(path, fastq)
+        scanned = {address: list(read_address(path, address)) for address in blocks}
+        build_index(path)
+        index = load_index(path)
+        assert len(lookup(index, 2)) == 2
+        for address, strands in blocks.items():
+            expected = strands * 2 if address == 2 else strands
+            assert scanned[address] == expected
+            assert list(read_address(path, address)) == expected
+
+
+def test_stale_index_is_ignored(tmp_path):
+    path = str(tmp_path / 'pool.fasta')
+    _write_pool(path)
+    build_index(path)
+    assert load_index(path) is not None
+    with open(path, 'a') as f:
+        f.write(f">late\n{address_prefix(3)}ACGT\n")
+    assert load_index(path) is None
+    assert list(read_address(path, 3)) == ['ACGT']
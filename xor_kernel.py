@@ -0,0 +1,50 @@
+"""
+XOR kernel shared by the fountain encoder and decoder.
+
+Payloads are combined as Python big integers (little-endian), so one XOR
+touches the whole payload in C and shorter chunks are implicitly zero-padded
+at the end. NumPy helpers cover the batched cases (whole 2-D payload buffers)
+where many rows are XOR-ed at once.
+"""
+from functools import reduce
+from operator import xor
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+
+def pack(payload: bytes) -> int:
+    """Payload bytes -> integer word (little-endian, so padding is free)."""
+    return int.from_bytes(payload, 'little')
+
+
+def unpack(word: int, size: int) -> bytes:
+    """Integer word -> payload bytes of the given size."""
+    return word.to_bytes(size, 'little')
+
+
+def pack_chunks(data: bytes, chunk_size: int) -> List[int]:
+    """Split data into chunk_size pieces and pack each into a word."""
+    return [int.from_bytes(data[i:i+chunk_size], 'little') for i in range(0, len(data), chunk_size)]
+
+
+def xor_words(words: Sequence[int], indices: Iterable[int]) -> int:
+    """XOR the selected words together."""
+    return reduce(xor, [words[i] for i in indices], 0)
+
+
+def xor_payloads(payloads: Iterable[bytes], size: int) -> bytes:
+    """XOR byte strings of up to `size` bytes, zero-padding shorter ones."""
+    acc = 0
+    for payload in payloads:
+        acc ^= int.from_bytes(payload, 'little')
+    return acc.to_bytes(size, 'little')
+
+
+def xor_rows(matrix: np.ndarray, indices: Sequence[int]) -> np.ndarray:
+    """XOR-reduce the selected rows of a 2-D payload buffer."""
+    rows = matrix[np.asarray(indices)]
+    if matrix.shape[1] % 8 == 0 and matrix.dtype == np.uint8 and matrix.flags.c_contiguous:
+        rows = rows.view(np.uint64)
+        return np.bitwise_xor.reduce(rows, axis=0).view(np.uint8)
+    return np.bitwise_xor.reduce(rows, axis=0)